@@ -0,0 +1,43 @@
+import hashlib
+import os
+from functools import lru_cache
+from pathlib import Path
+import pytesseract
+
+# Shared by ocr_clean_pdfs.py and ocr_from_rotated_pdfs.py.
+# The same physical scans get re-OCR'd as Aw1_page*.pdf, *_rotated.pdf, *_rotated_rotated.pdf ...;
+# once rendered, those pages are pixel-identical, so the OCR output is keyed by an exact hash of
+# the rendered image plus everything that changes tesseract's output.
+CACHE_DIR = Path(os.environ.get("OCR_CACHE_DIR", Path.home() / ".cache" / "prod_logs_ocr"))
+
+@lru_cache(maxsize=1)
+def _tesseract_version() -> str:
+    return str(pytesseract.get_tesseract_version())
+
+def ocr_key(img, extension: str = "pdf", config: str = "", lang=None) -> str:
+    """Exact content hash of the rendered page + tesseract version/lang/config/output type."""
+    h = hashlib.blake2b(digest_size=20)
+    h.update(f"{_tesseract_version()}|{lang}|{config}|{extension}|{img.mode}|{img.size}".encode("utf-8"))
+    h.update(img.tobytes())
+    return h.hexdigest()
+
+def cache_path(key: str, extension: str, cache_dir=None) -> Path:
+    return Path(cache_dir or CACHE_DIR) / key[:2] / f"{key}.{extension}"
+
+def ocr_image(img, extension: str = "pdf", config: str = "", lang=None, cache_dir=None):
+    """
+    pytesseract.image_to_pdf_or_hocr through the disk cache.
+    Returns (bytes, hit). Safe to call from parallel worker processes: entries are written
+    to a temp file and renamed into place, so readers never see a partial file.
+    """
+    key = ocr_key(img, extension, config, lang)
+    path = cache_path(key, extension, cache_dir)
+    if path.exists():
+        return path.read_bytes(), True
+
+    data = pytesseract.image_to_pdf_or_hocr(img, extension=extension, config=config, lang=lang)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+    return data, False
@@ -1,9 +1,10 @@
 import os
 from pathlib import Path
-from PyPDF2 import PdfReader, PdfWriter
+from PyPDF2 import PdfWriter
 from pdf2image import convert_from_path
 from PIL import Image
-import pytesseract
+from ocr_cache import ocr_image
+from orientation import detect_rotations, upright
 
 # === CONFIGURATION ===
 base_dir = Path(r"C:\Users\DanShao\OneDrive - Komar Alliance\Production Logs\Classification Model Training\Combined Training Sets")
@@ -20,11 +21,10 @@ for pdf_path in base_dir.glob("*.pdf"):
 
     print(f"🔹 Processing {pdf_path.name}")
 
-    # Read PDF metadata for rotation flags
-    reader = PdfReader(pdf_path)
-    rotations = [int(p.get("/Rotate", 0)) for p in reader.pages]
+    # Orientation from tesseract OSD on small thumbnails (the render below already honors /Rotate)
+    rotations = detect_rotations(pdf_path)
 
-    # Convert pages to images
+    # Convert pages to images (the only full-resolution render)
     pages = convert_from_path(pdf_path, dpi=150)
 
     # Prepare output folder for this machine
@@ -34,22 +34,24 @@ for pdf_path in base_dir.glob("*.pdf"):
     machine_dir.mkdir(exist_ok=True)
 
     print(f"📄 Detected {len(pages)} pages → {machine_name}/")
+    cache_hits = 0
 
     for i, img in enumerate(pages):
         # Apply rotation correction
-        if rotations[i] != 0:
-            img = img.rotate(-rotations[i], expand=True)
+        if rotations[i] is not None:
+            img = upright(img, rotations[i])
 
-        # Extra safety: rotate if still landscape
-        if img.width > img.height:
+        # OSD couldn't tell (too little text): fall back to "rotate if still landscape"
+        elif img.width > img.height:
             img = img.rotate(90, expand=True)
 
-        # OCR each page to PDF
-        text_pdf_bytes = pytesseract.image_to_pdf_or_hocr(img, extension='pdf')
+        # OCR each page to PDF (identical pages seen before come from the shared OCR cache)
+        text_pdf_bytes, hit = ocr_image(img, extension='pdf')
+        cache_hits += hit
         single_page_path = machine_dir / f"{machine_name}_page{i+1}.pdf"
         with open(single_page_path, "wb") as f:
             f.write(text_pdf_bytes)
 
-    print(f"✅ OCR & split done for {machine_name}")
+    print(f"✅ OCR & split done for {machine_name} ({cache_hits}/{len(pages)} pages from OCR cache)")
 
 print("\n🎉 All PDFs processed, rotated, and split successfully!")
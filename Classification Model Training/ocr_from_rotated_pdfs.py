@@ -1,86 +1,272 @@
+import argparse
+import io
+import math
+import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from pdf2image import convert_from_path
-from PyPDF2 import PdfWriter
+from PyPDF2 import PdfReader, PdfWriter
 from PIL import Image
-import pytesseract
+from ocr_cache import ocr_image
+from orientation import detect_rotations, displayed_size, upright
 
 # ======= CONFIG =======
-# Change this to your target folder (or pass a folder path as the first CLI arg)
+# Change this to your target folder (or pass a folder path as the first CLI arg;
+# --page-store DIR OCRs page_store.py's de-duplicated pages instead)
 BASE_DIR = Path(r"C:\Users\DanShao\OneDrive - Komar Alliance\Production Logs\September 2025")
-DPI_CHAIN = [150, 120]  # try these DPIs in order if a page is too large
+MAX_DPI = 150           # small pages render at this resolution
+MIN_DPI = 50            # never go below this, whatever the page size
+MAX_MEGAPIXELS = 30     # per-page pixel budget; bigger pages get a lower DPI up front
+RETRY_SCALE = 0.75      # if a render still fails, retry those pages once at this fraction of the DPI
+WORKERS = os.cpu_count() or 1  # tesseract processes
+CHUNK_PAGES = max(4, WORKERS)  # pages rendered at a time; peak memory ~ 2 chunks of page images
+AUTO_ORIENT = True      # tesseract OSD on a thumbnail picks each page's rotation
 # ======================
 
-Image.MAX_IMAGE_PIXELS = None  # prevent Pillow "decompression bomb" warnings on big scans
+# every render is planned under the budget, so keep Pillow's bomb check just above it
+Image.MAX_IMAGE_PIXELS = int(MAX_MEGAPIXELS * 1_000_000 * 1.1)
 
-def ocr_pdf(pdf_path: Path, out_path: Path) -> None:
-    """OCR all pages of one already-rotated PDF to a single text-searchable PDF."""
-    writer = PdfWriter()
-    pages_done = 0
+def _init_ocr_worker():
+    # one tesseract per core: stop each one from also spinning up its own OpenMP threads
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+
+def ocr_page(img, rotation=0):
+    """Worker: one page image (+ clockwise fix from OSD) -> (one-page text-searchable PDF bytes, OCR cache hit?)."""
+    return ocr_image(upright(img, rotation), extension='pdf')
+
+def plan_pages(pdf_path: Path):
+    """
+    Per-page render plan from each page's displayed box (cropbox, points, 1/72 in; width and
+    height swapped for /Rotate 90/270), before anything is rendered: the largest DPI <= MAX_DPI
+    that keeps the page under MAX_MEGAPIXELS.
+    Returns [(page_no, dpi, width_px, height_px), ...].
+    """
+    plan = []
+    for page_no, page in enumerate(PdfReader(pdf_path).pages, start=1):
+        w_in, h_in = (pt / 72 for pt in displayed_size(page))
+        budget_dpi = math.sqrt(MAX_MEGAPIXELS * 1_000_000 / max(w_in * h_in, 1e-6))
+        dpi = max(MIN_DPI, min(MAX_DPI, int(budget_dpi)))
+        plan.append((page_no, dpi, round(w_in * dpi), round(h_in * dpi)))
+    return plan
 
-    # render pages with a simple DPI backoff for huge pages
-    last_err = None
-    for dpi in DPI_CHAIN:
+def _render(pdf_path: Path, dpi, first, last):
+    # use_cropbox: render the same box plan_pages budgeted for
+    return convert_from_path(pdf_path, dpi=dpi, first_page=first, last_page=last, use_cropbox=True)
+
+def render_chunk(pdf_path: Path, chunk):
+    """
+    Render the planned pages of one chunk; consecutive pages sharing a DPI go in one call.
+    A failed call is retried once at RETRY_SCALE of the DPI, unless it already was MIN_DPI.
+    Returns [(page_no, dpi actually used, image or None when the page could not be rendered), ...].
+    """
+    rendered = []
+    i = 0
+    while i < len(chunk):
+        j = i
+        while j + 1 < len(chunk) and chunk[j + 1][1] == chunk[i][1]:
+            j += 1
+        first, last, dpi = chunk[i][0], chunk[j][0], chunk[i][1]
+        pages = range(first, last + 1)
         try:
-            images = convert_from_path(pdf_path, dpi=dpi)
-            last_err = None
-            break
+            rendered += zip(pages, [dpi] * len(pages), _render(pdf_path, dpi, first, last))
         except Exception as e:
-            last_err = e
-    if last_err:
-        raise last_err
+            retry_dpi = max(MIN_DPI, int(dpi * RETRY_SCALE))
+            if retry_dpi >= dpi:
+                print(f"      ❌ pages {first}-{last}: render at {dpi} dpi (the minimum) failed ({e}); skipped")
+                rendered += [(p, dpi, None) for p in pages]
+            else:
+                print(f"      pages {first}-{last}: render at {dpi} dpi failed ({e}); retrying at {retry_dpi} dpi")
+                try:
+                    rendered += zip(pages, [retry_dpi] * len(pages), _render(pdf_path, retry_dpi, first, last))
+                except Exception as e2:
+                    print(f"      ❌ pages {first}-{last}: retry at {retry_dpi} dpi failed too ({e2}); skipped")
+                    rendered += [(p, retry_dpi, None) for p in pages]
+        i = j + 1
+    return rendered
+
+def ocr_pages(pdf_path: Path, pool: ProcessPoolExecutor, rotations=None, failed=None):
+    """
+    Yield (page_no, one-page text-searchable PDF bytes, OCR cache hit?) for every page of a PDF,
+    in page order. Without rotations (clockwise, per page), AUTO_ORIENT picks them by OSD on a
+    thumbnail first (pages OSD can't read are left as they are). Pages are rendered once,
+    CHUNK_PAGES at a time, and OCR'd across the pool while the next chunk renders. Pages that
+    could not be rendered are skipped and their numbers appended to `failed`.
+    """
+    plan = plan_pages(pdf_path)
+    if rotations is None:
+        rotations = detect_rotations(pdf_path, pool) if AUTO_ORIENT else [0] * len(plan)
+    rotations = [r or 0 for r in rotations]
 
-    for i, img in enumerate(images, start=1):
-        # no rotation here — files are already *_rotated
-        pdf_bytes = pytesseract.image_to_pdf_or_hocr(img, extension='pdf')
+    pending = []  # (page_no, future) of the previous chunk, in page order
+    for start in range(0, len(plan), CHUNK_PAGES):
+        rendered = render_chunk(pdf_path, plan[start:start + CHUNK_PAGES])
+        futures = []
+        for (page_no, dpi, img), rot in zip(rendered, rotations[start:start + CHUNK_PAGES]):
+            if img is None:
+                if failed is not None:
+                    failed.append(page_no)
+                continue
+            w_px, h_px = img.size
+            print(f"      page {page_no}: {dpi} dpi → {w_px}x{h_px} px ({w_px * h_px / 1e6:.1f} MP), rotate {rot}°")
+            futures.append((page_no, pool.submit(ocr_page, img, rot)))
+        del rendered
 
-        temp_page = out_path.parent / f"__temp_{i}.pdf"
-        temp_page.write_bytes(pdf_bytes)
+        for page_no, fut in pending:
+            yield (page_no, *fut.result())
+        pending = futures
 
-        with temp_page.open("rb") as f:
-            writer.append(f)
-        temp_page.unlink(missing_ok=True)
+    for page_no, fut in pending:
+        yield (page_no, *fut.result())
 
+def partial_path(out_path: Path) -> Path:
+    """'File_ocr.pdf' -> 'File_ocr.partial.pdf': where an OCR run with unrendered pages goes."""
+    return out_path.with_name(f"{out_path.stem}.partial{out_path.suffix}")
+
+def ocr_pdf(pdf_path: Path, out_path: Path, pool: ProcessPoolExecutor) -> bool:
+    """
+    OCR all pages of one PDF to a single text-searchable PDF (finished pages appended straight
+    from memory). If any page could not be rendered, the pages that were OCR'd go to
+    partial_path(out_path) instead, so the next run does not take the PDF as done.
+    Returns True when every page made it into out_path.
+    """
+    writer = PdfWriter()
+    pages_done = cache_hits = 0
+    failed = []
+    for _, pdf_bytes, hit in ocr_pages(pdf_path, pool, failed=failed):
+        writer.append(io.BytesIO(pdf_bytes))
         pages_done += 1
+        cache_hits += hit
 
-    with out_path.open("wb") as f:
+    target = partial_path(out_path) if failed else out_path
+    tmp = target.with_name(f"{target.name}.{os.getpid()}.tmp")   # a crash never leaves a truncated output
+    with tmp.open("wb") as f:
         writer.write(f)
+    os.replace(tmp, target)
+
+    if failed:
+        print(f"   ❌ {pdf_path.name}: page(s) {', '.join(map(str, failed))} could not be rendered; "
+              f"{pages_done} OCR’d page(s) kept in {target.name}, {out_path.name} not written")
+        return False
+    partial_path(out_path).unlink(missing_ok=True)
+    print(f"   ✅ {pdf_path.name}  →  {out_path.name}  ({pages_done} pages OCR’d, {cache_hits} from cache)")
+    return True
 
-    print(f"   ✅ {pdf_path.name}  →  {out_path.name}  ({pages_done} pages OCR’d)")
+def ocr_page_store(store_dir: Path, pool: ProcessPoolExecutor) -> int:
+    """
+    --page-store: OCR every unique page of the training sets in page_store.py's store once, at
+    the rotation its manifest gives it, into <store>/ocr/. Pages already OCR'd are skipped, so a
+    page shared by several source PDFs / machines is read, rendered and OCR'd a single time.
+    Returns the number of pages that could not be rendered (they are retried next run).
+    """
+    from page_store import PageStore
+
+    store = PageStore(store_dir)
+    todo = {}
+    for machine in store.machines():
+        for key, rot in store.upright_pages(machine):
+            if not store.ocr_path(key, rot).exists():
+                todo.setdefault((key, rot), None)
+    if not todo:
+        print(f"Every page in {store_dir} is already OCR'd.")
+        return 0
+
+    # one temporary PDF with the pages to do, so rendering and OCR run in chunks across the pool
+    writer = PdfWriter()
+    for key, rot in todo:
+        writer.add_page(PdfReader(store.page_path(key)).pages[0])
+        writer.pages[-1].rotation = rot
+    batch = store.dir / "ocr" / f"batch.{os.getpid()}.tmp.pdf"
+    batch.parent.mkdir(parents=True, exist_ok=True)
+    with batch.open("wb") as f:
+        writer.write(f)
+
+    done = cache_hits = 0
+    failed = []
+    try:
+        pages = list(todo)
+        # the /Rotate set above is applied by pdftoppm, so no further rotation (and no OSD)
+        for page_no, pdf_bytes, hit in ocr_pages(batch, pool, rotations=[0] * len(pages), failed=failed):
+            key, rot = pages[page_no - 1]
+            out_path = store.ocr_path(key, rot)
+            out_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = out_path.with_name(f"{out_path.name}.{os.getpid()}.tmp")
+            tmp.write_bytes(pdf_bytes)
+            os.replace(tmp, out_path)
+            done += 1
+            cache_hits += hit
+    finally:
+        batch.unlink(missing_ok=True)
+
+    print(f"   ✅ {done} store page(s) OCR’d ({cache_hits} from cache) → {store.dir / 'ocr'}")
+    if failed:
+        print(f"   ⚠️  {len(failed)} page(s) could not be rendered and were not OCR’d: "
+              + ", ".join(f"{pages[n - 1][0][:12]}_r{pages[n - 1][1]}" for n in failed))
+    return len(failed)
 
 def main():
-    base_dir = Path(sys.argv[1]) if len(sys.argv) > 1 else BASE_DIR
+    ap = argparse.ArgumentParser(description="OCR the PDFs of a folder into text-searchable *_ocr.pdf; "
+                                             "tesseract OSD turns each page upright.")
+    ap.add_argument("base_dir", nargs="?", type=Path, default=BASE_DIR, help="Folder of PDFs (not recursive)")
+    ap.add_argument("--rotated-only", action="store_true",
+                    help="Legacy: OCR only the *_rotated.pdf copies made by the old rotate scripts")
+    ap.add_argument("--page-store", type=Path, metavar="DIR",
+                    help="Instead: OCR the unique pages of page_store.py's store DIR into DIR/ocr/")
+    args = ap.parse_args()
+
+    if args.page_store:
+        if not (args.page_store / "sources.json").exists():
+            print(f"No page store at: {args.page_store}")
+            sys.exit(1)
+        with ProcessPoolExecutor(max_workers=WORKERS, initializer=_init_ocr_worker) as pool:
+            failed = ocr_page_store(args.page_store, pool)
+        sys.exit(1 if failed else 0)
+
+    base_dir = args.base_dir
     if not base_dir.exists():
         print(f"Folder not found: {base_dir}")
         sys.exit(1)
 
-    # Only files in *this* folder (no recursion), and only those ending with _rotated.pdf
-    pdfs = sorted(p for p in base_dir.glob("*_rotated.pdf") if p.is_file())
+    # Only files in *this* folder (no recursion)
+    if args.rotated_only:
+        pdfs = sorted(p for p in base_dir.glob("*_rotated.pdf") if p.is_file())
+    else:
+        # the originals; a hand-made _rotated copy (or its OCR) is the same scan, so it is not read again
+        pdfs = sorted(p for p in base_dir.glob("*.pdf")
+                      if p.is_file() and not p.stem.endswith(("_rotated", "_ocr", "_ocr.partial")))
 
     if not pdfs:
-        print("No *_rotated.pdf files found in the folder.")
+        print("No PDFs to OCR found in the folder.")
         sys.exit(0)
 
-    processed = 0
-    for pdf in pdfs:
-        # If we already produced an OCR version, skip it
-        # Example: "File_rotated.pdf" -> "File_ocr.pdf"
-        out_name = pdf.name.replace("_rotated.pdf", "_ocr.pdf")
-        out_path = pdf.with_name(out_name)
+    processed = incomplete = 0
+    with ProcessPoolExecutor(max_workers=WORKERS, initializer=_init_ocr_worker) as pool:
+        for pdf in pdfs:
+            # If we already produced an OCR version, skip it
+            # Example: "File_rotated.pdf" -> "File_ocr.pdf"
+            out_name = (pdf.name.replace("_rotated.pdf", "_ocr.pdf") if pdf.stem.endswith("_rotated")
+                        else f"{pdf.stem}_ocr.pdf")
+            out_path = pdf.with_name(out_name)
 
-        # Also skip if user already has an explicit *_rotated_ocr.pdf
-        alt_out_path = pdf.with_name(pdf.stem + "_ocr.pdf")  # fallback name
-        if out_path.exists() or alt_out_path.exists():
-            print(f"   ⏭️  Skipping (already OCR’d): {pdf.name}")
-            continue
+            # Also skip if user already has an explicit *_rotated_ocr.pdf
+            alt_out_path = pdf.with_name(pdf.stem + "_ocr.pdf")  # fallback name
+            if out_path.exists() or alt_out_path.exists():
+                print(f"   ⏭️  Skipping (already OCR’d): {pdf.name}")
+                continue
 
-        try:
-            ocr_pdf(pdf, out_path)
-            processed += 1
-        except Exception as e:
-            print(f"   ❌ Error on {pdf.name}: {e}")
+            try:
+                if ocr_pdf(pdf, out_path, pool):
+                    processed += 1
+                else:
+                    incomplete += 1
+            except Exception as e:
+                print(f"   ❌ Error on {pdf.name}: {e}")
+                incomplete += 1
 
     print(f"\n🎉 Done. OCR’d {processed} file(s) in: {base_dir}")
+    if incomplete:
+        print(f"   ❌ {incomplete} file(s) incomplete or failed; rerun to retry them")
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
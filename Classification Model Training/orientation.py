@@ -0,0 +1,72 @@
+from pathlib import Path
+from pdf2image import convert_from_path
+from PyPDF2 import PdfReader
+import pytesseract
+
+# Shared by ocr_clean_pdfs.py and ocr_from_rotated_pdfs.py.
+# Orientation is decided on a small grayscale thumbnail with tesseract OSD, BEFORE the one
+# full-resolution render, so pages are never rendered twice and no rotate script has to be
+# run by hand first.
+THUMB_DPI = 72            # thumbnail resolution for normal-sized pages
+THUMB_MAX_PX = 2000       # ... capped so the long edge of huge scans stays around this
+THUMB_CHUNK = 32          # thumbnails rendered per pdftoppm call
+MIN_OSD_CONFIDENCE = 2.0  # below this tesseract's orientation guess is treated as "don't know"
+
+def displayed_size(page):
+    """(width, height) in points of the box a page is shown and rendered at: its cropbox,
+    with width and height swapped for /Rotate 90/270."""
+    w, h = float(page.cropbox.width), float(page.cropbox.height)
+    return (h, w) if (page.rotation or 0) % 180 else (w, h)
+
+def thumb_dpi(width_pt: float, height_pt: float) -> int:
+    """Thumbnail DPI for a page of the given displayed size (points, see displayed_size)."""
+    long_in = max(width_pt, height_pt) / 72
+    return max(10, min(THUMB_DPI, int(THUMB_MAX_PX / max(long_in, 1e-6))))
+
+def osd_rotation(img):
+    """
+    Clockwise degrees (0/90/180/270) that make the page upright, per tesseract OSD;
+    None when OSD fails (too little text) or is not confident.
+    """
+    try:
+        osd = pytesseract.image_to_osd(img, config="--psm 0", output_type=pytesseract.Output.DICT)
+    except pytesseract.TesseractError:
+        return None
+    if float(osd.get("orientation_conf", 0)) < MIN_OSD_CONFIDENCE:
+        return None
+    return int(osd["rotate"]) % 360
+
+def upright(img, rotation):
+    """Apply an osd_rotation() result to a rendered page (PIL rotates counter-clockwise)."""
+    return img.rotate(-rotation, expand=True) if rotation else img
+
+def render_thumbnails(pdf_path: Path, first: int, last: int, dpis):
+    """Grayscale thumbnails of pages first..last; dpis[i] is the DPI for page first + i."""
+    thumbs = []
+    i = 0
+    while i < len(dpis):
+        j = i
+        while j + 1 < len(dpis) and dpis[j + 1] == dpis[i]:
+            j += 1
+        thumbs += convert_from_path(pdf_path, dpi=dpis[i], first_page=first + i, last_page=first + j,
+                                    grayscale=True, use_cropbox=True)
+        i = j + 1
+    return thumbs
+
+def detect_rotations(pdf_path: Path, pool=None):
+    """
+    OSD rotation for every page of a PDF -> [rotation or None, ...] in page order.
+    Thumbnails are rendered THUMB_CHUNK pages at a time; with a process pool the OSD calls
+    for a chunk run in parallel.
+    """
+    pages = PdfReader(pdf_path).pages
+    dpis = [thumb_dpi(*displayed_size(p)) for p in pages]
+    rotations = []
+    for start in range(0, len(dpis), THUMB_CHUNK):
+        chunk = dpis[start:start + THUMB_CHUNK]
+        thumbs = render_thumbnails(pdf_path, start + 1, start + len(chunk), chunk)
+        if pool is None:
+            rotations += [osd_rotation(t) for t in thumbs]
+        else:
+            rotations += list(pool.map(osd_rotation, thumbs))
+    return rotations
@@ -0,0 +1,341 @@
+import argparse
+import hashlib
+import io
+import json
+import os
+import re
+from pathlib import Path
+from PyPDF2 import PdfReader, PdfWriter
+from PyPDF2.generic import IndirectObject, StreamObject
+
+# === CONFIGURATION ===
+BASE_DIR = Path(r"C:\Users\DanShao\OneDrive - Komar Alliance\Production Logs\Classification Model Training")
+STORE_NAME = "page_store"
+# Page entries that decide what a page looks like. /Rotate is left out on purpose: AW1 training set.pdf,
+# AW1 training set_rotated.pdf, Aw1/Aw1_page1.pdf and 2025-10-07 Training v2/Aw1_page1_rotated.pdf all
+# hold the same scan and differ only in /Rotate, so they must land on the same key.
+PAGE_KEYS = ("/Contents", "/Resources", "/MediaBox", "/CropBox")
+SKIP_RX = re.compile(r"_ocr(\.partial)?$", re.IGNORECASE)   # OCR'd copies carry a text layer; regenerate them instead
+OCR_FONT = "/GlyphLessFont"   # tesseract's invisible text layer: also marks OCR'd pages saved under other names
+KEY_VERSION = 2               # bump when page_key changes, so unchanged sources are re-hashed
+
+# Store layout (all under <base_dir>/page_store):
+#   pages/ab/<key>.pdf     one-page PDF per unique page, /Rotate 0
+#   sources.json           every ingested PDF: size/mtime + [key, rotate] per page (provenance, rerun skips)
+#   machines/<Machine>.json  the per-machine training set: ordered unique pages with their rotations
+#   ocr/ab/<key>_r<rot>.pdf  text-searchable OCR of a stored page shown at <rot> (ocr_from_rotated_pdfs.py
+#                            --page-store); page_classifier.py train --page-store reads its text from here
+
+# === Page keys ===
+def _feed(h, obj, seen):
+    """Canonical hash of a PDF object graph: dict keys sorted, stream bytes as stored, cycles cut."""
+    if isinstance(obj, IndirectObject):
+        ref = (obj.idnum, obj.generation)
+        if ref in seen:
+            h.update(b"R")
+            return
+        seen.add(ref)
+        obj = obj.get_object()
+    if isinstance(obj, StreamObject):
+        h.update(b"S")
+        _feed(h, {k: v for k, v in obj.items() if k not in ("/Length", "/Filter", "/DecodeParms")}, seen)
+        h.update(_stream_bytes(obj))
+    elif isinstance(obj, dict):
+        h.update(b"{")
+        for k in sorted(obj):
+            if k != "/Parent":
+                h.update(k.encode("utf-8"))
+                _feed(h, obj[k], seen)
+        h.update(b"}")
+    elif isinstance(obj, list):
+        h.update(b"[")
+        for v in obj:
+            _feed(h, v, seen)
+        h.update(b"]")
+    else:
+        h.update(repr(obj).encode("utf-8"))
+
+def _stream_bytes(stream) -> bytes:
+    """
+    Bytes a stream is hashed by. Content streams are decoded, so a page keeps its key when a writer
+    re-compresses them. Images are hashed as stored: writers copy them verbatim, decoding a scan in pure
+    Python costs seconds per page, and PyPDF2 cannot undo the PNG predictor of tesseract's images.
+    """
+    if stream.get("/Subtype") != "/Image":
+        return stream.get_data()
+    buf = io.BytesIO()
+    stream.write_to_stream(buf, None)
+    return buf.getvalue().partition(b"\nstream\n")[2]
+
+def is_ocr_page(page) -> bool:
+    """True for a page carrying tesseract's text layer, whatever its file is called."""
+    resources = page.get("/Resources")
+    fonts = resources.get_object().get("/Font") if resources else None
+    return bool(fonts) and any(f.get_object().get("/BaseFont") == OCR_FONT for f in fonts.get_object().values())
+
+def page_key(page) -> str:
+    h = hashlib.blake2b(digest_size=20)
+    _feed(h, {k: page[k] for k in PAGE_KEYS if k in page}, set())
+    return h.hexdigest()
+
+# === Naming ===
+def canonical_machine(name: str) -> str:
+    """'Cutter 1' / 'cutter1' / 'Die-Cutter' -> 'Cutter1' / 'Cutter1' / 'Diecutter' (the Combined Training Sets folder names)."""
+    return re.sub(r"[\s_-]+", "", name).title()
+
+def classify_source(pdf_path: Path):
+    """(machine, is_rotated_copy) from the naming used by prepare_training_pdfs.py (and the old rotate/split scripts)."""
+    stem = pdf_path.stem
+    rotated = bool(re.search(r"_rotated$", stem, re.IGNORECASE))
+    stem = re.sub(r"(_rotated)+$", "", stem, flags=re.IGNORECASE)
+    if "training set" in stem.lower():
+        name = stem.lower().split("training set")[0]
+    elif re.search(r"_page\d+$", stem, re.IGNORECASE):
+        name = re.sub(r"_page\d+$", "", stem, flags=re.IGNORECASE)
+    else:
+        name = pdf_path.parent.name
+    return canonical_machine(name), rotated
+
+def _natural(path: Path):
+    # training-set PDFs first (they define page order), then page files in page-number order
+    is_page_file = bool(re.search(r"_page\d+", path.stem, re.IGNORECASE))
+    return (is_page_file, [int(t) if t.isdigit() else t.lower() for t in re.split(r"(\d+)", path.as_posix())])
+
+# === Store ===
+class PageStore:
+    def __init__(self, store_dir: Path):
+        self.dir = Path(store_dir)
+        self.sources_path = self.dir / "sources.json"
+        self.sources = json.loads(self.sources_path.read_text(encoding="utf-8")) if self.sources_path.exists() else {}
+
+    def page_path(self, key: str) -> Path:
+        return self.dir / "pages" / key[:2] / f"{key}.pdf"
+
+    def ocr_path(self, key: str, rotate: int) -> Path:
+        return self.dir / "ocr" / key[:2] / f"{key}_r{rotate}.pdf"
+
+    def _put(self, key: str, page) -> bool:
+        path = self.page_path(key)
+        if path.exists():
+            return False
+        writer = PdfWriter()
+        writer.add_page(page)
+        writer.pages[0].rotation = 0
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            writer.write(f)
+        os.replace(tmp, path)
+        return True
+
+    def ingest(self, pdf_path: Path, rel: str):
+        """
+        Hash every page of one PDF and store the ones not seen before; OCR'd pages are left out (their
+        scan is stored from the original, and the OCR is regenerated). Returns (pages, new pages).
+        """
+        reader = PdfReader(pdf_path)
+        pages, new = [], 0
+        for page in reader.pages:
+            if is_ocr_page(page):
+                continue
+            key = page_key(page)
+            new += self._put(key, page)
+            pages.append([key, page.rotation % 360])
+        machine, rotated = classify_source(pdf_path)
+        st = pdf_path.stat()
+        self.sources[rel] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "key_version": KEY_VERSION,
+                             "machine": machine, "rotated": rotated, "pages": pages}
+        return len(pages), new
+
+    def is_current(self, pdf_path: Path, rel: str) -> bool:
+        entry = self.sources.get(rel)
+        if not entry:
+            return False
+        st = pdf_path.stat()
+        return (entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns
+                and entry.get("key_version") == KEY_VERSION)
+
+    def machine_sets(self):
+        """
+        {machine: [{"key", "rotate", "upright"}, ...]} in first-seen order.
+        rotate = /Rotate in the original (un-rotated) copies, upright = /Rotate in the _rotated
+        copies, or None when no rotated copy of that page was ever ingested.
+        """
+        sets = {}
+        for rel in sorted(self.sources, key=lambda r: _natural(Path(r))):
+            entry = self.sources[rel]
+            if not entry["pages"]:   # nothing but OCR'd pages
+                continue
+            pages = sets.setdefault(entry["machine"], {})
+            for key, rot in entry["pages"]:
+                page = pages.setdefault(key, {"key": key, "rotate": None, "upright": None})
+                slot = "upright" if entry["rotated"] else "rotate"
+                if page[slot] is None:
+                    page[slot] = rot
+        for pages in sets.values():
+            for page in pages.values():
+                if page["rotate"] is None:   # only a rotated copy was ever seen
+                    page["rotate"] = page["upright"]
+        return {m: list(pages.values()) for m, pages in sets.items()}
+
+    def save(self):
+        self.dir.mkdir(parents=True, exist_ok=True)
+        _write_json(self.sources_path, self.sources)
+        machines_dir = self.dir / "machines"
+        machines_dir.mkdir(exist_ok=True)
+        sets = self.machine_sets()
+        for old in machines_dir.glob("*.json"):
+            if old.stem not in sets:
+                old.unlink()
+        for machine, pages in sets.items():
+            _write_json(machines_dir / f"{machine}.json", {"machine": machine, "pages": pages})
+
+    def load_machine(self, machine: str):
+        path = self.dir / "machines" / f"{canonical_machine(machine)}.json"
+        return json.loads(path.read_text(encoding="utf-8"))["pages"]
+
+    def machines(self):
+        return sorted(p.stem for p in (self.dir / "machines").glob("*.json"))
+
+    def iter_pages(self, machine: str, upright: bool = False):
+        """
+        Yield (page_no, PageObject) for one machine's training set, each page read from the store
+        once and rotated as in the original copies (upright=False) or the _rotated copies (upright=True).
+        """
+        for n, entry in enumerate(self.load_machine(machine), start=1):
+            page = PdfReader(self.page_path(entry["key"])).pages[0]
+            rot = entry["upright"] if upright and entry["upright"] is not None else entry["rotate"]
+            if rot:
+                page.rotation = rot
+            yield n, page
+
+    def upright_pages(self, machine: str):
+        """[(key, rotation), ...] of one machine's training set as the OCR/classifier inputs see it:
+        the _rotated copies' rotation, else the original one."""
+        return [(e["key"], e["upright"] if e["upright"] is not None else e["rotate"])
+                for e in self.load_machine(machine)]
+
+    def gc(self):
+        """Delete stored pages (and their OCR) no ingested source refers to any more. Returns the number removed."""
+        live = {key for entry in self.sources.values() for key, _ in entry["pages"]}
+        removed = 0
+        for path in (self.dir / "pages").glob("*/*.pdf"):
+            if path.stem not in live:
+                path.unlink()
+                removed += 1
+        for path in (self.dir / "ocr").glob("*/*.pdf"):
+            if path.stem.rsplit("_r", 1)[0] not in live:
+                path.unlink()
+        return removed
+
+def _write_json(path: Path, data):
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(data, indent=2, sort_keys=True), encoding="utf-8")
+    os.replace(tmp, path)
+
+def _write_pdf(writer: PdfWriter, path: Path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "wb") as f:
+        writer.write(f)
+
+# === Views ===
+def materialize(store: PageStore, machine: str, view: str, out_dir: Path):
+    """
+    Write one machine's training set back out as regular PDFs:
+      split   -> <out>/<Machine>/<Machine>_page<N>.pdf          (original rotation, like prepare_training_pdfs.py)
+      upright -> <out>/<Machine>/<Machine>_page<N>_rotated.pdf  (rotation of the _rotated copies)
+      merged  -> <out>/<Machine> training set.pdf
+      rotated -> <out>/<Machine> training set_rotated.pdf
+    """
+    upright = view in ("upright", "rotated")
+    whole = PdfWriter() if view in ("merged", "rotated") else None
+    written = 0
+    for n, page in store.iter_pages(machine, upright=upright):
+        if whole is not None:
+            whole.add_page(page)
+            continue
+        single = PdfWriter()
+        single.add_page(page)
+        suffix = "_rotated" if upright else ""
+        _write_pdf(single, out_dir / machine / f"{machine}_page{n}{suffix}.pdf")
+        written += 1
+    if whole is not None:
+        suffix = "_rotated" if upright else ""
+        _write_pdf(whole, out_dir / f"{machine} training set{suffix}.pdf")
+        written = 1
+    return written
+
+# === MAIN LOGIC ===
+def cmd_ingest(args, store: PageStore):
+    base_dir = Path(args.base_dir)
+    pdfs = sorted((p for p in base_dir.rglob("*.pdf")
+                   if p.is_file() and store.dir not in p.parents and not SKIP_RX.search(p.stem)),
+                  key=_natural)
+    total = new = skipped = 0
+    for pdf in pdfs:
+        rel = pdf.relative_to(base_dir).as_posix()
+        if not args.force and store.is_current(pdf, rel):
+            skipped += 1
+            continue
+        try:
+            n, added = store.ingest(pdf, rel)
+            total += n
+            new += added
+            print(f"✅ {rel}: {n} page(s), {added} new")
+        except Exception as e:
+            print(f"❌ Error ingesting {rel}: {e}")
+    if args.forget_missing:
+        for rel in [r for r in store.sources if not (base_dir / r).exists()]:
+            del store.sources[rel]
+    store.save()
+    print(f"\n🎉 {total} page(s) read, {new} new in the store, {skipped} file(s) unchanged.")
+
+def cmd_materialize(args, store: PageStore):
+    out_dir = Path(args.out)
+    for machine in args.machine or store.machines():
+        n = materialize(store, canonical_machine(machine), args.view, out_dir)
+        print(f"✅ {machine}: {n} file(s) → {out_dir}")
+
+def cmd_stats(args, store: PageStore):
+    base_dir = Path(args.base_dir)
+    src_bytes = sum(e["size"] for e in store.sources.values())
+    src_pages = sum(len(e["pages"]) for e in store.sources.values())
+    blobs = list((store.dir / "pages").glob("*/*.pdf"))
+    blob_bytes = sum(p.stat().st_size for p in blobs)
+    print(f"Sources : {len(store.sources)} PDF(s), {src_pages} page(s), {src_bytes / 1e6:.1f} MB under {base_dir}")
+    print(f"Store   : {len(blobs)} unique page(s), {blob_bytes / 1e6:.1f} MB")
+    for machine, pages in sorted(store.machine_sets().items()):
+        missing = sum(p["upright"] is None for p in pages)
+        print(f"  {machine:<10} {len(pages):>4} page(s)" + (f"  ({missing} without a rotated copy)" if missing else ""))
+
+def cmd_gc(args, store: PageStore):
+    print(f"🧹 Removed {store.gc()} unreferenced page(s).")
+
+def main():
+    ap = argparse.ArgumentParser(description="Content-addressed store for the training-set PDF pages: "
+                                             "each unique page is kept once, training sets are manifests.")
+    ap.add_argument("--base-dir", default=str(BASE_DIR), help="Classification Model Training folder")
+    ap.add_argument("--store", default=None, help=f"Store folder (default: <base-dir>/{STORE_NAME})")
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("ingest", help="Hash every PDF page under base-dir into the store and rebuild the machine manifests")
+    p.add_argument("--force", action="store_true", help="Re-read files even if size/mtime are unchanged")
+    p.add_argument("--forget-missing", action="store_true",
+                   help="Drop sources that no longer exist on disk (run 'gc' afterwards to free their pages)")
+    p.set_defaults(func=cmd_ingest)
+
+    p = sub.add_parser("materialize", help="Write training sets back out as PDFs")
+    p.add_argument("view", choices=["split", "upright", "merged", "rotated"])
+    p.add_argument("--machine", action="append", help="Machine to write (repeatable; default: all)")
+    p.add_argument("--out", required=True, help="Output folder")
+    p.set_defaults(func=cmd_materialize)
+
+    sub.add_parser("stats", help="Pages and bytes before/after de-duplication").set_defaults(func=cmd_stats)
+    sub.add_parser("gc", help="Delete stored pages no source refers to").set_defaults(func=cmd_gc)
+
+    args = ap.parse_args()
+    store = PageStore(Path(args.store) if args.store else Path(args.base_dir) / STORE_NAME)
+    args.func(args, store)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+import argparse
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from PyPDF2 import PdfReader, PdfWriter
+
+# === CONFIGURATION ===
+BASE_DIR = Path(r"C:\Users\DanShao\OneDrive - Komar Alliance\Production Logs\Classification Model Training")
+ROTATION = "auto"          # "auto" = tesseract OSD per page, or a fixed 0 / 90 / 180 / 270 (clockwise)
+MANIFEST_NAME = "prepare_manifest.json"
+WORKERS = os.cpu_count() or 1
+
+# Outputs of this tool, of the OCR scripts and of the rotate/split scripts it replaced: never treated as sources,
+# so nothing gets rotated twice (Aw1_page1_rotated_rotated.pdf).
+DERIVED_RX = re.compile(r"(_rotated|_ocr)$|_page\d+(_rotated)*$", re.IGNORECASE)
+
+# === Helpers ===
+def machine_name(pdf_path: Path) -> str:
+    """'Cutter 1 training set merged.pdf' -> 'Cutter 1' (the machine folder the pages go to)."""
+    name_part = pdf_path.stem.lower().split("training set")[0].strip()
+    return name_part.replace("-", "").replace("_", "").strip().title()
+
+def _write_pdf(writer: PdfWriter, path: Path):
+    # temp file + rename: an interrupted run never leaves a half-written output that looks done
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        writer.write(f)
+    os.replace(tmp, path)
+
+def page_rotations(pdf_path: Path, n_pages: int, rotation):
+    if rotation != "auto":
+        return [int(rotation) % 360] * n_pages
+    from orientation import detect_rotations   # needs pdftoppm + tesseract; only for "auto"
+    return [r or 0 for r in detect_rotations(pdf_path)]
+
+def page_subdirs(sources):
+    """
+    {source: subfolder or None}. Sources that resolve to the same machine would all write
+    <Machine>/<Machine>_page<N>.pdf (in parallel, one silently replacing the other), so each
+    of them gets its own <Machine>/<source stem>/ folder; file names, and so the labels the
+    classifier and page store read from them, stay the same.
+    """
+    by_machine = {}
+    for src in sources:
+        by_machine.setdefault(machine_name(src), []).append(src)
+    return {src: (src.stem if len(group) > 1 else None) for group in by_machine.values() for src in group}
+
+def process_source(pdf_path: Path, base_dir: Path, rotation, rotated_copy: bool, subdir=None):
+    """
+    Worker: read one source PDF once; rotate each page (lossless /Rotate) and write it as
+    <Machine>/[<subdir>/]<Machine>_page<N>.pdf, plus <name>_rotated.pdf when rotated_copy is set.
+    Returns the manifest entry for this source.
+    """
+    reader = PdfReader(pdf_path)
+    rotations = page_rotations(pdf_path, len(reader.pages), rotation)
+    machine = machine_name(pdf_path)
+    out_dir = base_dir / machine / subdir if subdir else base_dir / machine
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    outputs = []
+    whole = PdfWriter() if rotated_copy else None
+    for i, (page, rot) in enumerate(zip(reader.pages, rotations), start=1):
+        if rot:
+            page.rotation = (page.rotation + rot) % 360   # page.rotate() lets /Rotate grow past 360
+        single = PdfWriter()
+        single.add_page(page)
+        out_path = out_dir / f"{machine}_page{i}.pdf"
+        _write_pdf(single, out_path)
+        outputs.append(out_path)
+        if whole is not None:
+            whole.add_page(page)
+    if whole is not None:
+        out_path = pdf_path.with_name(f"{pdf_path.stem}_rotated.pdf")
+        _write_pdf(whole, out_path)
+        outputs.append(out_path)
+
+    st = pdf_path.stat()
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "rotation": str(rotation),
+            "rotated_copy": rotated_copy, "subdir": subdir, "page_rotations": rotations,
+            "outputs": [p.relative_to(base_dir).as_posix() for p in outputs]}
+
+# === Manifest ===
+def load_manifest(path: Path) -> dict:
+    if path.exists():
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except ValueError:
+            print(f"⚠️  Unreadable manifest {path.name}; rebuilding everything.")
+    return {}
+
+def save_manifest(path: Path, manifest: dict):
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(manifest, indent=2, sort_keys=True), encoding="utf-8")
+    os.replace(tmp, path)
+
+def is_done(entry, pdf_path: Path, base_dir: Path, rotation, rotated_copy: bool, subdir=None) -> bool:
+    """Up to date = same size/mtime, same settings, every output still present (stat calls only)."""
+    if not entry:
+        return False
+    st = pdf_path.stat()
+    return (entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns
+            and entry["rotation"] == str(rotation) and entry["rotated_copy"] == rotated_copy
+            and entry.get("subdir") == subdir
+            and all((base_dir / rel).exists() for rel in entry["outputs"]))
+
+def find_sources(base_dir: Path, manifest: dict, recursive: bool):
+    produced = {rel for entry in manifest.values() for rel in entry["outputs"]}
+    pattern = "**/*.pdf" if recursive else "*.pdf"
+    sources = []
+    for p in sorted(base_dir.glob(pattern)):
+        rel = p.relative_to(base_dir).as_posix()
+        if p.is_file() and rel not in produced and not DERIVED_RX.search(p.stem):
+            sources.append(p)
+    return sources
+
+# === MAIN LOGIC ===
+def main():
+    ap = argparse.ArgumentParser(description="Rotate + split training PDFs in one pass per file, in parallel, "
+                                             "skipping files the manifest says are already done.")
+    ap.add_argument("base_dir", nargs="?", default=str(BASE_DIR), help="Folder holding the '<machine> training set' PDFs")
+    ap.add_argument("--rotation", default=ROTATION, choices=["auto", "0", "90", "180", "270"],
+                    help="auto = tesseract OSD per page; otherwise clockwise degrees for every page")
+    ap.add_argument("--rotated-copy", action="store_true", help="Also write <name>_rotated.pdf next to each source")
+    ap.add_argument("--recursive", action="store_true", help="Also look for sources in subfolders")
+    ap.add_argument("--workers", type=int, default=WORKERS, help="Files processed in parallel")
+    ap.add_argument("--force", action="store_true", help="Ignore the manifest and redo every source")
+    args = ap.parse_args()
+
+    base_dir = Path(args.base_dir)
+    manifest_path = base_dir / MANIFEST_NAME
+    manifest = {} if args.force else load_manifest(manifest_path)
+
+    sources = find_sources(base_dir, manifest, args.recursive)
+    subdirs = page_subdirs(sources)
+    todo, skipped = [], 0
+    for src in sources:
+        rel = src.relative_to(base_dir).as_posix()
+        if is_done(manifest.get(rel), src, base_dir, args.rotation, args.rotated_copy, subdirs[src]):
+            skipped += 1
+        else:
+            todo.append(src)
+    print(f"🔍 {len(todo)} PDF(s) to process, {skipped} already done (manifest) in {base_dir}")
+
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        jobs = {src: pool.submit(process_source, src, base_dir, args.rotation, args.rotated_copy, subdirs[src])
+                for src in todo}
+        for src, job in jobs.items():
+            rel = src.relative_to(base_dir).as_posix()
+            try:
+                old = manifest.get(rel)
+                manifest[rel] = job.result()
+                print(f"✅ {src.name} → {len(manifest[rel]['outputs'])} file(s)")
+                if old:   # e.g. pages that moved into a per-source folder: drop the old copies
+                    for stale in set(old["outputs"]) - set(manifest[rel]["outputs"]):
+                        (base_dir / stale).unlink(missing_ok=True)
+            except Exception as e:
+                manifest.pop(rel, None)
+                print(f"❌ Error processing {src.name}: {e}")
+            save_manifest(manifest_path, manifest)   # after each file, so an interrupted run keeps its progress
+
+    print("\n🎉 Done.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import io
+import sys
+from concurrent.futures import Future
+from pathlib import Path
+
+from PIL import Image
+from PyPDF2 import PdfReader, PdfWriter
+
+HERE = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(HERE))
+
+import ocr_from_rotated_pdfs as ocr
+
+def blank_pdf_bytes() -> bytes:
+    writer = PdfWriter()
+    writer.add_blank_page(width=72, height=72)
+    buf = io.BytesIO()
+    writer.write(buf)
+    return buf.getvalue()
+
+class InlinePool:
+    """Stands in for the tesseract pool: every page OCRs to a blank one-page PDF."""
+    def submit(self, fn, *args):
+        fut = Future()
+        fut.set_result((blank_pdf_bytes(), False))
+        return fut
+
+def fake_run(monkeypatch, unrendered=()):
+    monkeypatch.setattr(ocr, "AUTO_ORIENT", False)
+    monkeypatch.setattr(ocr, "plan_pages", lambda pdf: [(1, 150, 10, 10), (2, 150, 10, 10), (3, 150, 10, 10)])
+    monkeypatch.setattr(ocr, "render_chunk", lambda pdf, chunk: [
+        (n, dpi, None if n in unrendered else Image.new("L", (10, 10))) for n, dpi, _, _ in chunk])
+
+def test_unrendered_page_keeps_output_unwritten(tmp_path, monkeypatch):
+    src, out = tmp_path / "Log_rotated.pdf", tmp_path / "Log_ocr.pdf"
+    fake_run(monkeypatch, unrendered={2})
+    assert ocr.ocr_pdf(src, out, InlinePool()) is False
+    assert not out.exists()
+    assert len(PdfReader(ocr.partial_path(out)).pages) == 2
+
+    # next run renders every page: the full output replaces the partial one
+    fake_run(monkeypatch)
+    assert ocr.ocr_pdf(src, out, InlinePool()) is True
+    assert len(PdfReader(out).pages) == 3
+    assert not ocr.partial_path(out).exists()
+
+class NoPool:
+    def __init__(self, *args, **kwargs):
+        pass
+    def __enter__(self):
+        return self
+    def __exit__(self, *exc):
+        return False
+
+def ocr_inputs(tmp_path, monkeypatch, *argv):
+    for name in ("Log.pdf", "Log_rotated.pdf", "Other.pdf", "Other_ocr.pdf",
+                 "New_ocr.partial.pdf"):
+        (tmp_path / name).write_bytes(blank_pdf_bytes())
+    seen = []
+    monkeypatch.setattr(ocr, "ProcessPoolExecutor", NoPool)
+    monkeypatch.setattr(ocr, "ocr_pdf", lambda src, out, pool: seen.append((src.name, out.name)) or True)
+    monkeypatch.setattr(sys, "argv", ["ocr_from_rotated_pdfs.py", str(tmp_path), *argv])
+    ocr.main()
+    return seen
+
+def test_originals_are_the_default_input(tmp_path, monkeypatch):
+    # Log_rotated.pdf is the same scan as Log.pdf; Other.pdf is already OCR'd
+    assert ocr_inputs(tmp_path, monkeypatch) == [("Log.pdf", "Log_ocr.pdf")]
+
+def test_rotated_only_reads_the_rotated_copies(tmp_path, monkeypatch):
+    assert ocr_inputs(tmp_path, monkeypatch, "--rotated-only") == [("Log_rotated.pdf", "Log_ocr.pdf")]
@@ -0,0 +1,38 @@
+import sys
+from pathlib import Path
+
+from PyPDF2 import PageObject, PdfReader, PdfWriter
+from PyPDF2.generic import RectangleObject
+
+HERE = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(HERE))
+
+import orientation
+
+def cropped_pdf(path: Path, rotate: int):
+    """One 11x17 in page (mediabox) whose cropbox is 8.5x11 in, shown at /Rotate rotate."""
+    page = PageObject.create_blank_page(width=11 * 72, height=17 * 72)
+    page.cropbox = RectangleObject([0, 0, 8.5 * 72, 11 * 72])
+    page.rotate(rotate)
+    writer = PdfWriter()
+    writer.add_page(page)
+    with open(path, "wb") as f:
+        writer.write(f)
+    return path
+
+def test_displayed_size_is_the_rotated_cropbox(tmp_path):
+    upright = PdfReader(cropped_pdf(tmp_path / "a.pdf", 0)).pages[0]
+    turned = PdfReader(cropped_pdf(tmp_path / "b.pdf", 90)).pages[0]
+    assert orientation.displayed_size(upright) == (8.5 * 72, 11 * 72)
+    assert orientation.displayed_size(turned) == (11 * 72, 8.5 * 72)
+
+def test_thumbnails_are_sized_from_the_cropbox(tmp_path, monkeypatch):
+    pdf = cropped_pdf(tmp_path / "a.pdf", 90)
+    seen = []
+    monkeypatch.setattr(orientation, "render_thumbnails",
+                        lambda path, first, last, dpis: seen.extend(dpis) or ["thumb"] * len(dpis))
+    monkeypatch.setattr(orientation, "osd_rotation", lambda img: 90)
+    monkeypatch.setattr(orientation, "THUMB_MAX_PX", 550)
+    assert orientation.detect_rotations(pdf) == [90]
+    # 11 in long edge of the cropbox -> 50 dpi; the 17 in mediabox would have given 32
+    assert seen == [50]
@@ -0,0 +1,81 @@
+import sys
+from pathlib import Path
+
+from PyPDF2 import PageObject, PdfReader, PdfWriter
+from PyPDF2.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+HERE = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(HERE))
+
+import page_store as ps
+
+def make_page(text: bytes, ocr=False, compress=False):
+    page = PageObject.create_blank_page(width=612, height=792)
+    content = DecodedStreamObject()
+    content.set_data(text)
+    page[NameObject("/Contents")] = content.flate_encode() if compress else content
+    if ocr:
+        font = DictionaryObject({NameObject("/Type"): NameObject("/Font"),
+                                 NameObject("/BaseFont"): NameObject(ps.OCR_FONT)})
+        page[NameObject("/Resources")] = DictionaryObject(
+            {NameObject("/Font"): DictionaryObject({NameObject("/f-0-0"): font})})
+    return page
+
+def write_pdf(path: Path, pages, rotate=0):
+    writer = PdfWriter()
+    for page in pages:
+        writer.add_page(page)
+    for page in writer.pages:
+        if rotate:
+            page.rotation = rotate
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "wb") as f:
+        writer.write(f)
+    return path
+
+def keys(path: Path):
+    return [ps.page_key(p) for p in PdfReader(path).pages]
+
+def test_page_key_ignores_rotate_and_recompression(tmp_path):
+    scan = [make_page(b"0 0 m 10 10 l S"), make_page(b"0 0 m 20 20 l S")]
+    plain = write_pdf(tmp_path / "Aw1 training set.pdf", scan)
+    rotated = write_pdf(tmp_path / "Aw1 training set_rotated.pdf", scan, rotate=90)
+    squeezed = write_pdf(tmp_path / "Aw1" / "copy.pdf",
+                         [make_page(b"0 0 m 10 10 l S", compress=True), make_page(b"0 0 m 20 20 l S", compress=True)],
+                         rotate=270)
+    assert keys(plain) == keys(rotated) == keys(squeezed)
+    assert len(set(keys(plain))) == 2
+
+def test_ocr_pages_are_not_ingested(tmp_path):
+    store = ps.PageStore(tmp_path / "store")
+    src = write_pdf(tmp_path / "Aw1" / "Aw1_page1.pdf", [make_page(b"0 0 m 10 10 l S")])
+    ocr = write_pdf(tmp_path / "Aw1_again" / "Aw1_page1.pdf", [make_page(b"0 0 m 10 10 l S", ocr=True)])
+    assert store.ingest(src, "Aw1/Aw1_page1.pdf") == (1, 1)
+    assert store.ingest(ocr, "Aw1_again/Aw1_page1.pdf") == (0, 0)
+    assert [len(pages) for pages in store.machine_sets().values()] == [1]
+    assert ps.SKIP_RX.search("Aw1_page1_ocr") and ps.SKIP_RX.search("Aw1_page1_ocr.partial")
+
+def test_gc_removes_unreferenced_pages_and_their_ocr(tmp_path):
+    store = ps.PageStore(tmp_path / "store")
+    keep = write_pdf(tmp_path / "Jenny" / "Jenny_page1.pdf", [make_page(b"0 0 m 10 10 l S")])
+    drop = write_pdf(tmp_path / "Jenny" / "Jenny_page2.pdf", [make_page(b"0 0 m 30 30 l S")])
+    store.ingest(keep, "Jenny/Jenny_page1.pdf")
+    store.ingest(drop, "Jenny/Jenny_page2.pdf")
+    (kept_key,), (dropped_key,) = keys(keep), keys(drop)
+    for key in (kept_key, dropped_key):
+        store.ocr_path(key, 90).parent.mkdir(parents=True, exist_ok=True)
+        store.ocr_path(key, 90).write_bytes(b"%PDF")
+
+    assert store.gc() == 0
+    del store.sources["Jenny/Jenny_page2.pdf"]
+    assert store.gc() == 1
+    assert store.page_path(kept_key).exists() and store.ocr_path(kept_key, 90).exists()
+    assert not store.page_path(dropped_key).exists() and not store.ocr_path(dropped_key, 90).exists()
+
+def test_sources_hashed_with_an_older_key_are_reread(tmp_path):
+    store = ps.PageStore(tmp_path / "store")
+    src = write_pdf(tmp_path / "Pc1" / "Pc1_page1.pdf", [make_page(b"0 0 m 10 10 l S")])
+    store.ingest(src, "Pc1/Pc1_page1.pdf")
+    assert store.is_current(src, "Pc1/Pc1_page1.pdf")
+    store.sources["Pc1/Pc1_page1.pdf"].pop("key_version")
+    assert not store.is_current(src, "Pc1/Pc1_page1.pdf")
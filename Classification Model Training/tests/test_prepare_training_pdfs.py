@@ -0,0 +1,80 @@
+import sys
+from concurrent.futures import Future
+from pathlib import Path
+
+from PyPDF2 import PdfReader, PdfWriter
+
+HERE = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(HERE))
+
+import prepare_training_pdfs as prep
+
+def write_pdf(path: Path, pages=2):
+    writer = PdfWriter()
+    for _ in range(pages):
+        writer.add_blank_page(width=612, height=792)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "wb") as f:
+        writer.write(f)
+    return path
+
+class InlinePool:
+    """Stands in for the process pool; records which sources were processed."""
+    processed = []
+    def __init__(self, *args, **kwargs):
+        pass
+    def __enter__(self):
+        return self
+    def __exit__(self, *exc):
+        return False
+    def submit(self, fn, src, *args):
+        InlinePool.processed.append(src.name)
+        fut = Future()
+        fut.set_result(fn(src, *args))
+        return fut
+
+def run(monkeypatch, base_dir: Path, *argv):
+    InlinePool.processed = []
+    monkeypatch.setattr(prep, "ProcessPoolExecutor", InlinePool)
+    monkeypatch.setattr(sys, "argv", ["prepare_training_pdfs.py", str(base_dir), "--rotation", "90", *argv])
+    prep.main()
+    return InlinePool.processed
+
+def test_derived_rx_matches_outputs_only():
+    for stem in ("AW1 training set_rotated", "Aw1_page1", "Aw1_page12_rotated", "Aw1_page1_rotated_rotated",
+                 "Jenny training set_ocr", "Pc1_page3_OCR"):
+        assert prep.DERIVED_RX.search(stem), stem
+    for stem in ("AW1 training set", "Cutter 1 training set merged", "page1 notes", "Rotated scans"):
+        assert not prep.DERIVED_RX.search(stem), stem
+
+def test_page_subdirs_only_split_sources_sharing_a_machine(tmp_path):
+    a = tmp_path / "Cutter 1 training set.pdf"
+    b = tmp_path / "Cutter 1 training set merged.pdf"
+    c = tmp_path / "Jenny training set.pdf"
+    assert prep.page_subdirs([a, b, c]) == {a: a.stem, b: b.stem, c: None}
+
+def test_is_done_checks_source_settings_and_outputs(tmp_path):
+    src = write_pdf(tmp_path / "Jenny training set.pdf")
+    entry = prep.process_source(src, tmp_path, "90", False)
+    assert entry["outputs"] == ["Jenny/Jenny_page1.pdf", "Jenny/Jenny_page2.pdf"]
+    assert PdfReader(tmp_path / "Jenny" / "Jenny_page1.pdf").pages[0].rotation == 90
+
+    assert prep.is_done(entry, src, tmp_path, "90", False)
+    assert not prep.is_done(None, src, tmp_path, "90", False)
+    assert not prep.is_done(entry, src, tmp_path, "auto", False)
+    assert not prep.is_done(entry, src, tmp_path, "90", True)
+    assert not prep.is_done(entry, src, tmp_path, "90", False, subdir="Jenny training set")
+    (tmp_path / "Jenny" / "Jenny_page2.pdf").unlink()
+    assert not prep.is_done(entry, src, tmp_path, "90", False)
+
+def test_manifest_skips_done_sources(tmp_path, monkeypatch):
+    write_pdf(tmp_path / "Jenny training set.pdf")
+    write_pdf(tmp_path / "PC1 training set.pdf", pages=1)
+    assert run(monkeypatch, tmp_path) == ["Jenny training set.pdf", "PC1 training set.pdf"]
+    # outputs of the first run are neither sources nor redone
+    assert run(monkeypatch, tmp_path) == []
+
+    write_pdf(tmp_path / "PC1 training set.pdf", pages=3)    # changed source
+    assert run(monkeypatch, tmp_path) == ["PC1 training set.pdf"]
+    assert sorted(p.name for p in (tmp_path / "Pc1").iterdir()) == ["Pc1_page1.pdf", "Pc1_page2.pdf", "Pc1_page3.pdf"]
+    assert run(monkeypatch, tmp_path, "--force") == ["Jenny training set.pdf", "PC1 training set.pdf"]
@@ -0,0 +1,108 @@
+import argparse
+import random
+import re
+import time
+
+from prod_logs_core import flex, compile_machine_matcher, first_machine_hit
+
+# ---------------- Synthetic catalog (100+ machines, same variant families as the real one) ----
+FAMILIES = ["Cutter", "Pc", "Sheeter", "AW", "Press", "Slitter", "Laminator", "Folder", "Rewinder", "Baler"]
+
+def synthetic_catalog(n_machines: int):
+    display_names = []
+    raw_variants = {}
+    i = 0
+    while len(display_names) < n_machines:
+        fam = FAMILIES[i % len(FAMILIES)]
+        n = i // len(FAMILIES) + 1
+        disp = f"{fam}{n}"
+        i += 1
+        display_names.append(disp)
+        up = fam.upper()
+        raw_variants[disp] = {
+            disp, f"{up} {n}", f"{up} #{n}", f"{up}_{n}", f"{up}-{n}",
+            f"{fam} {n}", f"{fam} #{n}", f"{fam}_{n}", f"{fam}-{n}", f"{up}#{n}",
+        }
+    regex_variants = {d: sorted({flex(v) for v in raw_variants[d] if v}) for d in display_names}
+    return display_names, regex_variants
+
+FILLER = ("Date Set Up/ Production # Start Time End Time Master Sheet Size Type of Material "
+          "# of Tabs Cut Sheet Operator Name Shift Total Produced LB Notes down time waste").split()
+
+def synthetic_pages(n_pages: int, display_names, words_per_page=90, seed=7):
+    rnd = random.Random(seed)
+    pages = {}
+    for pg in range(1, n_pages + 1):
+        body = [rnd.choice(FILLER) for _ in range(words_per_page)]
+        roll = rnd.random()
+        if roll < 0.7:
+            # header mention near the top, OCR-ish spacing
+            fam_n = re.match(r"([A-Za-z]+)(\d+)$", rnd.choice(display_names))
+            body.insert(rnd.randint(0, 6), f"{fam_n.group(1).upper()} # {fam_n.group(2)}_")
+        elif roll < 0.85:
+            # mention late in the body
+            body.insert(rnd.randint(60, words_per_page), rnd.choice(display_names))
+        # else: no mention at all (worst case for both approaches)
+        pages[pg] = " ".join(body)
+    return pages
+
+# ---------------- The two regex passes being compared ----------------
+def legacy_regex_pass(pages, display_order, regex_variants):
+    """Previous detect_machine_per_page regex pass: re.search per variant, per machine, per page."""
+    out = {}
+    for pg in sorted(pages):
+        raw = pages[pg]
+        for disp in display_order:
+            if any(re.search(rx, raw, flags=re.IGNORECASE) for rx in regex_variants.get(disp, [])):
+                out[pg] = disp
+                break
+    return out
+
+def compiled_regex_pass(pages, matcher):
+    out = {}
+    for pg in sorted(pages):
+        hit = first_machine_hit(matcher, pages[pg])
+        if hit:
+            out[pg] = hit[0]
+    return out
+
+def best_of(fn, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark per-variant re.search vs the single compiled machine matcher.")
+    ap.add_argument("--pages", type=int, default=500, help="Synthetic pages in the scan")
+    ap.add_argument("--machines", type=int, default=120, help="Machines in the synthetic catalog")
+    ap.add_argument("--repeat", type=int, default=5, help="Runs per approach (best time is reported)")
+    args = ap.parse_args()
+
+    display_order, regex_variants = synthetic_catalog(args.machines)
+    pages = synthetic_pages(args.pages, display_order)
+    n_variants = sum(len(v) for v in regex_variants.values())
+
+    t0 = time.perf_counter()
+    matcher = compile_machine_matcher(display_order, regex_variants)
+    t_compile = time.perf_counter() - t0
+
+    t_legacy, legacy = best_of(lambda: legacy_regex_pass(pages, display_order, regex_variants), args.repeat)
+    t_compiled, compiled = best_of(lambda: compiled_regex_pass(pages, matcher), args.repeat)
+
+    print(f"pages={args.pages} machines={len(display_order)} variants={n_variants}")
+    print(f"  compile matcher : {t_compile * 1000:9.2f} ms (once per run)")
+    print(f"  legacy re.search: {t_legacy * 1000:9.2f} ms  ({len(legacy)} pages matched)")
+    print(f"  compiled matcher: {t_compiled * 1000:9.2f} ms  ({len(compiled)} pages matched)")
+    print(f"  speedup         : {t_legacy / t_compiled:9.1f}x")
+
+    # Legacy picks the first machine in catalog order, the matcher the earliest mention;
+    # on single-mention pages they must agree.
+    diff = [pg for pg in legacy if compiled.get(pg) != legacy[pg]]
+    print(f"  pages where the picks differ: {len(diff)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import argparse
+import random
+import time
+
+import pandas as pd
+
+from prod_logs_core import table_to_dataframe
+
+# ---------------- Previous list-of-lists implementation (for comparison only) ----------------
+def legacy_table_to_dataframe(tbl):
+    cells = tbl.get("cells", []) or []
+    if not cells:
+        return pd.DataFrame()
+    max_row = max(c.get("rowIndex", 0) + c.get("rowSpan", 1) - 1 for c in cells)
+    max_col = max(c.get("columnIndex", 0) + c.get("columnSpan", 1) - 1 for c in cells)
+    grid = [["" for _ in range(max_col + 1)] for _ in range(max_row + 1)]
+    for c in cells:
+        r0 = c.get("rowIndex", 0)
+        c0 = c.get("columnIndex", 0)
+        txt = (c.get("content") or "").strip()
+        grid[r0][c0] = txt
+    df = pd.DataFrame(grid)
+
+    header_idx = None
+    for i, row in df.iterrows():
+        if any(str(x).strip() for x in row.tolist()):
+            header_idx = i
+            break
+    if header_idx is None:
+        return pd.DataFrame()
+
+    header = df.iloc[header_idx].astype(str).str.strip().tolist()
+    seen = {}
+    cols = []
+    for h in header:
+        h2 = h if h else "col"
+        seen[h2] = seen.get(h2, 0) + 1
+        if seen[h2] > 1:
+            h2 = f"{h2}_{seen[h2]}"
+        cols.append(h2)
+
+    body = df.iloc[header_idx + 1:].copy()
+    body.columns = cols
+
+    empty_cols = body.apply(lambda col: col.astype(str).str.strip().eq("").all())
+    body = body.loc[:, ~empty_cols]
+    body = body[~body.apply(lambda row: row.astype(str).str.strip().eq("").all(), axis=1)]
+    return body.reset_index(drop=True)
+
+# ---------------- Synthetic Azure DI table ----------------
+def synthetic_table(n_rows: int, n_cols: int, span_rate=0.03, empty_rate=0.25, seed=11):
+    """Production-log-like table: header row, some blank cells/rows, a few row and column spans."""
+    rnd = random.Random(seed)
+    cells = [{"kind": "columnHeader", "rowIndex": 0, "columnIndex": c, "content": f"Col {c}"} for c in range(n_cols)]
+    covered = set()
+    for r in range(1, n_rows):
+        blank_row = rnd.random() < 0.05
+        for c in range(n_cols):
+            if (r, c) in covered:
+                continue
+            cell = {"rowIndex": r, "columnIndex": c,
+                    "content": "" if blank_row or rnd.random() < empty_rate else f"{rnd.randint(0, 99999):,}"}
+            if rnd.random() < span_rate:
+                rs = rnd.choice([1, 2])
+                cs = rnd.choice([1, 2]) if c + 1 < n_cols else 1
+                rs = min(rs, n_rows - r)
+                if rs > 1:
+                    cell["rowSpan"] = rs
+                if cs > 1:
+                    cell["columnSpan"] = cs
+                covered.update((r + i, c + j) for i in range(rs) for j in range(cs))
+            cells.append(cell)
+    return {"rowCount": n_rows, "columnCount": n_cols, "cells": cells,
+            "boundingRegions": [{"pageNumber": 1}]}
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark table_to_dataframe vs the previous list-of-lists version.")
+    ap.add_argument("--sizes", default="400x25,1000x20,2000x30", help="Comma-separated ROWSxCOLS tables to test")
+    ap.add_argument("--repeat", type=int, default=3, help="Runs per approach (best time is reported)")
+    args = ap.parse_args()
+
+    print(f"{'table':>10} {'cells':>7} {'legacy ms':>10} {'numpy ms':>9} {'speedup':>8}  out shape (legacy / numpy)")
+    for spec in args.sizes.split(","):
+        n_rows, n_cols = (int(x) for x in spec.lower().split("x"))
+        tbl = synthetic_table(n_rows, n_cols)
+        t_old, df_old = best_of(lambda: legacy_table_to_dataframe(tbl), args.repeat)
+        t_new, df_new = best_of(lambda: table_to_dataframe(tbl), args.repeat)
+        print(f"{spec:>10} {len(tbl['cells']):>7} {t_old * 1000:>10.1f} {t_new * 1000:>9.1f} {t_old / t_new:>7.1f}x"
+              f"  {df_old.shape} / {df_new.shape}")
+
+if __name__ == "__main__":
+    main()
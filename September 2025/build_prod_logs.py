@@ -1,270 +1,116 @@
 import argparse
-import json
-import re
 from pathlib import Path
 from collections import defaultdict
 import pandas as pd
-from rapidfuzz import fuzz
 
-# ---------------- Debug helper (machine detection only) ----------------
-def dbg(msg: str):
-    print(f"[MACH-DEBUG] {msg}")
+from prod_logs_core import (
+    DEFAULT_MODEL, HEADER_BAND, MODEL_MIN_PROB, PARQUET_DIRNAME, PROF, build_machine_catalog,
+    coerce_table_types, convert_tables, dbg, detect_machine_per_page, doc_stem, infer_year, iter_di_pages,
+    iter_di_tables, load_classifier, marks_as_text, page_lines_from_di, page_text_from_lines,
+    sanitize_sheet_name, setup_logging, stitch_continuations, write_parquet_dataset, write_profile,
+)
 
-# ---------------- Normalization for fuzzy ----------------
-def normalize(s: str) -> str:
-    s2 = s.lower()
-    s2 = re.sub(r"[_\-]+", " ", s2)
-    s2 = re.sub(r"\s+", " ", s2).strip()
-    return s2
-
-def flex(token: str) -> str:
-    """
-    Turn a token like 'CUTTER # 2' into a forgiving regex that allows
-    spaces/hyphens/underscores to float. Also makes '#' spacing optional.
-
-    NOTE: We do NOT use re.sub with a replacement containing \s here,
-    to avoid 'bad escape \\s' issues. We build the pattern directly.
-    """
-    token = token.strip()
-    if not token:
-        return ""
-    parts = re.split(r"[ \-_]+", token)                 # split on separators
-    parts_esc = [re.escape(p) for p in parts if p]      # escape each literal
-    pattern = r"[\s\-_]*".join(parts_esc)               # join with flexible class
-    pattern = pattern.replace(r"\#", r"\s*#\s*")        # optional spaces around '#'
-    return pattern
-
-# ---------------- Build page text from lines (with enhanced debug) ----------------
-def page_text_from_lines(analyze_result: dict):
-    """
-    Returns dict[pageNumber] = concatenated line content for that page.
-    Also logs the first 10 raw line.contents for each page.
-    """
-    pages = analyze_result.get("pages") or []
-    out = {}
-    for p in pages:
-        pg = p.get("pageNumber")
-        lines = p.get("lines") or []
-        line_texts = [(ln.get("content") or "").strip() for ln in lines if ln.get("content")]
-        text = " ".join(line_texts)
-        out[pg] = text
-
-        # ---- DEBUG: show first 10 raw line contents verbatim ----
-        dbg(f"Page {pg}: lines={len(line_texts)}, text_len={len(text)}")
-        first10 = line_texts[:10]
-        for i, t in enumerate(first10, 1):
-            dbg(f"  line[{i}]: {repr(t)}")
-        if len(line_texts) > 10:
-            dbg(f"  ... ({len(line_texts) - 10} more lines)")
-    return out
-
-# ---------------- Hand-coded machine list and variant patterns ----------------
-def build_machine_catalog():
+# ---------------- Tables per page (the first three pages become the three tabs) ----------------
+def collect_tables_by_page(tables, page_to_machine: dict, year=None, texts=(), source=None):
     """
-    Hard-coded machine display names + regex variants for messy OCR.
-    Returns:
-      display_names: list[str]
-      regex_variants: dict[str, set[str]]  (each value is ready-to-use regex)
+    tables: iterable of analyzeResult.tables[*] (e.g. iter_di_tables(path)).
+    Each table is converted once and filed under its FIRST page only (a table spanning pages
+    used to be written once per page); continuations on the next page are stitched onto it,
+    then columns are typed (coerce_table_types). Empty tables are dropped before stitching
+    (convert_tables), so they neither split a continuation from its table nor get written.
+    Dates without a year take `year` (--year), else infer_year(tables, texts, source).
+    Returns dict[page] -> list of DataFrames.
     """
-    display_names = [
-        "AW1","Cutter1","Cutter2","Die-cutter","Jennerjahn","Pc1","Pc2","Pc3","Pc5","Sheeter1","Sheeter2"
-    ]
-
-    variants = defaultdict(set)
-    for disp in display_names:
-        variants[disp].add(disp)
-
-        low = disp.lower()
-
-        # Per-family extras (unescaped, we will flex() later)
-        if low.startswith("cutter"):
-            m = re.search(r"(\d+)$", low)
-            if m:
-                n = m.group(1)
-                variants[disp].update({
-                    f"CUTTER {n}", f"CUTTER #{n}", f"CUTTER_{n}", f"CUTTER-{n}",
-                    f"Cutter {n}", f"Cutter #{n}", f"Cutter_{n}", f"Cutter-{n}",
-                    f"CUTTER#{n}", f"Cutter#{n}"
-                })
-
-        if low.startswith("pc"):
-            m = re.search(r"(\d+)$", low)
-            if m:
-                n = m.group(1)
-                variants[disp].update({f"PC{n}", f"PC {n}", f"PC_{n}", f"PC-{n}", f"Pc{n}", f"Pc {n}"})
-
-        if low.startswith("sheeter"):
-            m = re.search(r"(\d+)$", low)
-            if m:
-                n = m.group(1)
-                variants[disp].update({f"SHEETER{n}", f"SHEETER {n}", f"SHEETER_{n}", f"Sheeter {n}"})
-
-        if low == "die-cutter":
-            variants[disp].update({"DIE-CUTTER","DIE CUTTER","Die Cutter","Die-Cutter"})
-
-        if low == "aw1":
-            variants[disp].update({"AW1","AW 1","AW-1","AW_1"})
-
-        if low == "jennerjahn":
-            variants[disp].add("JENNERJAHN")
-
-        # Convert raw variants into forgiving regexes
-        variants[disp] = {flex(v) for v in variants[disp] if v}
-
-    # Make values deterministic
-    regex_variants = {k: sorted(v) for k, v in variants.items()}
-    return display_names, regex_variants
-
-# ---------------- Fuzzy + regex machine detection per page ----------------
-def detect_machine_per_page(page_text: dict, display_order, regex_variants, fuzzy_threshold=85):
-    """
-    For each page:
-      1) Try regex variants of each display name against the raw page text (case-insensitive).
-      2) If no regex hit, fuzzy rank (RapidFuzz WRatio) each display name and keep the best if >= threshold.
-    Returns dict[pageNumber] = display_name
-    """
-    page_to_machine = {}
-    for pg in sorted(page_text.keys()):
-        raw = page_text[pg] or ""
-        norm_txt = normalize(raw)
-
-        # 1) Regex pass
-        chosen = None
-        for disp in display_order:
-            for rx in regex_variants.get(disp, []):
-                if re.search(rx, raw, flags=re.IGNORECASE):
-                    chosen = disp
-                    dbg(f"Page {pg}: REGEX matched '{disp}' via /{rx}/")
-                    break
-            if chosen:
-                break
-
-        # 2) Fuzzy fallback
-        if not chosen and norm_txt:
-            best_disp, best_score = None, -1
-            for disp in display_order:
-                # choose the max score across all its variants
-                score = max(fuzz.WRatio(normalize(v), norm_txt) for v in regex_variants.get(disp, [disp]))
-                if score > best_score:
-                    best_score, best_disp = score, disp
-            dbg(f"Page {pg}: FUZZY best='{best_disp}' score={best_score}")
-            if best_score >= fuzzy_threshold:
-                chosen = best_disp
-
-        if chosen:
-            page_to_machine[pg] = chosen
-        else:
-            dbg(f"Page {pg}: no machine detected (regex+fuzzy).")
-    dbg(f"Final page→machine mapping: {page_to_machine}")
-    return page_to_machine
-
-# ---------------- Table conversion (quiet) ----------------
-def table_to_dataframe(tbl):
-    cells = tbl.get("cells", []) or []
-    if not cells:
-        return pd.DataFrame()
-    max_row = max(c.get("rowIndex", 0) + c.get("rowSpan", 1) - 1 for c in cells)
-    max_col = max(c.get("columnIndex", 0) + c.get("columnSpan", 1) - 1 for c in cells)
-    grid = [["" for _ in range(max_col + 1)] for _ in range(max_row + 1)]
-    for c in cells:
-        r0 = c.get("rowIndex", 0)
-        c0 = c.get("columnIndex", 0)
-        txt = (c.get("content") or "").strip()
-        grid[r0][c0] = txt
-    df = pd.DataFrame(grid)
-
-    # header = first non-empty row
-    header_idx = None
-    for i, row in df.iterrows():
-        if any(str(x).strip() for x in row.tolist()):
-            header_idx = i
-            break
-    if header_idx is None:
-        return pd.DataFrame()
-
-    header = df.iloc[header_idx].astype(str).str.strip().tolist()
-    # unique headers
-    seen = {}
-    cols = []
-    for h in header:
-        h2 = h if h else "col"
-        seen[h2] = seen.get(h2, 0) + 1
-        if seen[h2] > 1:
-            h2 = f"{h2}_{seen[h2]}"
-        cols.append(h2)
-
-    body = df.iloc[header_idx + 1:].copy()
-    body.columns = cols
-
-    # drop fully-empty cols/rows
-    empty_cols = body.apply(lambda col: col.astype(str).str.strip().eq("").all())
-    body = body.loc[:, ~empty_cols]
-    body = body[~body.apply(lambda row: row.astype(str).str.strip().eq("").all(), axis=1)]
-    return body.reset_index(drop=True)
-
-def collect_tables_by_page(analyze_result: dict):
-    tables = analyze_result.get("tables", []) or []
     page_tables = defaultdict(list)
-    for tbl in tables:
-        pgs = set()
-        for br in tbl.get("boundingRegions", []):
-            pg = br.get("pageNumber")
-            if pg:
-                pgs.add(pg)
-        if not pgs:
-            pgs = {1}
-        df_tbl = table_to_dataframe(tbl)
-        for pg in sorted(pgs):
-            page_tables[pg].append(df_tbl)
+    stitched = stitch_continuations(convert_tables(tables), page_to_machine)
+    with PROF.stage("type_coerce"):
+        year = year or infer_year([df_tbl for _, _, df_tbl in stitched], texts, source)
+        for first, _, df_tbl in stitched:
+            page_tables[first].append(coerce_table_types(df_tbl, year))
     return page_tables
 
-def sanitize_sheet_name(name: str) -> str:
-    s = re.sub(r'[^A-Za-z0-9 _\-#]', '_', name).strip()
-    return s[:31] if s else "Sheet"
-
 # ---------------- Main ----------------
 def main():
     ap = argparse.ArgumentParser(description="3-tab Excel from Azure DI JSON; machine naming from pages[*].lines via regex+fuzzy (manual machine list).")
     ap.add_argument("--json", required=True, help="Path to Azure DI JSON")
     ap.add_argument("--out", default="production_logs_three_tabs_named.xlsx", help="Output Excel file")
     ap.add_argument("--fuzzy", type=int, default=85, help="Fuzzy similarity threshold (0-100)")
+    ap.add_argument("--fuzzy-workers", type=int, default=-1, help="Threads for the batched fuzzy pass (-1 = all cores)")
+    ap.add_argument("--header-band", type=float, default=HEADER_BAND,
+                    help="Top fraction of the page searched first for the machine name (0 = whole page only)")
+    ap.add_argument("--detect", choices=["rules", "model"], default="rules",
+                    help="rules = regex + fuzzy; model = trained page classifier first, rules for low-confidence pages")
+    ap.add_argument("--model", default=str(DEFAULT_MODEL),
+                    help="--detect model: classifier file written by 'page_classifier.py train'")
+    ap.add_argument("--model-min-prob", type=float, default=MODEL_MIN_PROB,
+                    help="--detect model: pages the model scores below this fall back to regex/fuzzy")
+    ap.add_argument("--year", type=int, default=None,
+                    help="Year for dates written without one (default: from the document's dates or file/folder name)")
+    ap.add_argument("--format", choices=["xlsx", "parquet", "both"], default="xlsx",
+                    help="xlsx workbook, a Parquet dataset partitioned by machine/source_doc, or both")
+    ap.add_argument("--parquet-dir", default=None,
+                    help=f"Parquet dataset folder (default: {PARQUET_DIRNAME} next to --out)")
+    ap.add_argument("--log-level", choices=["DEBUG", "INFO", "WARNING"], default="WARNING",
+                    help="DEBUG shows the per-page line dump and machine detection trace")
+    ap.add_argument("--profile", default=None, metavar="PATH",
+                    help="Write per-stage wall/CPU seconds, counters and peak RSS as JSON")
     args = ap.parse_args()
-
-    with open(args.json, "r", encoding="utf-8") as f:
-        data = json.load(f)
-    ar = data.get("analyzeResult", {})
+    setup_logging(args.log_level)
 
     # Build machine catalog (manual)
-    display_order, regex_variants = build_machine_catalog()
+    display_order, regex_variants, matcher = build_machine_catalog()
     dbg(f"Loaded machines: {display_order}")
 
-    # Build per-page text from lines + debug first 10 lines
-    per_page_text = page_text_from_lines(ar)
+    # Build per-page lines (with their top position) + debug first 10 lines
+    page_lines = page_lines_from_di(iter_di_pages(args.json))
+    per_page_text = page_text_from_lines(page_lines)
+    header_text = page_text_from_lines(page_lines, args.header_band) if args.header_band else None
 
-    # Detect machine per page (regex first, then fuzzy)
-    page_to_machine = detect_machine_per_page(per_page_text, display_order, regex_variants, fuzzy_threshold=args.fuzzy)
+    # Detect machine per page (--detect model: classifier first; then header band, then the whole page;
+    # regex, then fuzzy)
+    classifier = load_classifier(args.model) if args.detect == "model" else None
+    page_to_machine = detect_machine_per_page(per_page_text, display_order, regex_variants,
+                                              fuzzy_threshold=args.fuzzy, matcher=matcher,
+                                              fuzzy_workers=args.fuzzy_workers, header_text=header_text,
+                                              classifier=classifier, min_prob=args.model_min_prob)
 
     # Tables → Excel (quiet)
-    page_tables = collect_tables_by_page(ar)
+    page_tables = collect_tables_by_page(iter_di_tables(args.json), page_to_machine, year=args.year,
+                                         texts=per_page_text.values(), source=args.json)
     selected_pages = sorted(page_tables.keys())[:3]
 
-    with pd.ExcelWriter(args.out, engine="xlsxwriter") as writer:
-        if not selected_pages:
-            pd.DataFrame({"note": ["No tables detected."]}).to_excel(writer, index=False, sheet_name="No Tables")
-        else:
-            for pg in selected_pages:
-                sheet_name = sanitize_sheet_name(page_to_machine.get(pg, f"Page {pg}"))
-                dfs = [d for d in page_tables.get(pg, []) if d is not None and not d.empty]
-                if not dfs:
-                    pd.DataFrame({"note": [f"No non-empty tables on page {pg}."]}).to_excel(writer, index=False, sheet_name=sheet_name)
-                    continue
-                startrow = 0
-                pd.DataFrame().to_excel(writer, index=False, sheet_name=sheet_name)
-                for df_tbl in dfs:
-                    df_tbl.to_excel(writer, index=False, sheet_name=sheet_name, startrow=startrow)
-                    startrow += len(df_tbl) + 2
-
-    print(f"Excel written: {Path(args.out).resolve()}")
+    if args.format in ("parquet", "both"):
+        sheet_tables = {}
+        for pg in selected_pages:
+            sheet_name = sanitize_sheet_name(page_to_machine.get(pg, f"Page {pg}"))
+            sheet_tables.setdefault(sheet_name, []).extend(
+                d for d in page_tables.get(pg, []) if d is not None and not d.empty)
+        write_parquet_dataset(sheet_tables, args.parquet_dir or Path(args.out).parent / PARQUET_DIRNAME,
+                              doc_stem(args.json))
+
+    if args.format in ("xlsx", "both"):
+        with PROF.stage("xlsx_write"):
+            with pd.ExcelWriter(args.out, engine="xlsxwriter", datetime_format="yyyy-mm-dd") as writer:
+                if not selected_pages:
+                    pd.DataFrame({"note": ["No tables detected."]}).to_excel(writer, index=False, sheet_name="No Tables")
+                else:
+                    for pg in selected_pages:
+                        sheet_name = sanitize_sheet_name(page_to_machine.get(pg, f"Page {pg}"))
+                        dfs = [d for d in page_tables.get(pg, []) if d is not None and not d.empty]
+                        if not dfs:
+                            pd.DataFrame({"note": [f"No non-empty tables on page {pg}."]}).to_excel(writer, index=False, sheet_name=sheet_name)
+                            continue
+                        startrow = 0
+                        pd.DataFrame().to_excel(writer, index=False, sheet_name=sheet_name)
+                        for df_tbl in dfs:
+                            marks_as_text(df_tbl).to_excel(writer, index=False, sheet_name=sheet_name, startrow=startrow)
+                            startrow += len(df_tbl) + 2
+
+        print(f"Excel written: {Path(args.out).resolve()}")
+
+    if args.profile:
+        write_profile(args.profile, PROF.report(json=args.json))
 
 if __name__ == "__main__":
     main()
+
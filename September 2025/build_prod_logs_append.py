@@ -1,272 +1,389 @@
 import argparse
+import glob
+import hashlib
 import json
-import re
+import os
+import pickle
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from collections import defaultdict, OrderedDict
+from collections import OrderedDict
 
 import pandas as pd
-from rapidfuzz import fuzz
-
-# ---------------- Debug helper (machine detection + header checks only) ------------
-def dbg(msg: str):
-    print(f"[MACH-DEBUG] {msg}")
-
-# ---------------- Normalization for fuzzy -----------------------------------------
-def normalize(s: str) -> str:
-    s2 = s.lower()
-    s2 = re.sub(r"[_\-]+", " ", s2)
-    s2 = re.sub(r"\s+", " ", s2).strip()
-    return s2
-
-# ---------------- Build page text from lines (debug shows first 10 lines) ----------
-def page_text_from_lines(analyze_result: dict):
-    pages = analyze_result.get("pages") or []
-    out = {}
-    for p in pages:
-        pg = p.get("pageNumber")
-        lines = p.get("lines") or []
-        line_texts = [(ln.get("content") or "").strip() for ln in lines if ln.get("content")]
-        text = " ".join(line_texts)
-        out[pg] = text
-
-        dbg(f"Page {pg}: lines={len(line_texts)}, text_len={len(text)}")
-        for i, t in enumerate(line_texts[:10], 1):
-            dbg(f"  line[{i}]: {repr(t)}")
-        if len(line_texts) > 10:
-            dbg(f"  ... ({len(line_texts) - 10} more lines)")
-    return out
+import xlsxwriter
+
+from prod_logs_core import (
+    DEFAULT_MODEL, HEADER_BAND, MODEL_MIN_PROB, PARQUET_DIRNAME, PROF, build_machine_catalog,
+    coerce_table_types, convert_tables, dbg, detect_machine_per_page, doc_stem, infer_year, iter_di_pages,
+    iter_di_tables, load_classifier, log, marks_as_text, page_lines_from_di, page_text_from_lines,
+    sanitize_sheet_name, setup_logging, sheet_columns, stitch_continuations, write_parquet_dataset,
+    write_profile,
+)
 
-# ---------------- Hand-coded machine list & flexible regex variants ----------------
-def flex(token: str) -> str:
+# ---------------- Collect tables and APPEND per machine (no headers on repeats) ----
+def group_tables_by_machine(page_frames, page_to_machine: dict, year=None, texts=(), source=None):
     """
-    Turn 'CUTTER # 2' into a forgiving regex that allows spaces/hyphens/underscores.
-    Also make '#' spacing optional. (No re.sub replacement with \s to avoid Py3.13 issues.)
+    page_frames: list of (first page, last page, DataFrame) from convert_tables.
+    Continuations are stitched first and columns typed (coerce_table_types); each table is
+    filed under the machine of its first page. Dates without a year take `year` (--year), else
+    infer_year(tables, texts, source).
+    Returns OrderedDict[sheet_name] -> list of DataFrames, in document order.
     """
-    token = token.strip()
-    if not token:
-        return ""
-    parts = re.split(r"[ \-_]+", token)
-    parts_esc = [re.escape(p) for p in parts if p]
-    pattern = r"[\s\-_]*".join(parts_esc)
-    pattern = pattern.replace(r"\#", r"\s*#\s*")
-    return pattern
-
-def build_machine_catalog():
+    sheet_tables = OrderedDict()
+    stitched = stitch_continuations(page_frames, page_to_machine)
+    with PROF.stage("type_coerce"):
+        year = year or infer_year([df for _, _, df in stitched], texts, source)
+        for page, _, df in stitched:
+            # Resolve sheet name by page's machine (fallback Page N)
+            machine = page_to_machine.get(page, f"Page {page}")
+            sheet_tables.setdefault(sanitize_sheet_name(machine), []).append(coerce_table_types(df, year))
+    return sheet_tables
+
+def _excel_rows(df: pd.DataFrame):
+    """Row tuples ready for xlsxwriter: NaN/NaT -> None (blank cell), Timestamps -> datetime."""
+    out = df.astype(object).where(df.notna(), None)
+    return out.itertuples(index=False, name=None)
+
+def write_sheet_tables(sheet_tables, out_path: Path):
     """
-    Hard-coded machines + regex variants for messy OCR.
-    Returns:
-      display_names (ordered list),
-      regex_variants: dict[display_name] -> list of ready-to-use regex strings
+    Write {sheet: [df, ...]} with the header once per sheet and a blank row between tables.
+    The header is the union of the sheet's columns (sheet_columns); each table is aligned to it
+    by column name, so a column a table lacks stays blank instead of shifting the ones after it.
+    Checkbox columns are written as ✓/blank (marks_as_text). Each sheet is written top to bottom in ONE pass straight through xlsxwriter in
+    constant_memory mode: rows are flushed to disk as soon as the next row starts, so the
+    writer holds a single row per sheet no matter how many pages/tables the scan has.
     """
-    display_names = [
-        "AW1","Cutter1","Cutter2","Die-cutter","Jennerjahn",
-        "Pc1","Pc2","Pc3","Pc5","Sheeter1","Sheeter2"
-    ]
-
-    raw_variants = defaultdict(set)
-    for disp in display_names:
-        raw_variants[disp].add(disp)
-        low = disp.lower()
-
-        if low.startswith("cutter"):
-            m = re.search(r"(\d+)$", low)
-            if m:
-                n = m.group(1)
-                raw_variants[disp].update({
-                    f"CUTTER {n}", f"CUTTER #{n}", f"CUTTER_{n}", f"CUTTER-{n}",
-                    f"Cutter {n}", f"Cutter #{n}", f"Cutter_{n}", f"Cutter-{n}",
-                    f"CUTTER#{n}", f"Cutter#{n}"
-                })
-
-        if low.startswith("pc"):
-            m = re.search(r"(\d+)$", low)
-            if m:
-                n = m.group(1)
-                raw_variants[disp].update({f"PC{n}", f"PC {n}", f"PC_{n}", f"PC-{n}", f"Pc{n}", f"Pc {n}"})
-
-        if low.startswith("sheeter"):
-            m = re.search(r"(\d+)$", low)
-            if m:
-                n = m.group(1)
-                raw_variants[disp].update({f"SHEETER{n}", f"SHEETER {n}", f"SHEETER_{n}", f"Sheeter {n}"})
-
-        if low == "die-cutter":
-            raw_variants[disp].update({"DIE-CUTTER","DIE CUTTER","Die Cutter","Die-Cutter"})
-
-        if low == "aw1":
-            raw_variants[disp].update({"AW1","AW 1","AW-1","AW_1"})
-
-        if low == "jennerjahn":
-            raw_variants[disp].add("JENNERJAHN")
-
-    regex_variants = {disp: sorted({flex(v) for v in raw_variants[disp] if v})
-                      for disp in display_names}
-    return display_names, regex_variants
-
-# ---------------- Detect a machine per page (regex first, then fuzzy) --------------
-def detect_machine_per_page(page_text: dict, display_order, regex_variants, fuzzy_threshold=85):
-    page_to_machine = {}
-    for pg in sorted(page_text.keys()):
-        raw = page_text[pg] or ""
-        norm_txt = normalize(raw)
-
-        chosen = None
-        # 1) Regex pass
-        for disp in display_order:
-            for rx in regex_variants.get(disp, []):
-                if re.search(rx, raw, flags=re.IGNORECASE):
-                    chosen = disp
-                    dbg(f"Page {pg}: REGEX matched '{disp}' via /{rx}/")
-                    break
-            if chosen:
-                break
-
-        # 2) Fuzzy pass
-        if not chosen and norm_txt:
-            best_disp, best_score = None, -1
-            for disp in display_order:
-                score = max(fuzz.WRatio(normalize(v), norm_txt) for v in regex_variants.get(disp, [disp]))
-                if score > best_score:
-                    best_score, best_disp = score, disp
-            dbg(f"Page {pg}: FUZZY best='{best_disp}' score={best_score}")
-            if best_score >= fuzzy_threshold:
-                chosen = best_disp
-
-        if chosen:
-            page_to_machine[pg] = chosen
-        else:
-            dbg(f"Page {pg}: no machine detected (regex+fuzzy).")
-    dbg(f"Final page→machine mapping: {page_to_machine}")
-    return page_to_machine
-
-# ---------------- Azure DI table -> DataFrame (header from first non-empty row) ----
-def table_to_dataframe(tbl):
-    cells = tbl.get("cells", []) or []
-    if not cells:
-        return pd.DataFrame()
-    max_row = max(c.get("rowIndex", 0) + c.get("rowSpan", 1) - 1 for c in cells)
-    max_col = max(c.get("columnIndex", 0) + c.get("columnSpan", 1) - 1 for c in cells)
-    grid = [["" for _ in range(max_col + 1)] for _ in range(max_row + 1)]
-    for c in cells:
-        r0 = c.get("rowIndex", 0)
-        c0 = c.get("columnIndex", 0)
-        txt = (c.get("content") or "").strip()
-        grid[r0][c0] = txt
-    df = pd.DataFrame(grid)
-
-    # Header = first non-empty row
-    header_idx = None
-    for i, row in df.iterrows():
-        if any(str(x).strip() for x in row.tolist()):
-            header_idx = i
-            break
-    if header_idx is None:
-        return pd.DataFrame()
-
-    header = df.iloc[header_idx].astype(str).str.strip().tolist()
-    # Unique headers
-    seen = {}
-    cols = []
-    for h in header:
-        h2 = h if h else "col"
-        seen[h2] = seen.get(h2, 0) + 1
-        if seen[h2] > 1:
-            h2 = f"{h2}_{seen[h2]}"
-        cols.append(h2)
-
-    body = df.iloc[header_idx + 1:].copy()
-    body.columns = cols
-
-    # Drop fully-empty cols/rows
-    empty_cols = body.apply(lambda col: col.astype(str).str.strip().eq("").all())
-    body = body.loc[:, ~empty_cols]
-    body = body[~body.apply(lambda row: row.astype(str).str.strip().eq("").all(), axis=1)]
-    return body.reset_index(drop=True)
+    written = []
+    with PROF.stage("xlsx_write"):
+        book = xlsxwriter.Workbook(str(out_path), {"constant_memory": True})
+        # bold, bordered header row (the pre-3.0 pandas to_excel header style)
+        header_fmt = book.add_format({"bold": True, "border": 1, "align": "center", "valign": "top"})
+        date_fmt = book.add_format({"num_format": "yyyy-mm-dd"})
+        try:
+            for sheet, dfs in sheet_tables.items():
+                if not dfs:
+                    continue
+                ws = book.add_worksheet(sheet)
+                written.append(sheet)
+                columns = sheet_columns(dfs)
+                if any(len(df.columns) != len(columns) for df in dfs):
+                    dbg(f"Sheet '{sheet}': {len(dfs)} tables aligned to {len(columns)} columns")
+
+                # The sheet carries the header once; every table appends under it
+                ws.write_row(0, 0, [str(c) for c in columns], header_fmt)
+                row = 1
+                for df in dfs:
+                    df = marks_as_text(df.reindex(columns=columns))
+                    date_cols = [j for j, dt in enumerate(df.dtypes) if pd.api.types.is_datetime64_any_dtype(dt)]
+                    for values in _excel_rows(df):
+                        ws.write_row(row, 0, values)
+                        for j in date_cols:   # same row, so still allowed in constant_memory mode
+                            if values[j] is not None:
+                                ws.write_datetime(row, j, values[j], date_fmt)
+                        row += 1
+                    PROF.count("xlsx_rows", len(df))
+
+                    # blank row between tables
+                    row += 1
+        finally:
+            book.close()
 
-# ---------------- Collect tables and APPEND per machine (no headers on repeats) ----
-def sanitize_sheet_name(name: str) -> str:
-    s = re.sub(r'[^A-Za-z0-9 _\-#]', '_', name).strip()
-    return s[:31] if s else "Sheet"
+    print(f"Excel written: {out_path.resolve()}")
+    dbg(f"Sheets created: {written}")
 
-def append_tables_by_machine(ar: dict, page_to_machine: dict, out_path: Path):
-    tables = ar.get("tables", []) or []
+def default_parquet_dir(xlsx_path) -> Path:
+    return Path(xlsx_path).parent / PARQUET_DIRNAME
 
-    # Per-sheet state: track next startrow and the "first header count"
-    sheet_state = {}  # name -> {"startrow": int, "first_header_cols": int|None}
+def append_tables_by_machine(tables, page_to_machine: dict, out_path: Path):
+    """tables: iterable of analyzeResult.tables[*] (e.g. iter_di_tables(path)), consumed once."""
+    write_sheet_tables(group_tables_by_machine(convert_tables(tables), page_to_machine), out_path)
 
-    with pd.ExcelWriter(out_path, engine="xlsxwriter") as writer:
-        for t_idx, tbl in enumerate(tables):
-            # Which page is this table on (usually one)?
-            pgs = {br.get("pageNumber") for br in tbl.get("boundingRegions", []) if br.get("pageNumber")}
-            page = min(pgs) if pgs else 1
+# ---------------- Result cache (keyed by input hash, catalog, --fuzzy) -------------
+CACHE_VERSION = 4   # bump whenever page text or table conversion output changes
+CACHE_DIRNAME = ".prod_logs_cache"
 
-            df = table_to_dataframe(tbl)
-            if df is None or df.empty:
-                continue
+def file_sha256(path, chunk_size=1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            h.update(block)
+    return h.hexdigest()
 
-            # Resolve sheet name by page's machine (fallback Page N)
-            machine = page_to_machine.get(page, f"Page {page}")
-            sheet = sanitize_sheet_name(machine)
-
-            # Sheet state
-            if sheet not in sheet_state:
-                sheet_state[sheet] = {"startrow": 0, "first_header_cols": None}
-
-            st = sheet_state[sheet]
-
-            # Check header length consistency vs the first table on this sheet
-            cur_cols = len(df.columns)
-            if st["first_header_cols"] is None:
-                st["first_header_cols"] = cur_cols
-            else:
-                if cur_cols != st["first_header_cols"]:
-                    dbg(f"HEADER MISMATCH on sheet '{sheet}': first={st['first_header_cols']} vs table{t_idx}={cur_cols}")
-
-            # First write for this sheet? include header; otherwise append w/o header
-            include_header = (st["startrow"] == 0)
-
-            # Ensure sheet exists before positioning
-            if include_header and st["startrow"] == 0:
-                pd.DataFrame().to_excel(writer, index=False, sheet_name=sheet)
-
-            # Write
-            df.to_excel(
-                writer,
-                sheet_name=sheet,
-                index=False,
-                header=include_header,
-                startrow=st["startrow"]
-            )
-
-            # Update next start row (+ blank row between tables)
-            rows_written = len(df) + (1 if include_header else 0)
-            st["startrow"] += rows_written + 1
+def catalog_key(display_order, regex_variants) -> str:
+    blob = json.dumps([list(display_order), regex_variants], sort_keys=True)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()[:16]
 
-    print(f"Excel written: {out_path.resolve()}")
-    dbg(f"Sheets created: {list(sheet_state.keys())}")
+def _atomic_write(path: Path, data: bytes):
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+def load_document(json_path, fuzzy_threshold, fuzzy_workers=-1, cache_dir=None, header_band=HEADER_BAND,
+                  model_path=None, min_prob=MODEL_MIN_PROB):
+    """
+    Page text -> machine detection -> converted tables for one DI JSON, through the cache.
+
+    Cache layout (one pair per input, so parallel batch workers never share a file):
+      <cache_dir>/<sha256>.pkl   page lines (top, text) + converted (first, last page, DataFrame) list  (pickle)
+      <cache_dir>/<sha256>.json  manifest: version, source, and page->machine per
+                                 "<catalog hash>:<fuzzy threshold>:<header band>[:model=<hash>:<min prob>]"
+    Same file, catalog, threshold, band, model -> nothing is recomputed ("hit").
+    New threshold, band, catalog or model      -> only detection reruns on the cached lines ("detect").
+    New / changed file              -> full extraction ("miss"). cache_dir=None disables it ("off").
+
+    model_path: use the trained page classifier first (--detect model); None = regex/fuzzy only.
+
+    Returns dict(page_to_machine, page_frames, page_text, pages, cache).
+    """
+    display_order, regex_variants, matcher = build_machine_catalog()
+
+    def detect(page_lines):
+        header_text = page_text_from_lines(page_lines, header_band) if header_band else None
+        return detect_machine_per_page(page_text_from_lines(page_lines), display_order, regex_variants,
+                                       fuzzy_threshold=fuzzy_threshold, matcher=matcher,
+                                       fuzzy_workers=fuzzy_workers, header_text=header_text,
+                                       classifier=load_classifier(model_path) if model_path else None,
+                                       min_prob=min_prob)
+
+    if cache_dir is None:
+        page_lines = page_lines_from_di(iter_di_pages(json_path))
+        page_frames = convert_tables(iter_di_tables(json_path))
+        return {"page_to_machine": detect(page_lines), "page_frames": page_frames,
+                "page_text": page_text_from_lines(page_lines), "pages": len(page_lines), "cache": "off"}
+
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    with PROF.stage("cache_io"):
+        sha = file_sha256(json_path)
+    manifest_path = cache_dir / f"{sha}.json"
+    extract_path = cache_dir / f"{sha}.pkl"
+    det_key = f"{catalog_key(display_order, regex_variants)}:{fuzzy_threshold}:{header_band or 0}"
+    if model_path:
+        from page_classifier import model_key
+        det_key += f":model={model_key(model_path)}:{min_prob}"
+
+    manifest, extract = {}, None
+    if manifest_path.exists() and extract_path.exists():
+        try:
+            with PROF.stage("cache_io"):
+                manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+                if manifest.get("version") == CACHE_VERSION:
+                    with open(extract_path, "rb") as f:
+                        extract = pickle.load(f)
+        except Exception as e:   # unreadable / written by another pandas version -> rebuild
+            log.warning(f"Cache entry {sha[:12]} unusable ({e}); rebuilding.")
+            extract = None
+
+    if extract is None:
+        cache = "miss"
+        extract = {"page_lines": page_lines_from_di(iter_di_pages(json_path)),
+                   "page_frames": convert_tables(iter_di_tables(json_path))}
+        with PROF.stage("cache_io"):
+            _atomic_write(extract_path, pickle.dumps(extract, protocol=pickle.HIGHEST_PROTOCOL))
+        manifest = {"version": CACHE_VERSION, "source": str(json_path), "detections": {}}
+    else:
+        cache = "detect"
+
+    cached = manifest["detections"].get(det_key)
+    if cached is not None:
+        cache = "hit"
+        page_to_machine = {int(pg): m for pg, m in cached.items()}
+    else:
+        page_to_machine = detect(extract["page_lines"])
+        manifest["detections"][det_key] = page_to_machine
+        with PROF.stage("cache_io"):
+            _atomic_write(manifest_path, json.dumps(manifest, indent=2).encode("utf-8"))
+
+    dbg(f"Cache {cache}: {Path(json_path).name} ({sha[:12]}, {det_key})")
+    PROF.count(f"cache_{cache}")
+    return {"page_to_machine": page_to_machine, "page_frames": extract["page_frames"],
+            "page_text": page_text_from_lines(extract["page_lines"]), "pages": len(extract["page_lines"]),
+            "cache": cache}
+
+def default_cache_dir(json_path) -> Path:
+    return Path(json_path).parent / CACHE_DIRNAME
+
+# ---------------- Batch mode: many DI JSONs across a process pool -----------------
+def resolve_inputs(specs):
+    """Directories expand to their *_ocr.pdf.json files; anything else is treated as a glob / path."""
+    found = []
+    for spec in specs:
+        p = Path(spec)
+        if p.is_dir():
+            found.extend(sorted(p.glob("*_ocr.pdf.json")))
+        else:
+            found.extend(Path(m) for m in sorted(glob.glob(spec)))
+    out, seen = [], set()
+    for p in found:
+        key = p.resolve()
+        if key not in seen:
+            seen.add(key)
+            out.append(p)
+    return out
+
+def batch_out_path(json_path: Path, out_dir) -> Path:
+    """'doc123_ocr.pdf.json' -> '<out_dir or json dir>/doc123_by_machine.xlsx'"""
+    return Path(out_dir or json_path.parent) / f"{doc_stem(json_path)}_by_machine.xlsx"
+
+def process_one_json(json_path, out_path, fuzzy_threshold, fuzzy_workers=1, cache_dir=None, parquet_dir=None,
+                     header_band=HEADER_BAND, model_path=None, min_prob=MODEL_MIN_PROB, year=None):
+    """
+    Worker: detect machines and group tables for one DI JSON.
+    Writes its own workbook when out_path is given; otherwise returns the grouped
+    frames so the parent can build one merged workbook. With parquet_dir, also writes
+    this doc's partitions of the Parquet dataset (partitions never overlap between docs).
+    """
+    t0 = time.perf_counter()
+    PROF.reset()   # pool processes are reused; report this file only
+    res = {"json": str(json_path), "status": "ok", "cache": "-", "pages": 0, "tables": 0, "sheets": [],
+           "seconds": 0.0, "sheet_tables": None, "profile": None}
+    try:
+        doc = load_document(json_path, fuzzy_threshold, fuzzy_workers=fuzzy_workers, cache_dir=cache_dir,
+                            header_band=header_band, model_path=model_path, min_prob=min_prob)
+        sheet_tables = group_tables_by_machine(doc["page_frames"], doc["page_to_machine"], year=year,
+                                               texts=doc["page_text"].values(), source=json_path)
+        res["cache"] = doc["cache"]
+        res["pages"] = doc["pages"]
+        res["tables"] = sum(len(dfs) for dfs in sheet_tables.values())
+        res["sheets"] = list(sheet_tables.keys())
+        if parquet_dir is not None:
+            write_parquet_dataset(sheet_tables, parquet_dir, doc_stem(json_path))
+        if out_path is not None:
+            write_sheet_tables(sheet_tables, Path(out_path))
+        else:
+            res["sheet_tables"] = sheet_tables
+    except Exception as e:
+        res["status"] = "error: " + " ".join(f"{type(e).__name__}: {e}".split())
+    res["seconds"] = time.perf_counter() - t0
+    res["profile"] = PROF.report(json=str(json_path))
+    return res
+
+def _init_worker(log_level):
+    setup_logging(log_level)
+
+def run_batch(json_paths, out_dir, merged_out, fuzzy_threshold, workers, cache_dir=False,
+              out_format="xlsx", parquet_dir=None, log_level="WARNING", header_band=HEADER_BAND,
+              model_path=None, min_prob=MODEL_MIN_PROB, year=None):
+    """
+    Fan the inputs out over a process pool, then (optionally) merge and print a status table.
+    cache_dir: a folder, None to disable the result cache, or False for one next to each JSON.
+    out_format: "xlsx", "parquet" or "both"; parquet_dir defaults to one next to the workbook(s).
+    """
+    want_xlsx = out_format in ("xlsx", "both")
+    t0 = time.perf_counter()
+    jobs = {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(log_level,)) as pool:
+        for jp in json_paths:
+            xlsx_path = Path(merged_out) if merged_out else batch_out_path(jp, out_dir)
+            jp_parquet = None
+            if out_format in ("parquet", "both"):
+                jp_parquet = parquet_dir or default_parquet_dir(xlsx_path)
+            jp_cache = default_cache_dir(jp) if cache_dir is False else cache_dir
+            jobs[jp] = pool.submit(process_one_json, jp,
+                                   xlsx_path if want_xlsx and not merged_out else None, fuzzy_threshold,
+                                   cache_dir=jp_cache, parquet_dir=jp_parquet, header_band=header_band,
+                                   model_path=model_path, min_prob=min_prob, year=year)
+        results = [jobs[jp].result() for jp in json_paths]   # input order, not completion order
+
+    if merged_out and want_xlsx:
+        merged = OrderedDict()
+        for res in results:
+            for sheet, dfs in (res["sheet_tables"] or {}).items():
+                merged.setdefault(sheet, []).extend(dfs)
+        write_sheet_tables(merged, Path(merged_out))
+
+    name_w = max([len(Path(r["json"]).name) for r in results] + [4])
+    print(f"\n{'file':<{name_w}}  {'status':<8} {'cache':<6} {'pages':>5} {'tables':>6} {'secs':>7}  sheets")
+    for r in results:
+        print(f"{Path(r['json']).name:<{name_w}}  {r['status'] if r['status'] == 'ok' else 'ERROR':<8} {r['cache']:<6} "
+              f"{r['pages']:>5} {r['tables']:>6} {r['seconds']:>7.2f}  {', '.join(r['sheets'])}")
+        if r["status"] != "ok":
+            print(f"{'':<{name_w}}  {r['status']}")
+    n_ok = sum(r["status"] == "ok" for r in results)
+    print(f"{n_ok}/{len(results)} file(s) OK in {time.perf_counter() - t0:.2f}s wall "
+          f"({sum(r['seconds'] for r in results):.2f}s summed)")
+    return results
 
 # ---------------- Main -------------------------------------------------------------
 def main():
     ap = argparse.ArgumentParser(
         description="Append Azure DI tables per machine sheet; on repeats, add without headers and warn if header counts differ."
     )
-    ap.add_argument("--json", required=True, help="Path to Azure DI JSON")
-    ap.add_argument("--out", default="production_logs_by_machine.xlsx", help="Output Excel file")
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument("--json", help="Path to Azure DI JSON")
+    src.add_argument("--batch", nargs="+", metavar="DIR_OR_GLOB",
+                     help="Directories (all *_ocr.pdf.json inside) and/or globs of DI JSONs, processed in parallel")
+    ap.add_argument("--out", default="production_logs_by_machine.xlsx",
+                    help="Output Excel file (with --batch: only used together with --merge)")
+    ap.add_argument("--out-dir", default=None,
+                    help="--batch without --merge: folder for the per-input workbooks (default: next to each JSON)")
+    ap.add_argument("--merge", action="store_true", help="--batch: write ONE per-machine workbook to --out")
+    ap.add_argument("--workers", type=int, default=None, help="--batch: worker processes (default: all cores)")
     ap.add_argument("--fuzzy", type=int, default=85, help="Fuzzy similarity threshold (0-100)")
+    ap.add_argument("--fuzzy-workers", type=int, default=-1, help="Threads for the batched fuzzy pass (-1 = all cores)")
+    ap.add_argument("--header-band", type=float, default=HEADER_BAND,
+                    help="Top fraction of the page searched first for the machine name (0 = whole page only)")
+    ap.add_argument("--detect", choices=["rules", "model"], default="rules",
+                    help="rules = regex + fuzzy; model = trained page classifier first, rules for low-confidence pages")
+    ap.add_argument("--model", default=str(DEFAULT_MODEL),
+                    help="--detect model: classifier file written by 'page_classifier.py train'")
+    ap.add_argument("--model-min-prob", type=float, default=MODEL_MIN_PROB,
+                    help="--detect model: pages the model scores below this fall back to regex/fuzzy")
+    ap.add_argument("--year", type=int, default=None,
+                    help="Year for dates written without one (default: from each document's dates or file/folder name)")
+    ap.add_argument("--cache-dir", default=None,
+                    help=f"Result cache folder (default: {CACHE_DIRNAME} next to each JSON)")
+    ap.add_argument("--no-cache", action="store_true", help="Always re-extract; neither read nor write the cache")
+    ap.add_argument("--format", choices=["xlsx", "parquet", "both"], default="xlsx",
+                    help="xlsx workbook, a Parquet dataset partitioned by machine/source_doc, or both")
+    ap.add_argument("--parquet-dir", default=None,
+                    help=f"Parquet dataset folder (default: {PARQUET_DIRNAME} next to the workbook)")
+    ap.add_argument("--log-level", choices=["DEBUG", "INFO", "WARNING"], default="WARNING",
+                    help="DEBUG shows the per-page machine detection trace")
+    ap.add_argument("--profile", default=None, metavar="PATH",
+                    help="Write per-stage wall/CPU seconds, counters and peak RSS as JSON")
     args = ap.parse_args()
-
-    with open(args.json, "r", encoding="utf-8") as f:
-        data = json.load(f)
-    ar = data.get("analyzeResult", {})
-
-    # 1) Detect machine per page (from lines)
-    display_order, regex_variants = build_machine_catalog()
-    per_page_text = page_text_from_lines(ar)
-    page_to_machine = detect_machine_per_page(per_page_text, display_order, regex_variants, fuzzy_threshold=args.fuzzy)
-
-    # 2) Append tables by machine (no headers on repeats)
+    setup_logging(args.log_level)
+    cache_dir = None if args.no_cache else (args.cache_dir or False)
+    model_path = Path(args.model) if args.detect == "model" else None
+
+    if args.batch:
+        json_paths = resolve_inputs(args.batch)
+        if not json_paths:
+            print("No *_ocr.pdf.json inputs matched.")
+            return
+        if args.out_dir:
+            Path(args.out_dir).mkdir(parents=True, exist_ok=True)
+        results = run_batch(json_paths, args.out_dir, args.out if args.merge else None, args.fuzzy,
+                            args.workers or os.cpu_count(), cache_dir=cache_dir,
+                            out_format=args.format, parquet_dir=args.parquet_dir, log_level=args.log_level,
+                            header_band=args.header_band, model_path=model_path, min_prob=args.model_min_prob,
+                            year=args.year)
+        if args.profile:
+            # per-file stage reports come from the workers; the parent adds its own (merge write) on top
+            write_profile(args.profile, PROF.report(mode="batch", workers=args.workers or os.cpu_count(),
+                                                    files=[r["profile"] for r in results]))
+        if any(r["status"] != "ok" for r in results):
+            sys.exit(1)
+        return
+
+    # 1) Detect machine per page (from lines) + convert tables, via the result cache
+    doc = load_document(args.json, args.fuzzy, fuzzy_workers=args.fuzzy_workers, header_band=args.header_band,
+                        model_path=model_path, min_prob=args.model_min_prob,
+                        cache_dir=default_cache_dir(args.json) if cache_dir is False else cache_dir)
+
+    # 2) Append tables by machine (no headers on repeats) and/or the Parquet sidecar
     out_path = Path(args.out)
-    append_tables_by_machine(ar, page_to_machine, out_path)
+    sheet_tables = group_tables_by_machine(doc["page_frames"], doc["page_to_machine"], year=args.year,
+                                           texts=doc["page_text"].values(), source=args.json)
+    if args.format in ("xlsx", "both"):
+        write_sheet_tables(sheet_tables, out_path)
+    if args.format in ("parquet", "both"):
+        write_parquet_dataset(sheet_tables, args.parquet_dir or default_parquet_dir(out_path), doc_stem(args.json))
+    if args.profile:
+        write_profile(args.profile, PROF.report(json=args.json, cache=doc["cache"]))
 
 if __name__ == "__main__":
     main()
+
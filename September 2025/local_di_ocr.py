@@ -0,0 +1,344 @@
+import argparse
+import glob
+import json
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pytesseract
+from pdf2image import convert_from_path
+from PIL import Image
+from PyPDF2 import PdfReader
+
+# Local stand-in for Azure Document Intelligence "prebuilt-layout": renders each PDF page,
+# runs tesseract image_to_data on it, detects ruled table grids from the pixels, and writes
+# an analyzeResult-shaped <name>_ocr.pdf.json that build_prod_logs.py /
+# build_prod_logs_append.py read unchanged (pages[*].lines + polygons, tables[*].cells).
+# Pages are turned upright first by tesseract OSD on a thumbnail (Classification Model
+# Training/orientation.py, shared with ocr_from_rotated_pdfs.py), so sideways scans need no
+# rotate script and their words and rules come out in reading order.
+
+# ---------------- Config ------------------------------------------------------------
+MAX_DPI = 200            # render resolution for normal-sized pages
+MIN_DPI = 50
+MAX_MEGAPIXELS = 30      # bigger pages (the 67 x 51 in log sheets) get a lower DPI up front
+TESSERACT_CONFIG = "--psm 3"
+MIN_WORD_CONF = 0        # tesseract conf is 0..100, -1 for non-word boxes
+AUTO_ORIENT = True       # tesseract OSD on a thumbnail picks each page's rotation
+TRAINING_DIR = Path(__file__).resolve().parent.parent / "Classification Model Training"
+
+# Grid detection: a ruling line is a run of dark pixels at least MIN_RULE_FRAC of the page
+# width (horizontal) / height (vertical), of which RULE_FILL must be dark (scan dropouts).
+DARK_LEVEL = 128
+MIN_RULE_FRAC = 0.06
+RULE_FILL = 0.90
+MIN_CELL_PX = 8          # rules closer than this are the same rule
+RULE_BLOCK = 512         # image rows scanned per step when looking for rules
+
+Image.MAX_IMAGE_PIXELS = int(MAX_MEGAPIXELS * 1_000_000 * 1.1)
+
+# ---------------- Page planning -----------------------------------------------------
+def plan_pages(pdf_path: Path):
+    """
+    [(page_no, dpi, width_in, height_in), ...] from each page's displayed box (cropbox, swapped
+    for /Rotate 90/270), before rendering; analyze_page renders that same box (use_cropbox).
+    """
+    plan = []
+    for page_no, page in enumerate(PdfReader(pdf_path).pages, start=1):
+        w_in, h_in = float(page.cropbox.width) / 72, float(page.cropbox.height) / 72
+        if (page.rotation or 0) % 180:
+            w_in, h_in = h_in, w_in   # pdftoppm renders with /Rotate applied
+        budget_dpi = math.sqrt(MAX_MEGAPIXELS * 1_000_000 / max(w_in * h_in, 1e-6))
+        plan.append((page_no, max(MIN_DPI, min(MAX_DPI, int(budget_dpi))), w_in, h_in))
+    return plan
+
+def _poly(x0, y0, x1, y1, scale):
+    """Axis-aligned pixel box -> DI polygon (inches, clockwise from top-left)."""
+    x0, y0, x1, y1 = (round(v * scale, 4) for v in (x0, y0, x1, y1))
+    return [x0, y0, x1, y0, x1, y1, x0, y1]
+
+def detect_rotations(pdf_path: Path, pool=None):
+    """Clockwise rotation (0/90/180/270) that makes each page upright, per OSD; 0 where OSD is unsure."""
+    if str(TRAINING_DIR) not in sys.path:
+        sys.path.insert(0, str(TRAINING_DIR))
+    from orientation import detect_rotations as osd_rotations
+
+    return [r or 0 for r in osd_rotations(pdf_path, pool)]
+
+# ---------------- Words and lines from image_to_data -------------------------------
+def ocr_words(img, lang=None):
+    """tesseract words as dicts: text, conf, box (x0, y0, x1, y1 px) and its (block, par, line) key."""
+    data = pytesseract.image_to_data(img, lang=lang, config=TESSERACT_CONFIG, output_type=pytesseract.Output.DICT)
+    words = []
+    for i, text in enumerate(data["text"]):
+        text = (text or "").strip()
+        conf = float(data["conf"][i])
+        if not text or conf < MIN_WORD_CONF:
+            continue
+        x0, y0 = data["left"][i], data["top"][i]
+        words.append({"text": text, "conf": conf,
+                      "box": (x0, y0, x0 + data["width"][i], y0 + data["height"][i]),
+                      "line": (data["block_num"][i], data["par_num"][i], data["line_num"][i])})
+    return words
+
+def group_lines(words):
+    """Words -> [(text, box)] per tesseract line, in reading order."""
+    lines = {}
+    for w in words:
+        lines.setdefault(w["line"], []).append(w)
+    out = []
+    for key in sorted(lines):
+        ws = sorted(lines[key], key=lambda w: w["box"][0])
+        box = (min(w["box"][0] for w in ws), min(w["box"][1] for w in ws),
+               max(w["box"][2] for w in ws), max(w["box"][3] for w in ws))
+        out.append((" ".join(w["text"] for w in ws), box))
+    return out
+
+# ---------------- Ruled-grid table detection ---------------------------------------
+def _rules(dark: np.ndarray, min_len: int):
+    """
+    Horizontal ruling lines of a boolean image: [(y, x0, x1), ...].
+    A row holds a rule where a window of min_len pixels is at least RULE_FILL dark
+    (windowed sums from a cumulative sum, no per-pixel Python loops; done RULE_BLOCK rows
+    at a time so a 30 MP page never needs a full-size int32 copy); adjacent rows are
+    merged into one rule.
+    """
+    h, w = dark.shape
+    if min_len >= w:
+        return []
+    need = int(min_len * RULE_FILL)
+    first = np.full(h, -1, dtype=np.int64)   # per row: first / last window start that is "full"
+    last = np.full(h, -1, dtype=np.int64)
+    for r0 in range(0, h, RULE_BLOCK):
+        block = dark[r0:r0 + RULE_BLOCK]
+        csum = np.zeros((block.shape[0], w + 1), dtype=np.int32)
+        np.cumsum(block, axis=1, out=csum[:, 1:])
+        full = (csum[:, min_len:] - csum[:, :-min_len]) >= need
+        hit = full.any(axis=1)
+        first[r0:r0 + block.shape[0]][hit] = full[hit].argmax(axis=1)
+        last[r0:r0 + block.shape[0]][hit] = full.shape[1] - 1 - full[hit][:, ::-1].argmax(axis=1)
+    rows = np.flatnonzero(first >= 0)
+    rules = []
+    if not rows.size:
+        return rules
+    for g in np.split(rows, np.flatnonzero(np.diff(rows) > 1) + 1):
+        rules.append((int(round(g.mean())), int(first[g].min()), int(last[g].max()) + min_len))
+    # rules thinner than MIN_CELL_PX apart (double-drawn borders) are one rule
+    merged = [rules[0]]
+    for y, x0, x1 in rules[1:]:
+        py, px0, px1 = merged[-1]
+        if y - py < MIN_CELL_PX:
+            merged[-1] = ((py + y) // 2, min(px0, x0), max(px1, x1))
+        else:
+            merged.append((y, x0, x1))
+    return merged
+
+def _components(h_rules, v_rules, tol):
+    """Group rules into tables: a horizontal and a vertical rule are connected when they cross."""
+    parent = list(range(len(h_rules) + len(v_rules)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, (y, hx0, hx1) in enumerate(h_rules):
+        for j, (x, vy0, vy1) in enumerate(v_rules):
+            if hx0 - tol <= x <= hx1 + tol and vy0 - tol <= y <= vy1 + tol:
+                parent[find(i)] = find(len(h_rules) + j)
+    groups = {}
+    for i in range(len(parent)):
+        groups.setdefault(find(i), []).append(i)
+    out = []
+    for members in groups.values():
+        hs = [h_rules[i] for i in members if i < len(h_rules)]
+        vs = [v_rules[i - len(h_rules)] for i in members if i >= len(h_rules)]
+        if len(hs) >= 2 and len(vs) >= 2:
+            out.append((hs, vs))
+    return out
+
+def detect_grids(img):
+    """Ruled tables on a page image: [(h_rules, v_rules), ...] in pixel coordinates."""
+    dark = np.asarray(img.convert("L")) < DARK_LEVEL
+    h, w = dark.shape
+    h_rules = _rules(dark, max(MIN_CELL_PX, int(w * MIN_RULE_FRAC)))
+    v_rules = _rules(dark.T, max(MIN_CELL_PX, int(h * MIN_RULE_FRAC)))
+    return _components(h_rules, v_rules, tol=MIN_CELL_PX)
+
+def grid_cells(h_rules, v_rules, tol):
+    """
+    Cells of one ruled grid: [(row, col, row_span, col_span, (x0, y0, x1, y1)), ...].
+    Neighbouring grid slots are merged into one spanning cell wherever the rule between
+    them is missing (merged header cells, a "Comments" row across the sheet).
+    """
+    ys = sorted(y for y, _, _ in h_rules)
+    xs = sorted(x for x, _, _ in v_rules)
+    n_r, n_c = len(ys) - 1, len(xs) - 1
+
+    def v_rule_at(x, y):
+        return any(abs(vx - x) <= tol and vy0 - tol <= y <= vy1 + tol for vx, vy0, vy1 in v_rules)
+
+    def h_rule_at(y, x):
+        return any(abs(hy - y) <= tol and hx0 - tol <= x <= hx1 + tol for hy, hx0, hx1 in h_rules)
+
+    owner = {}
+    cells = []
+    for r in range(n_r):
+        for c in range(n_c):
+            if (r, c) in owner:
+                continue
+            y_mid = (ys[r] + ys[r + 1]) / 2
+            cs = 1
+            while c + cs < n_c and not v_rule_at(xs[c + cs], y_mid) and (r, c + cs) not in owner:
+                cs += 1
+            rs = 1
+            while r + rs < n_r and not any(h_rule_at(ys[r + rs], (xs[c + k] + xs[c + k + 1]) / 2) for k in range(cs)):
+                rs += 1
+            for i in range(rs):
+                for k in range(cs):
+                    owner[(r + i, c + k)] = len(cells)
+            cells.append((r, c, rs, cs, (xs[c], ys[r], xs[c + cs], ys[r + rs])))
+    return cells
+
+# ---------------- One page -> DI page + tables --------------------------------------
+def analyze_page(pdf_path, page_no, dpi, lang=None, rotation=0):
+    """
+    Worker: render one page, turn it upright (rotation: clockwise degrees from detect_rotations),
+    OCR it and find its tables.
+    Returns (DI page dict without spans, [DI table dicts]) in inches of the upright page.
+    """
+    img = convert_from_path(pdf_path, dpi=dpi, first_page=page_no, last_page=page_no, use_cropbox=True)[0]
+    if rotation:
+        img = img.rotate(-rotation, expand=True)   # PIL rotates counter-clockwise
+    scale = 1.0 / dpi
+    words = ocr_words(img, lang=lang)
+    lines = group_lines(words)
+
+    page = {"pageNumber": page_no, "angle": 0.0, "unit": "inch",
+            "width": round(img.width * scale, 4), "height": round(img.height * scale, 4),
+            "words": [{"content": w["text"], "polygon": _poly(*w["box"], scale),
+                       "confidence": round(w["conf"] / 100, 3)} for w in words],
+            "lines": [{"content": text, "polygon": _poly(*box, scale)} for text, box in lines]}
+
+    tables = []
+    for h_rules, v_rules in detect_grids(img):
+        cells = grid_cells(h_rules, v_rules, tol=MIN_CELL_PX)
+        texts = [[] for _ in cells]
+        for w in words:
+            cx, cy = (w["box"][0] + w["box"][2]) / 2, (w["box"][1] + w["box"][3]) / 2
+            for k, (_, _, _, _, (x0, y0, x1, y1)) in enumerate(cells):
+                if x0 <= cx < x1 and y0 <= cy < y1:
+                    texts[k].append(w)
+                    break
+        di_cells = []
+        for (r, c, rs, cs, box), ws in zip(cells, texts):
+            ws.sort(key=lambda w: (w["line"], w["box"][0]))
+            cell = {"rowIndex": r, "columnIndex": c, "content": " ".join(w["text"] for w in ws),
+                    "boundingRegions": [{"pageNumber": page_no, "polygon": _poly(*box, scale)}]}
+            if r == 0:
+                cell["kind"] = "columnHeader"
+            if rs > 1:
+                cell["rowSpan"] = rs
+            if cs > 1:
+                cell["columnSpan"] = cs
+            di_cells.append(cell)
+        x0, x1 = min(x for x, _, _ in v_rules), max(x for x, _, _ in v_rules)
+        y0, y1 = min(y for y, _, _ in h_rules), max(y for y, _, _ in h_rules)
+        tables.append({"rowCount": len(h_rules) - 1, "columnCount": len(v_rules) - 1, "cells": di_cells,
+                       "boundingRegions": [{"pageNumber": page_no, "polygon": _poly(x0, y0, x1, y1, scale)}]})
+    tables.sort(key=lambda t: (t["boundingRegions"][0]["polygon"][1], t["boundingRegions"][0]["polygon"][0]))
+    return page, tables
+
+def _init_worker():
+    # one tesseract per core: stop each one from also spinning up its own OpenMP threads
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+
+# ---------------- One PDF -> analyzeResult JSON -------------------------------------
+def out_json_path(pdf_path: Path, out_dir=None) -> Path:
+    """'doc123.pdf' / 'doc123_ocr.pdf' -> 'doc123_ocr.pdf.json' (the name --batch looks for)."""
+    stem = pdf_path.stem if pdf_path.stem.endswith("_ocr") else f"{pdf_path.stem}_ocr"
+    return Path(out_dir or pdf_path.parent) / f"{stem}.pdf.json"
+
+def analyze_pdf(pdf_path: Path, pool: ProcessPoolExecutor, lang=None) -> dict:
+    """All pages of one PDF through the pool (one task per page), assembled in page order."""
+    started = datetime.now(timezone.utc)
+    plan = plan_pages(pdf_path)
+    rotations = detect_rotations(pdf_path, pool) if AUTO_ORIENT else [0] * len(plan)
+    futures = [pool.submit(analyze_page, str(pdf_path), page_no, dpi, lang, rot)
+               for (page_no, dpi, _, _), rot in zip(plan, rotations)]
+
+    content, pages, tables = [], [], []
+    offset = 0
+    for fut in futures:
+        page, page_tables = fut.result()
+        page_start = offset
+        for ln in page["lines"]:
+            ln["spans"] = [{"offset": offset, "length": len(ln["content"])}]
+            content.append(ln["content"])
+            offset += len(ln["content"]) + 1
+        page["spans"] = [{"offset": page_start, "length": max(0, offset - page_start - 1)}]
+        pages.append(page)
+        tables.extend(page_tables)
+
+    return {"status": "succeeded",
+            "createdDateTime": started.isoformat(timespec="seconds").replace("+00:00", "Z"),
+            "lastUpdatedDateTime": datetime.now(timezone.utc).isoformat(timespec="seconds").replace("+00:00", "Z"),
+            "analyzeResult": {"apiVersion": "local-tesseract", "modelId": "local-tesseract-layout",
+                              "stringIndexType": "textElements", "content": "\n".join(content),
+                              "pages": pages, "tables": tables}}
+
+def resolve_pdfs(specs):
+    """Directories expand to their *.pdf files; anything else is treated as a glob / path."""
+    found = []
+    for spec in specs:
+        p = Path(spec)
+        if p.is_dir():
+            found.extend(sorted(p.glob("*.pdf")))
+        else:
+            found.extend(Path(m) for m in sorted(glob.glob(spec)))
+    return list(dict.fromkeys(found))
+
+# ---------------- Main -------------------------------------------------------------
+def main():
+    ap = argparse.ArgumentParser(description="OCR PDFs locally with tesseract into Azure-DI-shaped *_ocr.pdf.json "
+                                             "files for build_prod_logs*.py (no cloud round-trip).")
+    ap.add_argument("pdfs", nargs="+", help="PDF files, globs or folders")
+    ap.add_argument("--out-dir", default=None, help="Where to write the JSON (default: next to each PDF)")
+    ap.add_argument("--lang", default=None, help="tesseract language(s), e.g. eng")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Pages OCR'd in parallel")
+    ap.add_argument("--overwrite", action="store_true", help="Redo PDFs whose JSON already exists")
+    args = ap.parse_args()
+
+    pdfs = resolve_pdfs(args.pdfs)
+    if not pdfs:
+        raise SystemExit(f"No PDFs matched: {args.pdfs}")
+    if args.out_dir:
+        Path(args.out_dir).mkdir(parents=True, exist_ok=True)
+
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker) as pool:
+        for pdf in pdfs:
+            out_path = out_json_path(pdf, args.out_dir)
+            if out_path.exists() and not args.overwrite:
+                print(f"⏭️  {out_path.name} exists, skipping")
+                continue
+            t0 = time.perf_counter()
+            try:
+                doc = analyze_pdf(pdf, pool, lang=args.lang)
+            except Exception as e:
+                print(f"❌ {pdf.name}: {type(e).__name__}: {e}")
+                continue
+            tmp = out_path.with_name(out_path.name + ".tmp")
+            tmp.write_text(json.dumps(doc), encoding="utf-8")
+            os.replace(tmp, out_path)
+            res = doc["analyzeResult"]
+            print(f"✅ {pdf.name} → {out_path.name}: {len(res['pages'])} page(s), {len(res['tables'])} table(s) "
+                  f"in {time.perf_counter() - t0:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from PyPDF2 import PdfReader
+from scipy import sparse
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import LogisticRegression
+
+# Page -> machine classifier for build_prod_logs*.py --detect model.
+# Features are hashed character n-grams of the page text (stateless: no vocabulary to fit or
+# ship), kept as a sparse matrix on disk so retraining only vectorizes pages it has not seen.
+# The model is a multinomial logistic regression saved as a plain .npz (sparse coefficients +
+# intercepts + class names), so predicting a whole document is one sparse matrix product.
+
+# ---------------- Config ------------------------------------------------------------
+TRAINING_DIR = Path(__file__).resolve().parent.parent / "Classification Model Training"
+DEFAULT_MODEL = Path(__file__).resolve().with_name("machine_classifier.npz")
+FEATURES_DIRNAME = ".page_features"
+N_FEATURES = 2 ** 18
+NGRAM_RANGE = (2, 4)
+MIN_TEXT_CHARS = 20      # pages with less text than this (no OCR text layer) are skipped
+C = 10.0                 # inverse regularization strength
+
+# Same display names as build_machine_catalog(); keys are lowercase letters+digits of the
+# folder / file names used in Classification Model Training.
+MACHINES = ["AW1", "Cutter1", "Cutter2", "Die-cutter", "Jennerjahn",
+            "Pc1", "Pc2", "Pc3", "Pc5", "Sheeter1", "Sheeter2"]
+LABEL_ALIASES = {re.sub(r"[^a-z0-9]", "", m.lower()): m for m in MACHINES}
+LABEL_ALIASES["jenny"] = "Jennerjahn"
+
+def _clean(text: str) -> str:
+    return " ".join((text or "").lower().split())
+
+def make_vectorizer(n_features=N_FEATURES, ngram_range=NGRAM_RANGE) -> HashingVectorizer:
+    return HashingVectorizer(analyzer="char_wb", ngram_range=tuple(ngram_range), n_features=n_features,
+                             alternate_sign=False, norm="l2", preprocessor=_clean, dtype=np.float32)
+
+# ---------------- Labels from the training tree ------------------------------------
+def label_for(pdf_path: Path):
+    """
+    Machine display name from the naming used by prepare_training_pdfs.py:
+    'Cutter 1 training set merged.pdf', 'Cutter1_page3_rotated.pdf', 'Jenny/Jenny_page1.pdf'.
+    None when the name matches no known machine.
+    """
+    stem = re.sub(r"(_rotated|_ocr)+$", "", pdf_path.stem, flags=re.IGNORECASE)
+    if "training set" in stem.lower():
+        name = stem.lower().split("training set")[0]
+    elif re.search(r"_page\d+$", stem, re.IGNORECASE):
+        name = re.sub(r"_page\d+$", "", stem, flags=re.IGNORECASE)
+    else:
+        name = pdf_path.parent.name
+    return LABEL_ALIASES.get(re.sub(r"[^a-z0-9]", "", name.lower()))
+
+def training_pdfs(root: Path):
+    """(rel path, pdf, label) of every labeled PDF under the training folder (dot-folders skipped)."""
+    for pdf in sorted(root.rglob("*.pdf")):
+        if any(part.startswith(".") for part in pdf.relative_to(root).parts):
+            continue
+        label = label_for(pdf)
+        if label is not None:
+            yield pdf.relative_to(root).as_posix(), pdf, label
+
+def page_store_pdfs(store_dir: Path, missing=None):
+    """
+    (machine/<key>_r<rot>, OCR'd page, label) for every page of the page store's machine sets
+    (Classification Model Training/page_store.py), read from the one-page PDFs that
+    ocr_from_rotated_pdfs.py --page-store wrote. A page shared by several source PDFs is read
+    once. Pages not OCR'd yet are skipped and counted in missing[machine].
+    """
+    sys.path.insert(0, str(TRAINING_DIR))
+    from page_store import PageStore
+
+    store = PageStore(store_dir)
+    for machine in store.machines():
+        label = LABEL_ALIASES.get(re.sub(r"[^a-z0-9]", "", machine.lower()))
+        if label is None:
+            continue
+        for key, rot in store.upright_pages(machine):
+            path = store.ocr_path(key, rot)
+            if path.exists():
+                yield f"{machine}/{key}_r{rot}", path, label
+            elif missing is not None:
+                missing[machine] = missing.get(machine, 0) + 1
+
+# ---------------- Sparse feature store ---------------------------------------------
+class FeatureStore:
+    """
+    <dir>/features.npz   CSR matrix, one row per unique page text (blake2b of the cleaned text)
+    <dir>/index.json     vectorizer params, row keys + labels, and per source PDF its
+                         size/mtime and row keys (unchanged PDFs are not even opened)
+    """
+    def __init__(self, store_dir: Path):
+        self.dir = Path(store_dir)
+        self.params = {"n_features": N_FEATURES, "ngram_range": list(NGRAM_RANGE)}
+        self.keys, self.labels, self.sources = [], [], {}
+        self.X = sparse.csr_matrix((0, N_FEATURES), dtype=np.float32)
+        index_path, matrix_path = self.dir / "index.json", self.dir / "features.npz"
+        if index_path.exists() and matrix_path.exists():
+            index = json.loads(index_path.read_text(encoding="utf-8"))
+            if index.get("params") == self.params:   # new hashing setup -> start over
+                self.keys, self.labels, self.sources = index["keys"], index["labels"], index["sources"]
+                self.X = sparse.load_npz(matrix_path).tocsr()
+
+    def update(self, items):
+        """
+        Read new/changed PDFs of items [(rel, pdf path, label), ...] (training_pdfs() or
+        page_store_pdfs()), vectorize only unseen page texts. items is the whole input set:
+        sources missing from it (deleted / renamed PDFs) are forgotten, and rows no remaining
+        source refers to (pages of deleted or changed PDFs) are dropped. Returns counters.
+        """
+        row_of = {k: i for i, k in enumerate(self.keys)}
+        new_texts, stats = [], {"files_read": 0, "files_unchanged": 0, "files_removed": 0, "pages_no_text": 0,
+                                "pages_new": 0, "pages_dropped": 0, "label_conflicts": 0}
+        seen = set()
+        for rel, pdf, label in items:
+            seen.add(rel)
+            st = pdf.stat()
+            entry = self.sources.get(rel)
+            if entry and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns:
+                stats["files_unchanged"] += 1
+                continue
+            stats["files_read"] += 1
+            keys = []
+            try:
+                pages = PdfReader(pdf).pages
+                texts = [page.extract_text() or "" for page in pages]
+            except Exception as e:
+                print(f"⚠️  {rel}: {e}")
+                self.sources.pop(rel, None)
+                continue
+            for text in texts:
+                text = _clean(text)
+                if len(text) < MIN_TEXT_CHARS:
+                    stats["pages_no_text"] += 1
+                    continue
+                key = hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+                keys.append(key)
+                if key in row_of:
+                    stats["label_conflicts"] += self.labels[row_of[key]] != label
+                    continue
+                row_of[key] = len(self.keys)
+                self.keys.append(key)
+                self.labels.append(label)
+                new_texts.append(text)
+            self.sources[rel] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "label": label, "keys": keys}
+
+        if new_texts:
+            vec = make_vectorizer(self.params["n_features"], self.params["ngram_range"])
+            self.X = sparse.vstack([self.X, vec.transform(new_texts)], format="csr")
+        stats["pages_new"] = len(new_texts)
+
+        for rel in [r for r in self.sources if r not in seen]:
+            del self.sources[rel]
+            stats["files_removed"] += 1
+        live = {k for entry in self.sources.values() for k in entry["keys"]}
+        keep = [i for i, k in enumerate(self.keys) if k in live]
+        if len(keep) < len(self.keys):
+            stats["pages_dropped"] = len(self.keys) - len(keep)
+            self.keys = [self.keys[i] for i in keep]
+            self.labels = [self.labels[i] for i in keep]
+            self.X = self.X[keep]
+        return stats
+
+    def save(self):
+        self.dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.dir / "features.tmp.npz"
+        sparse.save_npz(tmp, self.X)
+        os.replace(tmp, self.dir / "features.npz")
+        index = {"params": self.params, "keys": self.keys, "labels": self.labels, "sources": self.sources}
+        tmp = self.dir / "index.json.tmp"
+        tmp.write_text(json.dumps(index), encoding="utf-8")
+        os.replace(tmp, self.dir / "index.json")
+
+# ---------------- Model ------------------------------------------------------------
+def train(X, labels, c=C):
+    """
+    Fit the logistic regression on the hashed columns that actually occur (a few thousand of
+    N_FEATURES), then scatter the weights back to full width.
+    Returns (classes, sparse coef (classes x n_features), intercept).
+    """
+    used = np.unique(X.indices)
+    clf = LogisticRegression(C=c, max_iter=2000)
+    clf.fit(X[:, used], np.asarray(labels))
+    coef, intercept = clf.coef_, clf.intercept_
+    if coef.shape[0] == 1:   # two classes: sklearn keeps one row; softmax of (-z/2, z/2) == sigmoid(z)
+        coef, intercept = np.vstack([-coef, coef]) / 2, np.r_[-intercept, intercept] / 2
+    rows = np.repeat(np.arange(coef.shape[0]), len(used))
+    cols = np.tile(used, coef.shape[0])
+    full = sparse.csr_matrix((coef.ravel().astype(np.float32), (rows, cols)), shape=(coef.shape[0], X.shape[1]))
+    return [str(k) for k in clf.classes_], full, intercept.astype(np.float32)
+
+def save_model(path: Path, classes, coef, intercept, params: dict):
+    path = Path(path)
+    tmp = path.with_name(path.stem + ".tmp.npz")
+    np.savez_compressed(tmp, classes=np.asarray(classes, dtype=str), intercept=intercept,
+                        params=np.asarray(json.dumps(params)), coef_data=coef.data, coef_indices=coef.indices,
+                        coef_indptr=coef.indptr, coef_shape=np.asarray(coef.shape))
+    os.replace(tmp, path)
+
+def model_key(path) -> str:
+    """Short content hash of a model file (part of the build scripts' detection cache key)."""
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()[:16]
+
+class MachineClassifier:
+    """Loaded model: predict() classifies a batch of page texts with one sparse matmul."""
+    def __init__(self, path=DEFAULT_MODEL):
+        with np.load(path) as z:
+            self.classes = [str(c) for c in z["classes"]]
+            self.intercept = z["intercept"]
+            self.coef_t = sparse.csr_matrix((z["coef_data"], z["coef_indices"], z["coef_indptr"]),
+                                            shape=tuple(z["coef_shape"])).T.tocsr()
+            params = json.loads(str(z["params"]))
+        self.vectorizer = make_vectorizer(params["n_features"], params["ngram_range"])
+
+    def predict(self, texts):
+        """texts: list[str] -> (list of class names, np.ndarray of their probabilities)."""
+        if not texts:
+            return [], np.zeros(0, dtype=np.float32)
+        scores = (self.vectorizer.transform(texts) @ self.coef_t).toarray() + self.intercept   # (pages, classes)
+        scores -= scores.max(axis=1, keepdims=True)
+        probs = np.exp(scores)
+        probs /= probs.sum(axis=1, keepdims=True)
+        best = probs.argmax(axis=1)
+        return [self.classes[b] for b in best], probs[np.arange(len(best)), best]
+
+# ---------------- Main -------------------------------------------------------------
+def cmd_train(args):
+    data_dir = Path(args.page_store or args.data)
+    store = FeatureStore(Path(args.features) if args.features else data_dir / FEATURES_DIRNAME)
+    t0 = time.perf_counter()
+    missing = {}
+    stats = store.update(page_store_pdfs(data_dir, missing) if args.page_store else training_pdfs(data_dir))
+    store.save()
+    if missing:
+        print("⚠️  Page store pages without OCR (run ocr_from_rotated_pdfs.py --page-store first): "
+              + ", ".join(f"{m}={n}" for m, n in sorted(missing.items())))
+    print(f"Features: {store.X.shape[0]} unique page(s) x {store.X.shape[1]} hashed n-grams "
+          f"({time.perf_counter() - t0:.2f}s) {stats}")
+    classes, counts = np.unique(store.labels, return_counts=True)
+    print("Pages per machine: " + ", ".join(f"{c}={n}" for c, n in zip(classes, counts)))
+    if len(classes) < 2:
+        raise SystemExit("Need pages of at least two machines (OCR text layers) to train.")
+
+    if args.cv:
+        from sklearn.model_selection import cross_val_score
+        folds = int(min(5, counts.min()))
+        if folds >= 2:
+            acc = cross_val_score(LogisticRegression(C=args.c, max_iter=2000), store.X[:, np.unique(store.X.indices)],
+                                  np.asarray(store.labels), cv=folds)
+            print(f"{folds}-fold accuracy: {acc.mean():.3f} ± {acc.std():.3f}")
+        else:
+            print("Too few pages in some machine for cross-validation.")
+
+    t0 = time.perf_counter()
+    classes, coef, intercept = train(store.X, store.labels, c=args.c)
+    save_model(Path(args.model), classes, coef, intercept, store.params)
+    print(f"✅ Model → {args.model} ({len(classes)} machines, {coef.nnz} weights, {time.perf_counter() - t0:.2f}s)")
+
+def cmd_predict(args):
+    clf = MachineClassifier(args.model)
+    for pdf in args.pdfs:
+        texts = [page.extract_text() or "" for page in PdfReader(pdf).pages]
+        labels, probs = clf.predict(texts)
+        for n, (label, p) in enumerate(zip(labels, probs), start=1):
+            print(f"{Path(pdf).name} p{n}: {label} ({p:.2f})")
+
+def main():
+    ap = argparse.ArgumentParser(description="Train / try the page -> machine classifier used by --detect model.")
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("train", help="Update the feature store from the labeled PDFs and fit the model")
+    p.add_argument("--data", default=str(TRAINING_DIR), help="Classification Model Training folder")
+    p.add_argument("--page-store", default=None, metavar="DIR",
+                   help="Train on the de-duplicated pages of page_store.py's store DIR (its OCR'd pages) instead of --data")
+    p.add_argument("--features", default=None,
+                   help=f"Feature store folder (default: <data or page store>/{FEATURES_DIRNAME})")
+    p.add_argument("--model", default=str(DEFAULT_MODEL), help="Where to write the model (.npz)")
+    p.add_argument("--c", type=float, default=C, help="Inverse regularization strength")
+    p.add_argument("--cv", action="store_true", help="Also report k-fold cross-validated accuracy")
+    p.set_defaults(func=cmd_train)
+
+    p = sub.add_parser("predict", help="Classify every page of OCR'd PDFs (text layer)")
+    p.add_argument("pdfs", nargs="+")
+    p.add_argument("--model", default=str(DEFAULT_MODEL))
+    p.set_defaults(func=cmd_predict)
+
+    args = ap.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,800 @@
+import json
+import logging
+import math
+import re
+import shutil
+import sys
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+from urllib.parse import unquote
+from collections import defaultdict, OrderedDict
+
+import pandas as pd
+import numpy as np
+from rapidfuzz import fuzz, process
+
+try:
+    import ijson  # incremental JSON parser; optional, falls back to json.load
+except ImportError:
+    ijson = None
+
+# Shared pipeline of build_prod_logs.py and build_prod_logs_append.py: read the Azure DI JSON,
+# detect each page's machine and turn its tables into DataFrames. The two scripts only differ in
+# which tables they keep and how they group and write them.
+
+# ---------------- Logging + per-stage profiling ------------------------------------
+log = logging.getLogger("prod_logs")
+
+def dbg(msg: str):
+    log.debug(msg)
+
+def setup_logging(level: str = "WARNING"):
+    logging.basicConfig(level=getattr(logging, level.upper(), logging.WARNING),
+                        format="[%(levelname)s] %(message)s")
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, or None if the platform can't tell."""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss   # KB on Linux, bytes on macOS
+        return peak / (2 ** 20 if sys.platform == "darwin" else 2 ** 10)
+    except ImportError:   # Windows
+        try:
+            import psutil
+            mem = psutil.Process().memory_info()
+            return getattr(mem, "peak_wset", mem.rss) / 2 ** 20
+        except ImportError:
+            return None
+
+class StageProfile:
+    """
+    Wall + CPU seconds per named stage, plus counters. Stage time is exclusive (a nested
+    stage is not counted again in its parent), so "load_json" pulled through timed_iter()
+    separates cleanly from the "build_text" / "table_convert" work around it.
+    Stages are coarse, so profiling is always on; --profile only decides whether it's written.
+    """
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.stages = OrderedDict()
+        self.counts = OrderedDict()
+        self._children = []   # per open stage: [child wall, child cpu]
+        self._t0 = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str):
+        w0, c0 = time.perf_counter(), time.process_time()
+        self._children.append([0.0, 0.0])
+        try:
+            yield
+        finally:
+            child_w, child_c = self._children.pop()
+            wall, cpu = time.perf_counter() - w0, time.process_time() - c0
+            if self._children:
+                self._children[-1][0] += wall
+                self._children[-1][1] += cpu
+            st = self.stages.setdefault(name, {"wall_s": 0.0, "cpu_s": 0.0, "calls": 0})
+            st["wall_s"] += wall - child_w
+            st["cpu_s"] += cpu - child_c
+            st["calls"] += 1
+
+    def timed_iter(self, name: str, iterable):
+        """Yield from iterable, charging the time spent producing each item to stage `name`."""
+        it = iter(iterable)
+        while True:
+            with self.stage(name):
+                try:
+                    item = next(it)
+                except StopIteration:
+                    return
+            yield item
+
+    def count(self, name: str, n=1):
+        self.counts[name] = self.counts.get(name, 0) + n
+
+    def report(self, **meta):
+        rss = peak_rss_mb()
+        return {
+            **meta,
+            "total_wall_s": round(time.perf_counter() - self._t0, 4),
+            "peak_rss_mb": None if rss is None else round(rss, 1),
+            "stages": {k: {"wall_s": round(v["wall_s"], 4), "cpu_s": round(v["cpu_s"], 4), "calls": v["calls"]}
+                       for k, v in self.stages.items()},
+            "counts": dict(self.counts),
+        }
+
+PROF = StageProfile()
+
+def write_profile(path, report):
+    Path(path).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"Profile written: {Path(path).resolve()}")
+
+# ---------------- Normalization for fuzzy -----------------------------------------
+def normalize(s: str) -> str:
+    s2 = s.lower()
+    s2 = re.sub(r"[_\-]+", " ", s2)
+    s2 = re.sub(r"\s+", " ", s2).strip()
+    return s2
+
+# ---------------- Streaming Azure DI reader (pages / tables only) -----------------
+PAGE_KEYS = {"pageNumber", "angle", "width", "height", "unit", "lines"}
+TABLE_KEYS = {"rowCount", "columnCount", "cells", "boundingRegions"}
+
+def iter_di_items(json_path, section: str, keep_keys):
+    """
+    Stream analyzeResult.<section>[*] out of an Azure DI JSON file one item at a time.
+    Only the top-level keys in keep_keys are materialized; everything else in the item
+    (e.g. pages[*].words) and every other section (content, paragraphs, styles, sections,
+    figures) is tokenized and dropped, so memory stays at ~one page/table regardless of
+    document size. Falls back to json.load when ijson is not installed.
+    """
+    if ijson is None:
+        with open(json_path, "r", encoding="utf-8") as f:
+            items = (json.load(f).get("analyzeResult") or {}).get(section) or []
+        for item in items:
+            yield {k: v for k, v in item.items() if k in keep_keys}
+        return
+
+    prefix = f"analyzeResult.{section}.item"
+    with open(json_path, "rb") as f:
+        builder, key = None, None
+        for pfx, event, value in ijson.parse(f, use_float=True):
+            if builder is None:
+                if pfx == prefix and event == "start_map":
+                    builder, key = ijson.ObjectBuilder(), None
+                    builder.event(event, value)
+                continue
+            if pfx == prefix:
+                if event == "map_key":
+                    key = value
+                    if key in keep_keys:
+                        builder.event(event, value)
+                    continue
+                if event == "end_map":
+                    builder.event(event, value)
+                    yield builder.value
+                    builder = None
+                    continue
+            if key in keep_keys:
+                builder.event(event, value)
+
+def iter_di_pages(json_path):
+    """analyzeResult.pages[*] as a generator (pageNumber, size/unit, lines)."""
+    return iter_di_items(json_path, "pages", PAGE_KEYS)
+
+def iter_di_tables(json_path):
+    """analyzeResult.tables[*] as a generator (cells, boundingRegions, counts)."""
+    return iter_di_items(json_path, "tables", TABLE_KEYS)
+
+# ---------------- Page lines with their vertical position (debug shows first 10) ----
+HEADER_BAND = 0.20   # top fraction of the page searched first for the machine name
+MODEL_MIN_PROB = 0.35  # --detect model: below this the page falls back to regex/fuzzy
+DEFAULT_MODEL = Path(__file__).resolve().with_name("machine_classifier.npz")
+
+def line_tops(page):
+    """
+    Top edge of every line as a 0..1 fraction of the page height, measured in the page's
+    reading orientation (pages[*].angle is undone first, so a sideways scan still puts the
+    form header at 0). None per line when the page has no size or the line no polygon.
+    """
+    lines = page.get("lines") or []
+    width, height = page.get("width"), page.get("height")
+    if not width or not height:
+        return [None] * len(lines)
+    theta = math.radians(page.get("angle") or 0.0)
+    sin_t, cos_t = math.sin(theta), math.cos(theta)
+    # y' = -x sin + y cos, normalized by the extent of the rotated page rectangle
+    corners = [-x * sin_t + y * cos_t for x, y in ((0, 0), (width, 0), (0, height), (width, height))]
+    y_min, y_span = min(corners), (max(corners) - min(corners)) or 1.0
+    tops = []
+    for ln in lines:
+        poly = ln.get("polygon") or []
+        if len(poly) < 2:
+            tops.append(None)
+            continue
+        top = min(-x * sin_t + y * cos_t for x, y in zip(poly[0::2], poly[1::2]))
+        tops.append((top - y_min) / y_span)
+    return tops
+
+def page_lines_from_di(pages):
+    """pages: iterable of analyzeResult.pages[*] -> dict[pageNumber] = [(top fraction, line text), ...]."""
+    out = {}
+    verbose = log.isEnabledFor(logging.DEBUG)
+    with PROF.stage("build_text"):
+        for p in PROF.timed_iter("load_json", pages):
+            pg = p.get("pageNumber")
+            lines = p.get("lines") or []
+            out[pg] = [(top, (ln.get("content") or "").strip())
+                       for top, ln in zip(line_tops(p), lines) if ln.get("content")]
+
+            if verbose:
+                line_texts = [t for _, t in out[pg]]
+                dbg(f"Page {pg}: lines={len(line_texts)}, text_len={len(' '.join(line_texts))}")
+                for i, t in enumerate(line_texts[:10], 1):
+                    dbg(f"  line[{i}]: {repr(t)}")
+                if len(line_texts) > 10:
+                    dbg(f"  ... ({len(line_texts) - 10} more lines)")
+    PROF.count("pages", len(out))
+    return out
+
+def page_text_from_lines(page_lines: dict, band=None):
+    """
+    dict[pageNumber] = joined line text. With band (0..1), only lines whose top edge lies in
+    the top `band` of the page; pages with nothing there (or no polygons) map to "".
+    """
+    if band is None:
+        return {pg: " ".join(t for _, t in lines) for pg, lines in page_lines.items()}
+    return {pg: " ".join(t for top, t in lines if top is not None and top <= band)
+            for pg, lines in page_lines.items()}
+
+# ---------------- Hand-coded machine list & flexible regex variants ----------------
+def flex(token: str) -> str:
+    r"""
+    Turn 'CUTTER # 2' into a forgiving regex that allows spaces/hyphens/underscores.
+    Also make '#' spacing optional. (No re.sub replacement with \s to avoid Py3.13 issues.)
+    """
+    token = token.strip()
+    if not token:
+        return ""
+    parts = re.split(r"[ \-_]+", token)
+    parts_esc = [re.escape(p) for p in parts if p]
+    pattern = r"[\s\-_]*".join(parts_esc)
+    pattern = pattern.replace(r"\#", r"\s*#\s*")
+    return pattern
+
+def build_machine_catalog():
+    """
+    Hard-coded machines + regex variants for messy OCR.
+    Returns:
+      display_names (ordered list),
+      regex_variants: dict[display_name] -> list of ready-to-use regex strings,
+      matcher: compiled single-pass machine matcher (see compile_machine_matcher)
+    """
+    display_names = [
+        "AW1","Cutter1","Cutter2","Die-cutter","Jennerjahn",
+        "Pc1","Pc2","Pc3","Pc5","Sheeter1","Sheeter2"
+    ]
+
+    raw_variants = defaultdict(set)
+    for disp in display_names:
+        raw_variants[disp].add(disp)
+        low = disp.lower()
+
+        if low.startswith("cutter"):
+            m = re.search(r"(\d+)$", low)
+            if m:
+                n = m.group(1)
+                raw_variants[disp].update({
+                    f"CUTTER {n}", f"CUTTER #{n}", f"CUTTER_{n}", f"CUTTER-{n}",
+                    f"Cutter {n}", f"Cutter #{n}", f"Cutter_{n}", f"Cutter-{n}",
+                    f"CUTTER#{n}", f"Cutter#{n}"
+                })
+
+        if low.startswith("pc"):
+            m = re.search(r"(\d+)$", low)
+            if m:
+                n = m.group(1)
+                raw_variants[disp].update({f"PC{n}", f"PC {n}", f"PC_{n}", f"PC-{n}", f"Pc{n}", f"Pc {n}"})
+
+        if low.startswith("sheeter"):
+            m = re.search(r"(\d+)$", low)
+            if m:
+                n = m.group(1)
+                raw_variants[disp].update({f"SHEETER{n}", f"SHEETER {n}", f"SHEETER_{n}", f"Sheeter {n}"})
+
+        if low == "die-cutter":
+            raw_variants[disp].update({"DIE-CUTTER","DIE CUTTER","Die Cutter","Die-Cutter"})
+
+        if low == "aw1":
+            raw_variants[disp].update({"AW1","AW 1","AW-1","AW_1"})
+
+        if low == "jennerjahn":
+            raw_variants[disp].add("JENNERJAHN")
+
+    regex_variants = {disp: sorted({flex(v) for v in raw_variants[disp] if v})
+                      for disp in display_names}
+    matcher = compile_machine_matcher(display_names, regex_variants)
+    return display_names, regex_variants, matcher
+
+def compile_machine_matcher(display_order, regex_variants):
+    """
+    One compiled, case-insensitive alternation over all variants of all machines:
+      (?P<m0>variantA|variantB|...)|(?P<m1>...)|...
+    plus a prefilter of the variants' leading literals ('cutter', 'pc', ...) so the big
+    alternation is only tried at offsets where a machine name can start. Longer variants
+    are tried first within a machine; case-only duplicates are dropped.
+    Returns {"prefilter": regex|None, "rx": regex|None, "groups": {'m0': 'AW1', ...}}
+    """
+    group_to_display = {}
+    branches = []
+    leads = set()
+    for i, disp in enumerate(display_order):
+        pats = {}
+        for p in sorted({rx for rx in regex_variants.get(disp, []) if rx}, key=lambda p: (-len(p), p)):
+            pats.setdefault(p.lower(), p)
+        if not pats:
+            continue
+        for p in pats.values():
+            lead = re.match(r"[A-Za-z0-9]+", p)
+            leads.add(lead.group(0).lower() if lead else "")
+        grp = f"m{i}"
+        group_to_display[grp] = disp
+        branches.append(f"(?P<{grp}>" + "|".join(f"(?:{p})" for p in pats.values()) + ")")
+
+    if not branches:
+        return {"prefilter": None, "rx": None, "groups": group_to_display}
+
+    prefilter = None
+    if "" not in leads:
+        # 'cutter' already finds every 'cutter1' start, so keep only the shortest prefixes
+        leads = {k for k in leads if not any(o != k and k.startswith(o) for o in leads)}
+        # zero-width lookahead so overlapping starts ('aaw1' for lead 'aw') are all visited
+        prefilter = re.compile("(?=" + "|".join(re.escape(k) for k in sorted(leads, key=lambda k: (-len(k), k))) + ")",
+                               flags=re.IGNORECASE)
+    return {
+        "prefilter": prefilter,
+        "rx": re.compile("|".join(branches), flags=re.IGNORECASE),
+        "groups": group_to_display,
+    }
+
+def first_machine_hit(matcher, text: str):
+    """Earliest machine mention in text as (display_name, re.Match), or None."""
+    rx = matcher["rx"]
+    if rx is None or not text:
+        return None
+    if matcher["prefilter"] is None:
+        m = rx.search(text)
+    else:
+        m = None
+        for cand in matcher["prefilter"].finditer(text):
+            m = rx.match(text, cand.start())
+            if m:
+                break
+    return (matcher["groups"][m.lastgroup], m) if m else None
+
+# ---------------- Detect a machine per page (header band first, then whole page) ---
+def fuzzy_best_per_page(norm_texts, display_order, regex_variants, workers=-1):
+    """
+    Batched fuzzy ranking for pages the regex pass missed.
+    Every variant is normalized ONCE (duplicates collapse to one column), then a single
+    rapidfuzz.process.cdist call scores the (page x variant) matrix with WRatio across
+    `workers` threads (-1 = all cores). Pages are the queries so each long page string is
+    preprocessed once. NumPy then takes the max over each machine's variants and the argmax
+    over machines per page (ties keep the earlier machine in display_order, like the old loop).
+    Returns list[(display_name, score)] aligned with norm_texts.
+    """
+    if not norm_texts:
+        return []
+    owners, variant_norms = [], []
+    for i, disp in enumerate(display_order):
+        for v in regex_variants.get(disp) or [disp]:
+            owners.append(i)
+            variant_norms.append(normalize(v))
+    owners = np.asarray(owners)
+    choices, col_of_variant = np.unique(variant_norms, return_inverse=True)
+
+    scores = process.cdist(norm_texts, choices.tolist(), scorer=fuzz.WRatio, workers=workers)  # (pages, unique variants)
+    scores = scores[:, col_of_variant]                                                     # (pages, variants)
+    starts = np.flatnonzero(np.r_[True, owners[1:] != owners[:-1]])                        # first variant per machine
+    per_machine = np.maximum.reduceat(scores, starts, axis=1)                              # (pages, machines)
+    best = per_machine.argmax(axis=1)
+    return [(display_order[owners[starts[b]]], float(per_machine[j, b])) for j, b in enumerate(best)]
+
+def _detect_region(texts: dict, pages, region: str, display_order, regex_variants, fuzzy_threshold, matcher,
+                   fuzzy_workers):
+    """One regex + batched-fuzzy pass over texts[pg] for the given pages -> dict[pg] = display name."""
+    found = {}
+    fuzzy_pages, fuzzy_texts = [], []
+    with PROF.stage("detect_regex"):
+        for pg in pages:
+            raw = texts.get(pg) or ""
+            norm_txt = normalize(raw)
+
+            # 1) Regex pass (single precompiled alternation, earliest hit wins)
+            hit = first_machine_hit(matcher, raw)
+            if hit:
+                found[pg], m = hit
+                dbg(f"Page {pg}: REGEX ({region}) matched '{found[pg]}' via {m.group(0)!r} at offset {m.start()}")
+            elif norm_txt:
+                fuzzy_pages.append(pg)
+                fuzzy_texts.append(norm_txt)
+            else:
+                dbg(f"Page {pg}: no {region} text.")
+    PROF.count(f"{region}_regex_hits", len(found))
+
+    # 2) Fuzzy pass (all regex misses scored in one batch)
+    with PROF.stage("detect_fuzzy"):
+        ranked = fuzzy_best_per_page(fuzzy_texts, display_order, regex_variants, workers=fuzzy_workers)
+        for pg, (best_disp, best_score) in zip(fuzzy_pages, ranked):
+            dbg(f"Page {pg}: FUZZY ({region}) best='{best_disp}' score={best_score:.1f}")
+            if best_score >= fuzzy_threshold:
+                found[pg] = best_disp
+                PROF.count(f"{region}_fuzzy_hits")
+    PROF.count(f"{region}_fuzzy_scored", len(fuzzy_pages))
+    PROF.count("fuzzy_chars", sum(len(t) for t in fuzzy_texts))
+    return found
+
+def detect_machine_per_page(page_text: dict, display_order, regex_variants, fuzzy_threshold=85, matcher=None,
+                            fuzzy_workers=-1, header_text=None, classifier=None, min_prob=MODEL_MIN_PROB):
+    """
+    page_text: dict[pageNumber] = full page text.
+    header_text: optional dict[pageNumber] = header-band text (page_text_from_lines(..., band)).
+      The machine name sits in the form header, so the header band is tried first (regex, then
+      fuzzy) and only pages still unresolved fall back to the full page. This keeps body
+      mentions ("Cutter 2 down") from winning and feeds fuzz.WRatio a fraction of the text.
+    classifier: optional page_classifier.MachineClassifier (--detect model). Exact regex hits in
+      the header band still win; every other page is classified in ONE predict call, pages
+      scoring >= min_prob take the model's machine and only the rest go through the passes above.
+    Returns dict[pageNumber] = display_name
+    """
+    if matcher is None:
+        matcher = compile_machine_matcher(display_order, regex_variants)
+    args = (display_order, regex_variants, fuzzy_threshold, matcher, fuzzy_workers)
+
+    remaining = sorted(page_text.keys())
+    page_to_machine = {}
+    if classifier is not None:
+        if header_text is not None:
+            with PROF.stage("detect_regex"):
+                for pg in remaining:
+                    hit = first_machine_hit(matcher, header_text.get(pg) or "")
+                    if hit:
+                        page_to_machine[pg] = hit[0]
+                        dbg(f"Page {pg}: REGEX (header) matched '{hit[0]}' via {hit[1].group(0)!r}")
+            PROF.count("header_regex_hits", len(page_to_machine))
+            remaining = [pg for pg in remaining if pg not in page_to_machine]
+        with PROF.stage("detect_model"):
+            labels, probs = classifier.predict([page_text[pg] or "" for pg in remaining])
+        for pg, label, p in zip(remaining, labels, probs):
+            dbg(f"Page {pg}: MODEL best='{label}' p={p:.2f}")
+            if p >= min_prob and label in display_order:
+                page_to_machine[pg] = label
+                PROF.count("model_hits")
+        remaining = [pg for pg in remaining if pg not in page_to_machine]
+    if header_text is not None:
+        page_to_machine.update(_detect_region(header_text, remaining, "header", *args))
+        remaining = [pg for pg in remaining if pg not in page_to_machine]
+    page_to_machine.update(_detect_region(page_text, remaining, "page", *args))
+    for pg in remaining:
+        if pg not in page_to_machine:
+            dbg(f"Page {pg}: no machine detected (regex+fuzzy).")
+
+    PROF.count("no_machine", len(page_text) - len(page_to_machine))
+    page_to_machine = dict(sorted(page_to_machine.items()))
+    dbg(f"Final page→machine mapping: {page_to_machine}")
+    return page_to_machine
+
+@lru_cache(maxsize=2)   # batch workers load it once, not once per file
+def load_classifier(model_path):
+    """--detect model: the trained page classifier (page_classifier.py; needs scikit-learn + scipy)."""
+    from page_classifier import MachineClassifier   # optional dependency, only imported for --detect model
+    return MachineClassifier(model_path)
+
+# ---------------- Azure DI table -> DataFrame (vectorized, spans expanded) ---------
+def table_to_dataframe(tbl):
+    """
+    Azure DI table -> DataFrame, NumPy-backed.
+    - Cell grid is filled with fancy indexing; rowSpan/columnSpan cells are expanded so merged
+      cells repeat their content instead of leaving blank holes.
+    - Grid rows/columns in which no cell starts (pure span continuations) are dropped, so a
+      header spanning two grid columns stays ONE column.
+    - A single cell spanning the full width is a form title and is not expanded, so as before
+      it heads the first column and the row under it is the first body row.
+    - Header = first non-empty row; fully-empty body rows/columns are dropped with boolean masks.
+    """
+    cells = tbl.get("cells", []) or []
+    if not cells:
+        return pd.DataFrame()
+    n = len(cells)
+    r0 = np.fromiter((c.get("rowIndex", 0) for c in cells), dtype=np.int64, count=n)
+    c0 = np.fromiter((c.get("columnIndex", 0) for c in cells), dtype=np.int64, count=n)
+    rs = np.fromiter((c.get("rowSpan", 1) or 1 for c in cells), dtype=np.int64, count=n)
+    cs = np.fromiter((c.get("columnSpan", 1) or 1 for c in cells), dtype=np.int64, count=n)
+    txt = np.array([(c.get("content") or "").strip() for c in cells], dtype=object)
+    n_rows, n_cols = int((r0 + rs).max()), int((c0 + cs).max())
+
+    grid = np.full((n_rows, n_cols), "", dtype=object)
+    title = (c0 == 0) & (cs >= n_cols) & (n_cols > 1)
+    span = np.flatnonzero(((rs > 1) | (cs > 1)) & ~title)
+    if span.size:
+        # every (row, col) covered by a spanned cell: repeat the cell once per covered slot
+        sizes = rs[span] * cs[span]
+        owner = np.repeat(span, sizes)
+        local = np.arange(sizes.sum()) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+        grid[r0[owner] + local // cs[owner], c0[owner] + local % cs[owner]] = txt[owner]
+    grid[r0, c0] = txt   # origins last, so a cell's own slot always holds its own text
+
+    # keep only rows/cols where some cell starts
+    keep_r = np.zeros(n_rows, dtype=bool)
+    keep_r[r0] = True
+    keep_c = np.zeros(n_cols, dtype=bool)
+    keep_c[c0] = True
+    grid = grid[keep_r][:, keep_c]
+    filled = grid.astype(bool)   # "" -> False
+
+    # header = first non-empty row
+    nonempty = np.flatnonzero(filled.any(axis=1))
+    if not nonempty.size:
+        return pd.DataFrame()
+    header_idx = int(nonempty[0])
+
+    header = [str(h).strip() for h in grid[header_idx]]
+    # unique headers
+    seen = {}
+    cols = []
+    for h in header:
+        h2 = h if h else "col"
+        seen[h2] = seen.get(h2, 0) + 1
+        if seen[h2] > 1:
+            h2 = f"{h2}_{seen[h2]}"
+        cols.append(h2)
+
+    # drop fully-empty cols/rows
+    body, body_filled = grid[header_idx + 1:], filled[header_idx + 1:]
+    col_mask = body_filled.any(axis=0)
+    body = body[body_filled.any(axis=1)][:, col_mask]
+    return pd.DataFrame(body, columns=[c for c, keep in zip(cols, col_mask) if keep])
+
+# ---------------- Typed columns (numbers, dates, shifts, checkboxes, categoricals) -
+MIN_PARSED = 0.75  # share of a column's non-blank cells that must parse before it is typed
+RAW_SUFFIX = " (raw)"  # sidecar column holding the cells of a typed column that did not parse
+NUMBER_RX = r'^\s*([-+]?(?:\d{1,3}(?:,\d{3})+|\d*)(?:\.\d+)?)\s*(?:lbs?|#|yds?|ft|in|%|")?\.?\s*$'
+DATE_RX = r"^\s*(\d{1,2})[/\-.](\d{1,2})(?:[/\-.](\d{4}|\d{2}))?\s*$"
+FULL_DATE_RX = r"(?<![\d/\-.])(1[0-2]|0?[1-9])[/\-](3[01]|[12]\d|0?[1-9])[/\-](\d{4}|\d{2})(?![\d/\-.])"  # in free text
+NAME_YEAR_RX = r"(?<!\d)(20\d{2})(?!\d)"   # 'September 2025', 'logs_2025-09' (not inside '20251006091250')
+SHIFT_WORDS = {"first": "1", "1st": "1", "day": "1", "second": "2", "2nd": "2", "third": "3", "3rd": "3", "night": "3"}
+CATEGORY_COLS = re.compile(r"shift|operator|machine|material", re.IGNORECASE)
+ID_COLS = re.compile(r"(prod(uction)?|lot|order|job)\s*#|\bid\b", re.IGNORECASE)   # keep as text
+TIME_COLS = re.compile(r"\btime\b", re.IGNORECASE)                                 # "8.30" is not a number
+
+def _parsed_enough(parsed: pd.Series, blank: pd.Series) -> bool:
+    n = int((~blank).sum())
+    return n > 0 and parsed[~blank].notna().sum() >= MIN_PARSED * n
+
+def parse_selection_marks(s: pd.Series) -> pd.Series:
+    """DI checkbox cells (':selected:' / ':unselected:', maybe with OCR specks) -> True/False; else NA."""
+    sel = s.str.contains(r"(?<!un):selected:")
+    unsel = s.str.contains(":unselected:", regex=False)
+    mark_only = s.str.replace(r":(?:un)?selected:|[\W_]", "", regex=True).eq("")
+    out = pd.Series(pd.NA, index=s.index, dtype="boolean")
+    out[mark_only & sel & ~unsel] = True
+    out[mark_only & unsel & ~sel] = False
+    return out
+
+def parse_numbers(s: pd.Series) -> pd.Series:
+    """'1,234' / '1380 lbs' / '20#' / '40.09' -> float; anything else -> NaN."""
+    num = s.str.extract(NUMBER_RX, flags=re.IGNORECASE, expand=False).str.replace(",", "", regex=False)
+    return pd.to_numeric(num.replace("", None), errors="coerce")
+
+def parse_dates(s: pd.Series, default_year=None) -> pd.Series:
+    """
+    '9/12', '09/12', '9/12/25', '9-12-2025' -> Timestamp (month first); missing year -> default_year,
+    or NaT when default_year is None.
+    """
+    parts = s.str.extract(DATE_RX).apply(pd.to_numeric, errors="coerce")
+    year = parts[2].where(parts[2] >= 100, parts[2] + 2000)
+    if default_year is not None:
+        year = year.fillna(default_year)
+    return pd.to_datetime(pd.DataFrame({"year": year, "month": parts[0], "day": parts[1]}), errors="coerce")
+
+def parse_shifts(s: pd.Series) -> pd.Series:
+    """'1', 'Shift 2', '2nd', 'Night' -> '1'/'2'/'3'; other text is kept as written."""
+    low = s.str.strip().str.lower()
+    digit = low.str.extract(r"(?:^|shift\s*)([1-3])(?:st|nd|rd)?\b", expand=False)
+    return digit.fillna(low.map(SHIFT_WORDS)).fillna(s.str.strip()).replace("", None)
+
+def _most_common_year(years: pd.Series):
+    years = pd.to_numeric(years, errors="coerce").dropna()
+    if years.empty:
+        return None
+    y = int(years.mode().iloc[0])
+    return y if y >= 100 else y + 2000
+
+def infer_year(frames, texts=(), source=None):
+    """
+    Year for dates written without one ('9/12'), taken from the document itself, in order:
+    the most common explicit year in the frames' 'date' columns, the most common year of the
+    full dates ('9/12/2025') in texts (page text), a 4-digit year in the source's file or folder
+    name ('September 2025/...'). None when none of them has one: coerce_table_types then keeps
+    those dates in the '(raw)' sidecar instead of stamping a guessed year on them.
+    """
+    date_cols = [df[c].astype(str) for df in frames for c in df.columns if "date" in str(c).lower()]
+    if date_cols:
+        year = _most_common_year(pd.concat(date_cols).str.extract(DATE_RX)[2])
+        if year:
+            return year
+    found = [m.group(3) for t in texts if t for m in re.finditer(FULL_DATE_RX, t)]
+    year = _most_common_year(pd.Series(found, dtype=object))
+    if year:
+        return year
+    if source is not None:
+        for part in (Path(source).name, Path(source).parent.name):
+            m = re.search(NAME_YEAR_RX, part)
+            if m:
+                return int(m.group(1))
+    if date_cols:
+        log.warning(f"No year found in {source or 'the document'}; dates without a year are kept in "
+                    f"'{RAW_SUFFIX.strip()}' columns (pass --year to set one).")
+    return None
+
+def coerce_table_types(df: pd.DataFrame, default_year=None) -> pd.DataFrame:
+    """
+    Type one extracted table column by column, so consumers never re-parse strings:
+      checkbox columns (only ':selected:'/':unselected:') -> boolean (✓/blank in the xlsx)
+      'date' columns                                  -> datetime64
+      'shift' columns                                 -> category of '1'/'2'/'3'
+      number-like columns ('1,234', '1380 lbs')      -> Int32 when whole, else float64
+      shift/operator/machine/material and other repetitive text -> category
+    A column is only typed when at least MIN_PARSED of its non-blank cells parse; blanks become
+    missing, and the stragglers are kept as text in '<col> (raw)' columns after all the table's
+    own columns, so no source cell is lost and the table's columns keep their positions.
+    Time and ID columns (Prod #, Lot#) stay text. Dates without a year take default_year
+    (infer_year); with None they count as unparsed.
+    """
+    out, raw = {}, {}
+    for col in df.columns:
+        s = df[col].astype(str).str.strip()
+        blank = s.eq("")
+        name = str(col)
+        typed = None
+
+        marks = parse_selection_marks(s)
+        if (~blank).any() and marks[~blank].notna().all():   # nothing but checkbox marks
+            typed = marks
+        elif "date" in name.lower():
+            dates = parse_dates(s, default_year)
+            if _parsed_enough(dates, blank):
+                typed = dates
+        elif "shift" in name.lower():
+            typed = parse_shifts(s).astype("category")
+        elif not ID_COLS.search(name) and not TIME_COLS.search(name):
+            nums = parse_numbers(s)
+            if _parsed_enough(nums, blank):
+                vals = nums.dropna()
+                if (vals == vals.round()).all() and vals.abs().max() < 2 ** 31:
+                    typed = nums.round().astype("Int32")
+                else:
+                    typed = nums.astype("float64")   # float32 turns 40.09 into 40.09000015258789
+
+        if typed is None:
+            text = s.where(~blank, None)
+            n = int((~blank).sum())
+            if CATEGORY_COLS.search(name) or (n >= 4 and text.nunique() <= n // 2):
+                typed = text.astype("category")
+            else:
+                typed = text
+        out[col] = typed
+
+        unparsed = ~blank & typed.isna()
+        if unparsed.any():
+            raw[f"{name}{RAW_SUFFIX}"] = s.where(unparsed, None)
+    return pd.DataFrame({**out, **raw}, index=df.index)
+
+def marks_as_text(df: pd.DataFrame) -> pd.DataFrame:
+    """Checkbox (boolean) columns -> '✓' / blank, as on the paper log; for the xlsx only."""
+    cols = [c for c, dt in df.dtypes.items() if pd.api.types.is_bool_dtype(dt)]
+    if not cols:
+        return df
+    df = df.copy()
+    for c in cols:
+        df[c] = df[c].map({True: "✓", False: ""}, na_action="ignore")
+    return df
+
+# ---------------- Sheet names / table collection ----------------------------------
+def sanitize_sheet_name(name: str) -> str:
+    s = re.sub(r'[^A-Za-z0-9 _\-#]', '_', name).strip()
+    return s[:31] if s else "Sheet"
+
+def convert_tables(tables):
+    """
+    tables: iterable of analyzeResult.tables[*] (e.g. iter_di_tables(path)), consumed once.
+    Returns list of (first page, last page, DataFrame) for the non-empty tables, in document
+    order. A DI table whose boundingRegions cover several pages is still ONE entry.
+    """
+    page_frames = []
+    with PROF.stage("table_convert"):
+        for tbl in PROF.timed_iter("load_json", tables):
+            PROF.count("tables")
+            PROF.count("table_cells", len(tbl.get("cells") or []))
+            # Which pages is this table on (usually one)?
+            pgs = {br.get("pageNumber") for br in tbl.get("boundingRegions", []) if br.get("pageNumber")}
+
+            df = table_to_dataframe(tbl)
+            if df is None or df.empty:
+                continue
+            page_frames.append((min(pgs, default=1), max(pgs, default=1), df))
+    PROF.count("tables_nonempty", len(page_frames))
+    return page_frames
+
+def stitch_continuations(page_frames, page_to_machine: dict):
+    """
+    Merge tables that continue onto the next page into one frame.
+    A table continues the previous one when it starts on the page right after the previous
+    one ends, has the same header (same column count and names), and that page is not
+    assigned to a different machine. Each run is concatenated once, so every table comes
+    out exactly once no matter how many pages it spans.
+    Returns list of (first page, last page, DataFrame).
+    """
+    runs = []   # [first, last, [parts]]
+    for first, last, df in page_frames:
+        if runs and not df.empty:
+            prev = runs[-1]
+            prev_cols = prev[2][0].columns
+            machine = page_to_machine.get(first)
+            if (first == prev[1] + 1 and len(df.columns) == len(prev_cols) and (df.columns == prev_cols).all()
+                    and machine in (None, page_to_machine.get(prev[0]))):
+                dbg(f"Table on page {first} continues the table from page {prev[0]}; merged.")
+                prev[1] = last
+                prev[2].append(df)
+                continue
+        runs.append([first, last, [df]])
+    PROF.count("tables_stitched", len(page_frames) - len(runs))
+    return [(first, last, parts[0] if len(parts) == 1 else pd.concat(parts, ignore_index=True))
+            for first, last, parts in runs]
+
+def sheet_columns(dfs):
+    """
+    Union of the column names of a sheet's tables, in first-seen order with the '(raw)'
+    sidecars last. Tables differ in their sidecars, so every table is reindexed to this one
+    header before it is written (the append workbook's sheets, the Parquet dataset).
+    """
+    cols = list(dict.fromkeys(c for df in dfs for c in df.columns))
+    raw = [c for c in cols if str(c).endswith(RAW_SUFFIX)]
+    return [c for c in cols if c not in raw] + raw
+
+# ---------------- Columnar sidecar: Parquet dataset partitioned by machine / doc ----
+PARQUET_DIRNAME = "production_logs_parquet"
+
+def doc_stem(json_path) -> str:
+    """'doc123_ocr.pdf.json' -> 'doc123'"""
+    stem = Path(json_path).name
+    for suffix in (".json", ".pdf", "_ocr"):
+        if stem.lower().endswith(suffix):
+            stem = stem[: -len(suffix)]
+    return stem
+
+def drop_doc_partitions(dataset_dir, source_doc: str) -> int:
+    """
+    Delete every machine=*/source_doc=<doc> folder of the dataset, including machines this run
+    no longer detects, so a re-run never leaves a doc's old rows behind. Other docs' partitions
+    are untouched (batch workers write different docs side by side). Returns how many went.
+    """
+    dropped = 0
+    for part in Path(dataset_dir).glob("machine=*/source_doc=*"):
+        # pyarrow URL-encodes partition values ('912%20Production%20Logs%20Manual')
+        if part.is_dir() and unquote(part.name.split("=", 1)[1]) == source_doc:
+            shutil.rmtree(part)
+            dropped += 1
+    return dropped
+
+def write_parquet_dataset(sheet_tables, dataset_dir, source_doc: str):
+    """
+    Write each machine's combined table to <dataset_dir>/machine=<sheet>/source_doc=<doc>/*.parquet
+    (hive partitioning, so pd.read_parquet(dataset_dir, columns=[...], filters=[...]) projects
+    and prunes). Tables on a sheet are concatenated by column name; table_no keeps their order.
+    Rewriting the same doc first drops all of that doc's partitions (drop_doc_partitions), under
+    every machine. Column sets and types differ per machine, so read one machine's folder at a
+    time (pd.read_parquet(dataset_dir / "machine=Pc1")).
+    """
+    dataset_dir = Path(dataset_dir)
+    with PROF.stage("parquet_write"):
+        dropped = drop_doc_partitions(dataset_dir, source_doc)
+        if dropped:
+            dbg(f"Parquet: dropped {dropped} old partition(s) of source_doc={source_doc}")
+        for sheet, dfs in sheet_tables.items():
+            if not dfs:
+                continue
+            combined = pd.concat([df.assign(table_no=i) for i, df in enumerate(dfs)], ignore_index=True)
+            combined = combined[sheet_columns(dfs) + ["table_no"]]   # same column order as the sheet
+            combined["machine"] = sheet
+            combined["source_doc"] = source_doc
+            # a column typed in one table but left as text in another concatenates to mixed object
+            for c in combined.columns[combined.dtypes == object]:
+                combined[c] = combined[c].astype("string")
+            combined.to_parquet(dataset_dir, engine="pyarrow", index=False,
+                                partition_cols=["machine", "source_doc"],
+                                existing_data_behavior="delete_matching")
+    print(f"Parquet written: {dataset_dir.resolve()} (source_doc={source_doc}, machines={list(sheet_tables)})")
@@ -1,23 +1,24 @@
 import streamlit as st
-import pandas as pd
 import base64
 from datetime import date
 from io import StringIO
-import requests
 
 # ---------------------------------------------------------
-# Streamlit Page Config
+# Page Header (page config is set once in app.py)
 # ---------------------------------------------------------
-st.set_page_config(page_title="Daily Production Entry", layout="wide")
 st.title("🧾 Daily Production Output Log")
 st.caption("Submit daily machine output. Data is automatically saved to GitHub.")
 
 # ---------------------------------------------------------
 # GitHub Setup
 # ---------------------------------------------------------
-GITHUB_TOKEN = st.secrets["github_token"]
-REPO = st.secrets["github_repo"]
-FILE_PATH = st.secrets["github_file_path"]
+try:
+    GITHUB_TOKEN = st.secrets["github_token"]
+    REPO = st.secrets["github_repo"]
+    FILE_PATH = st.secrets["github_file_path"]
+except (KeyError, FileNotFoundError) as e:
+    st.error(f"❌ GitHub secrets are not configured for this app ({e}). Add them to .streamlit/secrets.toml.")
+    st.stop()
 BRANCH = st.secrets.get("github_branch", "main")
 USER_EMAIL = st.secrets.get("github_user_email", "unknown@example.com")
 USER_NAME = st.secrets.get("github_user_name", "Streamlit Bot")
@@ -130,6 +131,7 @@ with st.form("daily_output_form", clear_on_submit=False):
 # ---------------------------------------------------------
 def fetch_github_file():
     """Fetch existing CSV content and SHA for the GitHub file."""
+    import requests
     response = requests.get(API_URL, headers=HEADERS)
     if response.status_code == 200:
         content = base64.b64decode(response.json()["content"]).decode("utf-8")
@@ -142,6 +144,7 @@ def fetch_github_file():
 
 def commit_to_github(updated_csv, sha=None):
     """Commit updated CSV back to GitHub."""
+    import requests
     message = f"Add daily output log for {entry_date} ({shift})"
     content_encoded = base64.b64encode(updated_csv.encode()).decode()
     payload = {
@@ -166,6 +169,8 @@ if submitted:
         err_list = ", ".join(validation_errors)
         st.error(f"If machine had 0 production, please check the box for No Schedule. Affected machines: {err_list}")
     else:
+        import pandas as pd
+
         df_new = pd.DataFrame(rows)
         df_new.insert(0, "Machine Name", df_new.pop("Machine Name"))
         df_new.insert(1, "Date", entry_date)
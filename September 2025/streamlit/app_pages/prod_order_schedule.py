@@ -0,0 +1,12 @@
+import streamlit as st
+from shared import open_prod_orders, refresh_button
+
+st.title("Prod Order Schedule")
+
+# ---------------------------------------------------------
+# Open production orders (shared P21 connection + cached query, see shared.py)
+# ---------------------------------------------------------
+refresh_button("refresh_prod_order_schedule")
+df = open_prod_orders()
+
+st.dataframe(df)
@@ -0,0 +1,161 @@
+import streamlit as st
+import numpy as np
+import plotly.graph_objects as go
+from shared import load_date_bounds, load_summaries, load_trends, source_signature
+from store import STORE_PATH, build_instructions
+from trends import MAX_POINTS, downsample
+
+data_path = STORE_PATH
+
+st.title("🏭 Production Output Dashboard")
+
+# -----------------------------------------------------------
+# PRODUCTION STORE (queries cached across reruns and sessions, see shared.py)
+# -----------------------------------------------------------
+# The page only reads: building or migrating the store is the sync's / store.py's job
+try:
+    signature = source_signature(data_path)
+    first_day, last_day = load_date_bounds(str(data_path), signature)
+except FileNotFoundError:
+    st.error(f"❌ No production store at '{data_path}'.")
+    st.markdown(build_instructions(data_path))
+    st.stop()
+except Exception as e:
+    st.error(f"❌ Error reading production data: {e}")
+    st.stop()
+
+if first_day is None:
+    st.warning("No production data recorded yet.")
+    st.stop()
+
+# -----------------------------------------------------------
+# DATE RANGE FILTER (every chart and table below uses it)
+# -----------------------------------------------------------
+picked = st.date_input("Shift date range", value=(first_day, last_day), min_value=first_day, max_value=last_day)
+start, end = picked if len(picked) == 2 else (picked[0], picked[0])   # mid-selection: one day picked
+st.write(f"Shift Date Range: {start:%B} {start.day}, {start.year} – {end:%B} {end.day}, {end.year}")
+
+agg_df, shift_df = load_summaries(str(data_path), signature, start, end)
+if agg_df.empty:
+    st.warning("No production data in the selected date range.")
+    st.stop()
+
+machines = agg_df["Machine Name"].tolist()
+
+# -----------------------------------------------------------
+# CHART 1: Bar by Machine, colored by Shift (avg per shift)
+# -----------------------------------------------------------
+st.markdown("---")
+st.header("Chart 1: Average Daily Production by Machine and Shift")
+
+# Sort by total avg per machine
+sort_order = (
+    shift_df.groupby("Machine Name")["Avg Daily LB Produced"].mean().sort_values(ascending=False).index.tolist()
+)
+shifts = sorted(shift_df["Shift"].unique())
+
+fig1 = go.Figure()
+for sh in shifts:
+    d = shift_df[shift_df["Shift"] == sh].set_index("Machine Name").reindex(sort_order)
+    fig1.add_bar(
+        name=str(sh),
+        x=sort_order,
+        y=d["Avg Daily LB Produced"],
+        hovertemplate=(
+            "<b>%{x}</b><br>"
+            f"Shift: {sh}<br>"
+            "Avg Daily LB: %{y:.0f}<extra></extra>"
+        ),
+    )
+
+fig1.update_layout(
+    barmode="group",  # or "stack" if you prefer stacking
+    xaxis_title="Machine",
+    yaxis_title="Avg Daily LB Produced",
+    legend_title="Shift",
+    height=500,
+    margin=dict(l=20, r=20, t=40, b=40),
+)
+st.plotly_chart(fig1, use_container_width=True)
+
+# -----------------------------------------------------------
+# CHART 2: Bar by Machine (overall AVG with error bars)
+# -----------------------------------------------------------
+st.markdown("---")
+st.header("Chart 2: Average vs Most/Least Productive Day by Machine")
+
+upper = (agg_df["Most Productive Day"] - agg_df["Avg Daily LB Produced"]).clip(lower=0)
+lower = (agg_df["Avg Daily LB Produced"] - agg_df["Least Productive Day"]).clip(lower=0)
+
+fig2 = go.Figure()
+fig2.add_bar(
+    x=machines,
+    y=agg_df["Avg Daily LB Produced"],
+    error_y=dict(type="data", array=upper, arrayminus=lower, visible=True),
+    hovertemplate=(
+        "<b>%{x}</b><br>"
+        "Avg Daily LB: %{y:.0f}<br>"
+        "Max: %{customdata[0]:.0f}<br>"
+        "Min: %{customdata[1]:.0f}<extra></extra>"
+    ),
+    customdata=np.stack(
+        (agg_df["Most Productive Day"], agg_df["Least Productive Day"]), axis=-1
+    ),
+)
+
+fig2.update_layout(
+    xaxis_title="Machine",
+    yaxis_title="Avg Daily LB Produced",
+    showlegend=False,
+    height=480,
+    margin=dict(l=20, r=20, t=40, b=40),
+)
+st.plotly_chart(fig2, use_container_width=True)
+
+# -----------------------------------------------------------
+# CHART 3: Daily trend per machine (rolling averages, downsampled)
+# -----------------------------------------------------------
+st.markdown("---")
+st.header("Chart 3: Daily Production Trend by Machine")
+
+trends = load_trends(str(data_path), signature)
+col_a, col_b = st.columns([3, 1])
+trend_machines = col_a.multiselect("Machines", machines, default=machines[:3])
+series_name = col_b.radio("Series", list(trends), index=1)
+
+fig3 = go.Figure()
+for m in trend_machines:
+    # window averages come from the full history; only the slice is downsampled and sent
+    dates, values = downsample(trends[series_name].loc[str(start):str(end), m], MAX_POINTS)
+    fig3.add_scatter(
+        x=dates,
+        y=values,
+        mode="lines",
+        name=m,
+        hovertemplate=f"<b>{m}</b><br>%{{x|%b %d, %Y}}<br>{series_name}: %{{y:.0f}} LB<extra></extra>",
+    )
+
+fig3.update_layout(
+    xaxis_title="Date",
+    yaxis_title=f"LB Produced ({series_name})",
+    legend_title="Machine",
+    height=480,
+    margin=dict(l=20, r=20, t=40, b=40),
+)
+st.plotly_chart(fig3, use_container_width=True)
+
+# -----------------------------------------------------------
+# Aggregated summary table (daily-level aggregation)
+# -----------------------------------------------------------
+st.markdown("---")
+st.subheader("Aggregated Summary by Machine (Daily Totals Combined)")
+
+# Rename for display consistency
+display_df = agg_df.rename(columns={"# Days": "# Days (with Data)"})
+
+st.dataframe(
+    display_df[
+        ["Machine Name", "Avg Daily LB Produced", "# Days (with Data)", "Most Productive Day", "Least Productive Day"]
+    ],
+    use_container_width=True,
+)
@@ -1,63 +1,21 @@
 import streamlit as st
 import pandas as pd
-import pyodbc
 import plotly.express as px
 from datetime import datetime, timedelta
-from dotenv import load_dotenv
-import os
-
-# Load .env values
-load_dotenv()
-
-uid = os.getenv("STREAMLIT_DB_USER")
-pwd = os.getenv("STREAMLIT_DB_PASS")
-server = "172.22.4.20,1433"
-database = "P21"
+from shared import open_prod_orders, refresh_button
 
 # ---------------------------------------------------------
-# Streamlit Config
+# Page Header (page config is set once in app.py)
 # ---------------------------------------------------------
-st.set_page_config(page_title="Production Weight Dashboard", layout="wide")
 st.title("⚙️ Total Production Weight by Machine & Scheduler")
 
 # ---------------------------------------------------------
-# SQL Connection
+# Open production orders (shared P21 connection + cached query, see shared.py)
 # ---------------------------------------------------------
-conn_str = (
-    "DRIVER={ODBC Driver 17 for SQL Server};"
-    f"SERVER={server};DATABASE={database};UID={uid};PWD={pwd};"
-)
-conn = pyodbc.connect(conn_str)
-
-# ---------------------------------------------------------
-# Query
-# ---------------------------------------------------------
-query = """
-    SELECT 
-        p21_view_prod_order_hdr.prod_order_number,
-        p21_view_prod_order_hdr.expected_completion_date,
-        prod_order_hdr_ud.production_machine,
-        p21_view_inv_mast.net_weight * p21_view_prod_order_line.qty_to_make AS extended_weight,
-        users.name AS scheduler_name
-    FROM 
-        P21.dbo.p21_view_prod_order_hdr AS p21_view_prod_order_hdr
-        INNER JOIN P21.dbo.p21_view_prod_order_line AS p21_view_prod_order_line
-            ON p21_view_prod_order_hdr.prod_order_number = p21_view_prod_order_line.prod_order_number
-        LEFT OUTER JOIN P21.dbo.prod_order_hdr_ud AS prod_order_hdr_ud
-            ON p21_view_prod_order_hdr.prod_order_number = prod_order_hdr_ud.prod_order_number
-        INNER JOIN P21.dbo.p21_view_inv_mast AS p21_view_inv_mast
-            ON p21_view_prod_order_line.inv_mast_uid = p21_view_inv_mast.inv_mast_uid
-        INNER JOIN P21.dbo.p21_view_inv_loc AS p21_view_inv_loc
-            ON p21_view_inv_mast.inv_mast_uid = p21_view_inv_loc.inv_mast_uid
-        INNER JOIN P21.dbo.users AS users
-            ON users.id = p21_view_prod_order_hdr.entered_by
-    WHERE 
-        p21_view_inv_loc.location_id = 210
-        AND p21_view_prod_order_hdr.cancel = 'N'
-        AND p21_view_prod_order_hdr.complete = 'N'
-        AND p21_view_prod_order_line.cancel = 'N'
-"""
-df = pd.read_sql(query, conn)
+refresh_button("refresh_production_weight")
+df = open_prod_orders()[
+    ["prod_order_number", "expected_completion_date", "production_machine", "extended_weight", "scheduler_name"]
+]
 
 # ---------------------------------------------------------
 # Data Prep & Filters
@@ -1,62 +1,34 @@
+import sys
 import pandas as pd
-from openpyxl import load_workbook
 from pathlib import Path
 from datetime import datetime
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))  # store.py lives next to app.py
+from store import STORE_PATH, WORKBOOK_PATH, build_store, connect, export_workbook, normalize_rows, upsert_rows
+
 CSV_PATH = Path("data/daily_output_log.csv")
-XLSX_PATH = Path("data/September Averages.xlsx")
+XLSX_PATH = WORKBOOK_PATH
+DB_PATH = STORE_PATH   # data/September Averages.sqlite (or $PROD_STORE): the system of record, also read by the dashboard
 SHEET_NAME = "Daily by Shifts"
 SUMMARY_FILE = Path("sync_summary.md")
-UNIQUE_KEY = ["Machine Name", "Date", "Shift"]
 
 def append_or_update_rows():
     csv_df = pd.read_csv(CSV_PATH)
-    wb = load_workbook(XLSX_PATH)
-    ws = wb[SHEET_NAME]
-
-    # Load existing Excel data
-    existing_df = pd.DataFrame(ws.values)
-    header = existing_df.iloc[0]
-    existing_df = pd.DataFrame(existing_df.values[1:], columns=header)
-
-    # Normalize types
-    for col in UNIQUE_KEY + ["Notes", "No Schedule"]:
-        if col in csv_df.columns:
-            csv_df[col] = csv_df[col].astype(str)
-        if col in existing_df.columns:
-            existing_df[col] = existing_df[col].astype(str)
-
-    # Merge on key, suffix old columns
-    merged = existing_df.merge(csv_df, on=UNIQUE_KEY, how="outer", suffixes=("_old", ""))
-    update_count = 0
-    new_count = 0
-
-    for col in csv_df.columns:
-        if col not in UNIQUE_KEY:
-            merged[col] = merged[col].combine_first(merged[f"{col}_old"])
-            merged.drop(columns=[f"{col}_old"], inplace=True, errors="ignore")
-
-    # Count updates/new before dedupe
-    before = len(existing_df)
-    after = len(merged)
-    new_count = max(0, after - before)
-
-    # Drop duplicates keeping latest
-    merged = merged.drop_duplicates(subset=UNIQUE_KEY, keep="last")
 
-    # Determine updates by comparing overlapping keys
-    overlap_keys = existing_df.merge(csv_df, on=UNIQUE_KEY, how="inner")
-    update_count = len(overlap_keys)
+    # No store (first run, or none restored from the last run): build it from store.seed_workbooks()
+    migrating = not DB_PATH.exists()
+    if migrating:
+        n = build_store(DB_PATH, sheet=SHEET_NAME)
+        print(f"📦 Created {DB_PATH} from {n} rows of '{SHEET_NAME}'")
+    conn = connect(DB_PATH)
 
-    merged = merged.sort_values(by=["Date", "Shift", "Machine Name"])
+    # Upsert on (Machine Name, Date, Shift); blank CSV fields keep the stored value
+    new_count, update_count = upsert_rows(conn, normalize_rows(csv_df))
 
-    # Write back to Excel
-    wb.remove(ws)
-    ws_new = wb.create_sheet(SHEET_NAME)
-    ws_new.append(list(merged.columns))
-    for _, row in merged.iterrows():
-        ws_new.append(list(row))
-    wb.save(XLSX_PATH)
+    # The workbook is now only an export of the store
+    if migrating or new_count or update_count:
+        export_workbook(conn, XLSX_PATH, SHEET_NAME)
+    conn.close()
 
     # Write markdown summary
     timestamp = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S UTC")
@@ -77,5 +49,4 @@ def append_or_update_rows():
 
 if __name__ == "__main__":
     changed = append_or_update_rows()
-    import sys
     sys.exit(0)
@@ -0,0 +1,93 @@
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+# ---------------- What gets measured ----------------
+# Each configuration runs in a FRESH Python process (nothing pre-imported), through Streamlit's
+# headless AppTest runner, so the numbers include every import a page triggers:
+#   startup  = process start -> first page rendered
+#   rss      = resident memory of that process afterwards (Linux /proc; peak RSS elsewhere)
+# "before": the four separate apps, one process each (what the VM used to run).
+# "after" : the multipage app.py, one process, landing page first, then every other page.
+# The P21 pages connect with pyodbc on first load. Where there is no ODBC driver or P21 server
+# (CI, a laptop) pyodbc has to be stubbed or the pages fail fast, so the numbers EXCLUDE the real
+# driver import and the P21 connect + query time; they compare Streamlit/page import cost only.
+#
+# Typical use, comparing against the last commit before the merge:
+#   git worktree add ../before <commit>
+#   python scripts/bench_startup.py --before "../before/September 2025/streamlit"
+LEGACY_APPS = ["app.py", "app_daily_output.py", "scripts/prod_scheduler.py", "scripts/prod_sched_app.py"]
+PAGES = ["app_pages/daily_output_entry.py", "app_pages/production_weight.py", "app_pages/prod_order_schedule.py"]
+
+CHILD = r"""
+import json, sys, time
+t0 = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+
+def rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            return next(int(l.split()[1]) for l in f if l.startswith("VmRSS")) / 1024
+    except OSError:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+script, pages = sys.argv[1], sys.argv[2:]
+at = AppTest.from_file(script, default_timeout=120)
+at.run()
+out = {"startup_s": time.perf_counter() - t0, "rss_mb": rss_mb(), "failed": [str(e.message) for e in at.exception]}
+for page in pages:
+    at.switch_page(page).run()
+    out["failed"] += [f"{page}: {e.message}" for e in at.exception]
+out["rss_all_pages_mb"] = rss_mb()
+out["total_s"] = time.perf_counter() - t0
+print(json.dumps(out))
+"""
+
+def measure(script: Path, pages=()):
+    """One fresh interpreter running `script` (then `pages`); returns the child's JSON report."""
+    res = subprocess.run([sys.executable, "-c", CHILD, str(script.resolve()), *pages],
+                         cwd=script.parent, capture_output=True, text=True)
+    lines = [l for l in res.stdout.splitlines() if l.startswith("{")]
+    if not lines:
+        raise RuntimeError(f"{script} did not report:\n{res.stderr[-2000:]}")
+    return json.loads(lines[-1])
+
+def best_of(fn, repeat):
+    runs = [fn() for _ in range(repeat)]
+    return min(runs, key=lambda r: r["startup_s"])
+
+def main():
+    ap = argparse.ArgumentParser(description="Startup time and RSS: four separate Streamlit apps vs the multipage app "
+                                             "(P21 connection cost excluded unless a real P21 server is reachable).")
+    ap.add_argument("--before", help="streamlit/ folder of a checkout that still has the separate apps")
+    ap.add_argument("--after", default=str(Path(__file__).resolve().parents[1]), help="streamlit/ folder with the multipage app.py")
+    ap.add_argument("--repeat", type=int, default=3, help="Runs per configuration (fastest start is reported)")
+    args = ap.parse_args()
+
+    if args.before:
+        before = Path(args.before)
+        print("before: one process per app")
+        tot_rss = 0.0
+        for rel in LEGACY_APPS:
+            r = best_of(lambda: measure(before / rel), args.repeat)
+            tot_rss += r["rss_mb"]
+            note = f"  (errors: {'; '.join(r['failed'])[:80]})" if r["failed"] else ""
+            print(f"  {rel:28s} startup {r['startup_s']:6.2f} s   rss {r['rss_mb']:7.1f} MB{note}")
+        print(f"  {'4 processes':28s} {'':16s} rss {tot_rss:7.1f} MB")
+
+    after = Path(args.after)
+    r = best_of(lambda: measure(after / "app.py", PAGES), args.repeat)
+    print("after: one multipage process")
+    print(f"  {'landing page':28s} startup {r['startup_s']:6.2f} s   rss {r['rss_mb']:7.1f} MB")
+    print(f"  {'+ every other page visited':28s} total   {r['total_s']:6.2f} s   rss {r['rss_all_pages_mb']:7.1f} MB")
+    if r["failed"]:
+        print(f"  errors: {'; '.join(r['failed'])[:200]}")
+    print("note: without a reachable P21 server (stubbed or failing pyodbc) these numbers exclude the real "
+          "ODBC driver import and P21 connection/query time")
+
+if __name__ == "__main__":
+    main()
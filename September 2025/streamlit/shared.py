@@ -0,0 +1,151 @@
+import os
+import threading
+from contextlib import closing, contextmanager
+from pathlib import Path
+
+import streamlit as st
+
+# ---------------------------------------------------------
+# Shared data + connection layer for the pages in app_pages/
+# ---------------------------------------------------------
+# Everything here is cached once per server process, so every page and every browser session
+# reuses the same P21 connection and query results. Heavy modules (pandas,
+# pyodbc, dotenv, the store) are imported inside the functions that need them: the app starts
+# with Streamlit alone and a page only pays for what it uses.
+
+# -----------------------------------------------------------
+# PRODUCTION STORE (store.STORE_PATH, kept up to date by the nightly sync)
+# -----------------------------------------------------------
+def source_signature(path: Path):
+    """mtime/size of the store: part of every cache key below. Raises FileNotFoundError without a store."""
+    s = Path(path).stat()
+    return s.st_mtime_ns, s.st_size
+
+@contextmanager
+def open_store(path: str):
+    """
+    A read-only connection for one query, closed on exit. Opening read-only SQLite is cheap, and
+    the cached loaders below only get here on a cache miss, so nothing holds the store open
+    while the nightly sync (scripts/append_to_excel.py) replaces it.
+    """
+    from store import open_for_reading
+    with closing(open_for_reading(path)) as conn:
+        yield conn
+
+@st.cache_data(max_entries=2)
+def load_date_bounds(path: str, signature):
+    """(first_day, last_day) in the store, (None, None) when it is empty."""
+    from store import date_bounds
+    with open_store(path) as conn:
+        return date_bounds(conn)
+
+@st.cache_data(max_entries=32)
+def load_summaries(path: str, signature, start, end):
+    """agg_df / shift_df for start..end, aggregated in SQL."""
+    from store import machine_summary, shift_summary
+    with open_store(path) as conn:
+        return machine_summary(conn, start, end), shift_summary(conn, start, end)
+
+@st.cache_data(max_entries=2)
+def load_trends(path: str, signature):
+    """Date x Machine daily totals and their rolling averages over the FULL history (sliced per range later)."""
+    from store import daily_totals
+    from trends import daily_matrix, rolling_means
+    with open_store(path) as conn:
+        totals = daily_totals(conn)
+    return rolling_means(daily_matrix(totals))
+
+# -----------------------------------------------------------
+# P21 (SQL Server)
+# -----------------------------------------------------------
+P21_SERVER = "172.22.4.20,1433"
+P21_DATABASE = "P21"
+P21_TTL_SECONDS = 300   # open orders are re-read at most every 5 minutes (or on Refresh)
+
+# Open, uncancelled production orders at location 210 with their line, item and scheduler.
+# Both scheduling pages read this one result.
+OPEN_PROD_ORDERS_SQL = """
+    SELECT
+        p21_view_prod_order_hdr.prod_order_number,
+        p21_view_prod_order_hdr.expected_completion_date,
+        p21_view_prod_order_hdr.complete,
+        p21_view_prod_order_line.item_id,
+        prod_order_hdr_ud.production_machine,
+        p21_view_prod_order_line.qty_to_make,
+        p21_view_inv_loc.location_id,
+        p21_view_inv_mast.item_desc,
+        p21_view_inv_loc.product_group_id,
+        p21_view_prod_order_line.unit_of_measure,
+        p21_view_inv_mast.net_weight,
+        p21_view_inv_mast.net_weight * p21_view_prod_order_line.qty_to_make         AS extended_weight,
+        p21_view_prod_order_hdr.printed,
+        p21_view_prod_order_hdr.comment,
+        users.name AS scheduler_name
+    FROM
+        P21.dbo.p21_view_prod_order_hdr AS p21_view_prod_order_hdr
+
+        INNER JOIN P21.dbo.p21_view_prod_order_line AS p21_view_prod_order_line
+            ON p21_view_prod_order_hdr.prod_order_number = p21_view_prod_order_line.prod_order_number
+
+        LEFT OUTER JOIN P21.dbo.prod_order_hdr_ud AS prod_order_hdr_ud
+            ON p21_view_prod_order_hdr.prod_order_number = prod_order_hdr_ud.prod_order_number
+
+        INNER JOIN P21.dbo.p21_view_inv_mast AS p21_view_inv_mast
+            ON p21_view_prod_order_line.inv_mast_uid = p21_view_inv_mast.inv_mast_uid
+
+        INNER JOIN P21.dbo.p21_view_inv_loc AS p21_view_inv_loc
+            ON p21_view_inv_mast.inv_mast_uid = p21_view_inv_loc.inv_mast_uid
+
+        INNER JOIN P21.dbo.users AS users
+            ON users.id = p21_view_prod_order_hdr.entered_by
+
+    WHERE
+        p21_view_inv_loc.location_id = 210
+        AND p21_view_prod_order_hdr.cancel = 'N'
+        AND p21_view_prod_order_hdr.complete = 'N'
+        AND p21_view_prod_order_line.cancel = 'N'
+
+    ORDER BY
+        p21_view_prod_order_hdr.expected_completion_date
+      , prod_order_hdr_ud.production_machine
+"""
+
+# pyodbc connections must not run two statements from different threads at once
+_p21_lock = threading.Lock()
+
+@st.cache_resource(show_spinner="Connecting to P21...")
+def p21_connection():
+    """One pyodbc connection for the whole server process (credentials from .env)."""
+    import pyodbc
+    from dotenv import load_dotenv
+
+    # Load .env values
+    load_dotenv()
+    uid = os.getenv("STREAMLIT_DB_USER")
+    pwd = os.getenv("STREAMLIT_DB_PASS")
+    conn_str = (
+        "DRIVER={ODBC Driver 17 for SQL Server};"
+        f"SERVER={P21_SERVER};DATABASE={P21_DATABASE};UID={uid};PWD={pwd};"
+    )
+    return pyodbc.connect(conn_str)
+
+def p21_query(sql: str):
+    import pandas as pd
+    import pyodbc
+
+    with _p21_lock:
+        try:
+            return pd.read_sql(sql, p21_connection())
+        except pyodbc.Error:
+            # dropped connection (server restart, idle timeout): reconnect once
+            p21_connection.clear()
+            return pd.read_sql(sql, p21_connection())
+
+@st.cache_data(ttl=P21_TTL_SECONDS, show_spinner="Loading production orders from P21...")
+def open_prod_orders():
+    return p21_query(OPEN_PROD_ORDERS_SQL)
+
+def refresh_button(key: str):
+    """Sidebar button that drops the cached P21 result so the next load hits the server."""
+    if st.sidebar.button("🔄 Refresh P21 data", key=key):
+        open_prod_orders.clear()
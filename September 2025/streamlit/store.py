@@ -0,0 +1,370 @@
+import argparse
+import ast
+import math
+import operator
+import os
+import re
+import sqlite3
+from contextlib import closing
+from datetime import date, datetime
+from pathlib import Path
+
+import pandas as pd
+
+# ---------------------------------------------------------
+# Production store: SQLite file = system of record, Excel = export
+# ---------------------------------------------------------
+# STORE_PATH ("data/September Averages.sqlite", or $PROD_STORE) holds one row per machine/date/shift.
+#   scripts/append_to_excel.py        upserts the nightly CSV here, then re-exports the workbook sheet
+#   app_pages/production_dashboard.py asks for its aggregates in SQL (indexed by date), never parses Excel
+# daily_rollup keeps count/sum/min/max per machine and day. Every write (upsert_rows) recomputes
+# only the machine/date groups it touched, so the dashboard's per-day numbers never rescan history.
+# A missing store is built from seed_workbooks() by the sync or `python store.py build`, never by the
+# dashboard (it only reads); `python store.py import <xlsx>` adds any other workbook.
+WORKBOOK_PATH = Path(__file__).resolve().parent / "data" / "September Averages.xlsx"
+SHEET_NAME = "Daily by Shifts"
+SHEET_COLUMNS = ["Machine Name", "Date", "Shift", "Day of Week", "Total Produced (LB)", "No Schedule", "Notes"]
+REQUIRED_COLS = ["Machine Name", "Shift", "Date", "Total Produced (LB)"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS shift_output (
+    machine      TEXT NOT NULL,
+    date         TEXT NOT NULL,          -- YYYY-MM-DD
+    shift        TEXT NOT NULL,
+    lb_produced  REAL,                   -- NULL = blank / not a number
+    lb_formula   TEXT,                   -- hand-typed "=42*82+53*57", kept for the Excel export
+    no_schedule  TEXT,
+    notes        TEXT,
+    PRIMARY KEY (machine, date, shift)
+) WITHOUT ROWID;
+-- covering index for the dashboard's date-range aggregates (no table lookups)
+CREATE INDEX IF NOT EXISTS shift_output_date ON shift_output (date, machine, shift, lb_produced);
+-- machine x day rollup of the shift rows that have a value (maintained by upsert_rows)
+CREATE TABLE IF NOT EXISTS daily_rollup (
+    date         TEXT NOT NULL,
+    machine      TEXT NOT NULL,
+    shifts       INTEGER NOT NULL,       -- shift rows with a value
+    lb_sum       REAL NOT NULL,
+    lb_min       REAL NOT NULL,
+    lb_max       REAL NOT NULL,
+    PRIMARY KEY (date, machine)
+) WITHOUT ROWID;
+"""
+
+ROLLUP_GROUP_SQL = """
+    INSERT INTO daily_rollup (date, machine, shifts, lb_sum, lb_min, lb_max)
+    SELECT date, machine, COUNT(*), SUM(lb_produced), MIN(lb_produced), MAX(lb_produced)
+    FROM shift_output
+    WHERE lb_produced IS NOT NULL {where}
+    GROUP BY date, machine
+"""
+
+# Hand-typed cells are often plain arithmetic ("=42*82+53*57"). openpyxl hands those back as text
+# (Excel's cached result is only there until openpyxl saves), so they are evaluated on import:
+# parsed, never eval'd, and only numbers with + - * / and parentheses are accepted.
+ARITH_FORMULA_RX = re.compile(r"^=[\d\s.+\-*/()]+$")
+ARITH_OPS = {ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul, ast.Div: operator.truediv,
+             ast.UAdd: operator.pos, ast.USub: operator.neg}
+BLANKS = {"", "none", "nan", "nat"}   # what earlier astype(str) syncs left in the sheet
+CACHED_COL = "Total Produced (LB) (cached)"   # read_sheet(): Excel's last result of a formula cell
+
+# Machine names as the Daily Output Entry form writes them. The sheets spell them "CUTTER 1",
+# "PC 1", "AW 1", "JENNY", ...: on import they are matched on their letters and digits.
+MACHINE_NAMES = ["Jenny", "Cutter 1", "Cutter 2", "Cutter 3", "Die Cutter",
+                 "PC1", "PC2", "PC3", "PC5", "AW1", "Sheeter 1", "Sheeter 2"]
+MACHINE_ALIASES = {re.sub(r"[^a-z0-9]", "", m.lower()): m for m in MACHINE_NAMES}
+
+def store_path(xlsx_path) -> Path:
+    return Path(xlsx_path).with_suffix(".sqlite")
+
+# The one store both the sync and the dashboard use
+STORE_PATH = Path(os.environ.get("PROD_STORE") or store_path(WORKBOOK_PATH))
+
+def seed_workbooks() -> list:
+    """
+    Workbooks a new store is built from, in order: $PROD_SEED_WORKBOOKS (paths separated by
+    os.pathsep, e.g. the full shift history data_inputs/daily_logs.xlsx first), else the sync's
+    workbook alone.
+    """
+    env = os.environ.get("PROD_SEED_WORKBOOKS")
+    return [Path(p) for p in env.split(os.pathsep) if p.strip()] if env else [WORKBOOK_PATH]
+
+def connect(path, readonly=False) -> sqlite3.Connection:
+    """A connection for the calling thread; read-only ones never touch the schema."""
+    if readonly:
+        return sqlite3.connect(f"file:{Path(path).as_posix()}?mode=ro", uri=True)
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    return conn
+
+def build_instructions(db_path=STORE_PATH) -> str:
+    """How to get a store at db_path (markdown), for readers that find none."""
+    return (f"The nightly sync (`scripts/append_to_excel.py`) builds and updates the store and publishes it as "
+            f"the `production-store` artifact of its run: download that file to `{db_path}`, or build it from "
+            f"the workbooks with `python store.py build --db \"{db_path}\"` (reads `$PROD_SEED_WORKBOOKS`, "
+            f"default `data/{WORKBOOK_PATH.name}`).")
+
+def open_for_reading(db_path=STORE_PATH) -> sqlite3.Connection:
+    """The store, read-only. Readers never build, migrate or fall back to the workbook: a missing store is an error."""
+    if not Path(db_path).exists():
+        raise FileNotFoundError(f"No production store at {db_path}. {build_instructions(db_path)}")
+    return connect(db_path, readonly=True)
+
+def build_store(db_path=STORE_PATH, workbooks=None, sheet=SHEET_NAME) -> int:
+    """
+    Create the store from the workbooks (default: seed_workbooks()) that exist, in order (later
+    rows update earlier ones). Built in a temp file and moved into place, so readers never see a
+    half-built store. Returns the number of sheet rows imported.
+    """
+    db_path = Path(db_path)
+    workbooks = seed_workbooks() if workbooks is None else workbooks
+    found = [Path(p) for p in workbooks if Path(p).exists()]
+    if not found:
+        raise FileNotFoundError(f"No production store at {db_path} and none of {[str(p) for p in workbooks]} to build it from")
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = db_path.with_name(f"{db_path.name}.{os.getpid()}.tmp")
+    try:
+        with closing(connect(tmp)) as conn:
+            n = sum(import_workbook(conn, p, sheet) for p in found)
+        os.replace(tmp, db_path)
+    finally:
+        tmp.unlink(missing_ok=True)
+    return n
+
+# ---------------------------------------------------------
+# Row normalization (CSV rows and sheet rows end up the same)
+# ---------------------------------------------------------
+def _text(v):
+    if v is None or (isinstance(v, float) and math.isnan(v)):
+        return None
+    v = str(v).strip()
+    return None if v.lower() in BLANKS else v
+
+def _machine(v):
+    """'CUTTER 1', 'Cutter 1' -> 'Cutter 1'; names not in MACHINE_NAMES are kept as written."""
+    v = _text(v)
+    return None if v is None else MACHINE_ALIASES.get(re.sub(r"[^a-z0-9]", "", v.lower()), v)
+
+def _day(v):
+    """'2025-09-04', '2025-09-04 00:00:00', datetime or date -> '2025-09-04' (None if unparseable)."""
+    if isinstance(v, (datetime, date)):
+        return v.strftime("%Y-%m-%d")
+    v = _text(v)
+    if v is None:
+        return None
+    ts = pd.to_datetime(v[:10], errors="coerce")
+    return None if pd.isna(ts) else ts.strftime("%Y-%m-%d")
+
+def _arith(node):
+    """Value of a parsed arithmetic expression; ValueError for anything but numbers and + - * /."""
+    if isinstance(node, ast.Expression):
+        return _arith(node.body)
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+        return node.value
+    if isinstance(node, ast.BinOp) and type(node.op) in ARITH_OPS:
+        return ARITH_OPS[type(node.op)](_arith(node.left), _arith(node.right))
+    if isinstance(node, ast.UnaryOp) and type(node.op) in ARITH_OPS:
+        return ARITH_OPS[type(node.op)](_arith(node.operand))
+    raise ValueError(f"not plain arithmetic: {ast.dump(node)}")
+
+def _value(v):
+    """Cell -> (number or None, formula text or None)."""
+    if isinstance(v, str):
+        v = v.strip()
+        if ARITH_FORMULA_RX.match(v):
+            try:
+                num = float(_arith(ast.parse(v[1:].strip(), mode="eval")))
+            except (SyntaxError, ValueError, ArithmeticError, RecursionError):
+                return None, v
+            return (None if math.isnan(num) or math.isinf(num) else num), v
+        if v.startswith("="):
+            return None, v
+    num = pd.to_numeric(_text(v), errors="coerce")
+    return (None if pd.isna(num) else float(num)), None
+
+def normalize_rows(df: pd.DataFrame) -> list:
+    """Sheet or CSV rows -> store tuples; rows without machine/date/shift are dropped."""
+    df = df.rename(columns=lambda c: str(c).strip())
+    out = []
+    for rec in df.to_dict("records"):
+        machine, day, shift = _machine(rec.get("Machine Name")), _day(rec.get("Date")), _text(rec.get("Shift"))
+        if machine is None or day is None or shift is None:
+            continue
+        lb, formula = _value(rec.get("Total Produced (LB)"))
+        if lb is None and formula is not None:   # =SUM(...) etc.: Excel's cached result, when there is one
+            lb, _ = _value(rec.get(CACHED_COL))
+        out.append((machine, day, shift, lb, formula, _text(rec.get("No Schedule")), _text(rec.get("Notes"))))
+    return out
+
+# ---------------------------------------------------------
+# Writes
+# ---------------------------------------------------------
+def upsert_rows(conn, rows) -> tuple:
+    """
+    Insert or update by (machine, date, shift). Like the old merge, a blank field in the
+    incoming row keeps the stored value. The touched machine/date groups of daily_rollup are
+    recomputed in the same transaction. Returns (new, updated) counts.
+    """
+    keys = [r[:3] for r in rows]
+    existing = 0
+    for key in set(keys):
+        existing += conn.execute("SELECT 1 FROM shift_output WHERE machine=? AND date=? AND shift=?", key).fetchone() is not None
+    groups = sorted({(day, machine) for machine, day, _ in keys})
+    with conn:
+        conn.executemany("""
+            INSERT INTO shift_output (machine, date, shift, lb_produced, lb_formula, no_schedule, notes)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (machine, date, shift) DO UPDATE SET
+                lb_produced = COALESCE(excluded.lb_produced, lb_produced),
+                lb_formula  = CASE WHEN excluded.lb_produced IS NULL THEN lb_formula ELSE excluded.lb_formula END,
+                no_schedule = COALESCE(excluded.no_schedule, no_schedule),
+                notes       = COALESCE(excluded.notes, notes)
+        """, rows)
+        refresh_rollup(conn, groups)
+    return len(set(keys)) - existing, existing
+
+def refresh_rollup(conn, groups):
+    """Recompute the daily_rollup rows of the given (date, machine) groups from their shift rows."""
+    conn.executemany("DELETE FROM daily_rollup WHERE date=? AND machine=?", groups)
+    conn.executemany(ROLLUP_GROUP_SQL.format(where="AND date=? AND machine=?"), groups)
+
+def rebuild_rollup(conn):
+    """Full rebuild (after editing shift_output by hand)."""
+    with conn:
+        conn.execute("DELETE FROM daily_rollup")
+        conn.execute(ROLLUP_GROUP_SQL.format(where=""))
+
+def read_sheet(xlsx_path, sheet=SHEET_NAME) -> pd.DataFrame:
+    """
+    Raw sheet rows as openpyxl sees them (formulas as text), plus CACHED_COL: the value Excel
+    last calculated for each "Total Produced (LB)" cell (None for files saved by openpyxl).
+    """
+    from openpyxl import load_workbook
+
+    def values(data_only):
+        wb = load_workbook(xlsx_path, read_only=True, data_only=data_only)
+        rows = list(wb[sheet].values)
+        wb.close()
+        return pd.DataFrame(rows[1:], columns=[str(c).strip() for c in rows[0]])
+
+    df = values(False)
+    if "Total Produced (LB)" in df.columns:
+        df[CACHED_COL] = values(True)["Total Produced (LB)"]
+    return df
+
+def import_workbook(conn, xlsx_path, sheet=SHEET_NAME) -> int:
+    df = read_sheet(xlsx_path, sheet).rename(columns=lambda c: str(c).strip())
+    missing = [c for c in REQUIRED_COLS if c not in df.columns]
+    if missing:
+        raise KeyError(f"Missing expected columns: {missing}")
+    rows = normalize_rows(df)
+    upsert_rows(conn, rows)
+    lost = [r for r in rows if r[3] is None and r[4] is not None]
+    if lost:
+        print(f"⚠️  {len(lost)} 'Total Produced (LB)' formula(s) in {Path(xlsx_path).name} have no value "
+              f"(not plain arithmetic and no cached result; open and save the workbook in Excel, then re-import): "
+              + ", ".join(f"{m} {d} {s} {f}" for m, d, s, _, f, *_ in lost[:10]) + (" ..." if len(lost) > 10 else ""))
+    return len(rows)
+
+def export_workbook(conn, xlsx_path, sheet=SHEET_NAME) -> int:
+    """Rewrite `sheet` from the store (other sheets untouched), sorted by date, shift, machine."""
+    from openpyxl import Workbook, load_workbook
+    xlsx_path = Path(xlsx_path)
+    wb = load_workbook(xlsx_path) if xlsx_path.exists() else Workbook()
+    index = wb.sheetnames.index(sheet) if sheet in wb.sheetnames else None
+    if index is not None:
+        wb.remove(wb[sheet])
+    elif len(wb.sheetnames) == 1 and wb.active.max_row == 1:   # fresh Workbook(): drop the empty default sheet
+        wb.remove(wb.active)
+    ws = wb.create_sheet(sheet, index)
+    ws.append(SHEET_COLUMNS)
+    n = 0
+    for machine, day, shift, lb, formula, no_schedule, notes in conn.execute("""
+            SELECT machine, date, shift, lb_produced, lb_formula, no_schedule, notes
+            FROM shift_output ORDER BY date, shift, machine"""):
+        d = datetime.strptime(day, "%Y-%m-%d")
+        ws.append([machine, d, shift, d.strftime("%A"), formula or lb, no_schedule, notes])
+        ws.cell(row=ws.max_row, column=2).number_format = "yyyy-mm-dd"
+        n += 1
+    tmp = xlsx_path.with_name(f"{xlsx_path.stem}.tmp{xlsx_path.suffix}")
+    wb.save(tmp)
+    os.replace(tmp, xlsx_path)
+    return n
+
+# ---------------------------------------------------------
+# Dashboard queries (the groupbys run in SQLite; results are a few dozen rows)
+# ---------------------------------------------------------
+def date_bounds(conn):
+    lo, hi = conn.execute("SELECT MIN(date), MAX(date) FROM daily_rollup").fetchone()
+    return (None, None) if lo is None else (date.fromisoformat(lo), date.fromisoformat(hi))
+
+def machine_summary(conn, start, end) -> pd.DataFrame:
+    """Per machine over start..end: days with data and avg / max / min of the DAILY totals (shifts summed)."""
+    return pd.read_sql_query("""
+        SELECT machine AS "Machine Name", COUNT(*) AS "# Days", AVG(lb_sum) AS "Avg Daily LB Produced",
+               MAX(lb_sum) AS "Most Productive Day", MIN(lb_sum) AS "Least Productive Day"
+        FROM daily_rollup WHERE date BETWEEN ? AND ?
+        GROUP BY machine ORDER BY "Avg Daily LB Produced" DESC
+    """, conn, params=(str(start), str(end)))
+
+def shift_summary(conn, start, end) -> pd.DataFrame:
+    """
+    Per machine and shift over start..end: average LB of the shift rows. A shift rollup would
+    hold one row per shift row, so this reads the covering index of shift_output instead.
+    """
+    return pd.read_sql_query("""
+        SELECT machine AS "Machine Name", shift AS "Shift", AVG(lb_produced) AS "Avg Daily LB Produced"
+        FROM shift_output
+        WHERE lb_produced IS NOT NULL AND date BETWEEN ? AND ?
+        GROUP BY machine, shift
+    """, conn, params=(str(start), str(end)))
+
+def daily_totals(conn) -> pd.DataFrame:
+    """Machine Name, Date, sum: one row per machine and day over the whole history (trends.py input)."""
+    df = pd.read_sql_query("""
+        SELECT machine AS "Machine Name", date AS "Date", lb_sum AS sum
+        FROM daily_rollup
+    """, conn)
+    df["Date"] = pd.to_datetime(df["Date"])
+    return df
+
+# ---------------------------------------------------------
+# CLI: build the store, migrate a workbook in, or export the sheet out
+# ---------------------------------------------------------
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Production SQLite store: build it, import a workbook sheet, export it back, "
+                                             "or rebuild its daily rollup.")
+    ap.add_argument("action", choices=["build", "import", "export", "rollup"])
+    ap.add_argument("xlsx", nargs="?", help="Workbook, e.g. 'data/September Averages.xlsx' (store: same name, .sqlite); "
+                                            "build reads the seed workbooks instead")
+    ap.add_argument("--sheet", default=SHEET_NAME)
+    ap.add_argument("--db", help="Store path (default: $PROD_STORE, else next to the workbook; build/rollup: STORE_PATH)")
+    ap.add_argument("--seed", action="append", help="build: workbook to read (repeatable; default: $PROD_SEED_WORKBOOKS, "
+                                                     "else data/September Averages.xlsx)")
+    args = ap.parse_args()
+    if args.action == "build":
+        db = Path(args.db) if args.db else STORE_PATH
+        if db.exists():
+            ap.error(f"{db} already exists (use import to add a workbook to it)")
+        seeds = [Path(p) for p in args.seed] if args.seed else seed_workbooks()
+        n = build_store(db, seeds, sheet=args.sheet)
+        print(f"✅ Built {db} from {n} rows of {', '.join(p.name for p in seeds if p.exists())}")
+        raise SystemExit(0)
+    if args.action == "rollup":
+        db = Path(args.db) if args.db else STORE_PATH
+        conn = connect(db)
+        rebuild_rollup(conn)
+        print(f"✅ Rebuilt daily_rollup of {db}")
+        conn.close()
+        raise SystemExit(0)
+    if not args.xlsx:
+        ap.error(f"{args.action} needs a workbook")
+    db = Path(args.db or os.environ.get("PROD_STORE") or store_path(args.xlsx))
+    conn = connect(db)
+    if args.action == "import":
+        n = import_workbook(conn, args.xlsx, args.sheet)
+        print(f"✅ Imported {n} rows from {args.xlsx} → {db}")
+    else:
+        n = export_workbook(conn, args.xlsx, args.sheet)
+        print(f"✅ Exported {n} rows from {db} → {args.xlsx} [{args.sheet}]")
+    conn.close()
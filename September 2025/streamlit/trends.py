@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+
+# ---------------------------------------------------------
+# Daily trend series for the Output Dashboard page (app_pages/production_dashboard.py): rolling averages + LTTB downsampling
+# ---------------------------------------------------------
+ROLLING_WINDOWS = (7, 30)   # calendar days
+MAX_POINTS = 400            # per line sent to the browser
+
+def daily_matrix(daily: pd.DataFrame) -> pd.DataFrame:
+    """Daily totals (Machine Name, Date, sum) -> Date x Machine table of daily LB on a full calendar (NaN = no data)."""
+    wide = daily.pivot_table(index="Date", columns="Machine Name", values="sum", aggfunc="sum").sort_index()
+    return wide.asfreq("D")
+
+def rolling_means(wide: pd.DataFrame, windows=ROLLING_WINDOWS) -> dict:
+    """
+    {"Daily": wide, "7-day avg": ..., "30-day avg": ...}, every machine at once. Windows are
+    calendar days and average the days that have data, so a machine that was down doesn't drag
+    the line to zero. Compute on the full history and slice afterwards, so the first days of a
+    filtered range still see the days before it.
+    """
+    out = {"Daily": wide}
+    for w in windows:
+        out[f"{w}-day avg"] = wide.rolling(f"{w}D", min_periods=1).mean()
+    return out
+
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int):
+    """
+    Largest-Triangle-Three-Buckets: keep n_out points of (x, y) that preserve the visual shape
+    (peaks and dips survive, unlike every-k-th sampling). x must be sorted and numeric.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return x, y
+    # first and last points are always kept; the rest is split into n_out - 2 buckets
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    keep = np.empty(n_out, dtype=int)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # the average point of the NEXT bucket (the last point for the final bucket)
+        nlo, nhi = hi, (edges[i + 2] if i + 2 < len(edges) else n)
+        cx, cy = x[nlo:nhi].mean(), y[nlo:nhi].mean()
+        # triangle areas (x2) between the last kept point, each candidate and that average
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(area.argmax())
+        keep[i + 1] = a
+    return x[keep], y[keep]
+
+def downsample(series: pd.Series, n_out: int = MAX_POINTS):
+    """Date-indexed series -> (dates, values) with NaN gaps dropped and at most n_out points."""
+    s = series.dropna()
+    x = s.index.values.astype("datetime64[ns]").astype("int64").astype(float)   # any unit, any pandas
+    xs, ys = lttb(x, s.to_numpy(dtype=float), n_out)
+    return pd.to_datetime(xs.astype("int64")), ys
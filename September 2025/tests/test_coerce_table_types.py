@@ -0,0 +1,72 @@
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+HERE = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(HERE))
+
+import prod_logs_core as core
+
+SAMPLE_JSON = HERE / "912 Production Logs Manual_ocr.pdf.json"
+
+def assert_no_cell_lost(df: pd.DataFrame):
+    """Every non-blank source cell must survive coercion, typed or in its '(raw)' sidecar."""
+    typed = core.coerce_table_types(df, 2025)
+    for col in df.columns:
+        src = df[col].astype(str).str.strip().ne("")
+        kept = typed[col].notna()
+        raw = f"{col}{core.RAW_SUFFIX}"
+        if raw in typed.columns:
+            kept |= typed[raw].notna()
+        assert int(src.sum()) == int((src & kept).sum()), f"{col}: non-blank cells lost in coercion"
+
+def test_stragglers_kept_in_raw_column():
+    df = pd.DataFrame({
+        "FT": [":selected:", ":unselected:", ":selected:", ":unselected:", "1332"],
+        "Total Produced LB": ["1,234", "1380 lbs", "20#", "40", "see notes"],
+        "Date": ["9/12", "9/13", "9/14", "9/15", "Comments/Comentarios:"],
+    })
+    typed = core.coerce_table_types(df, 2025)
+    assert typed["FT"].tolist() == df["FT"].tolist()   # a mark column with other content stays text
+    assert f"FT{core.RAW_SUFFIX}" not in typed.columns
+    assert typed[f"Total Produced LB{core.RAW_SUFFIX}"].dropna().tolist() == ["see notes"]
+    assert typed[f"Date{core.RAW_SUFFIX}"].dropna().tolist() == ["Comments/Comentarios:"]
+    assert_no_cell_lost(df)
+
+def test_checkbox_column_becomes_bool():
+    df = pd.DataFrame({"FT": [":selected:", ":unselected:", "", ":selected: ."]})
+    typed = core.coerce_table_types(df, 2025)
+    assert str(typed["FT"].dtype) == "boolean"
+    assert typed["FT"].tolist()[:2] + typed["FT"].tolist()[3:] == [True, False, True]
+    assert core.marks_as_text(typed)["FT"].tolist()[:2] == ["✓", ""]
+
+def test_clean_column_gets_no_raw_column():
+    typed = core.coerce_table_types(pd.DataFrame({"Total Produced LB": ["1,234", "", "20#"]}), 2025)
+    assert list(typed.columns) == ["Total Produced LB"]
+
+def test_sample_tables_keep_every_cell():
+    for tbl in core.iter_di_tables(SAMPLE_JSON):
+        df = core.table_to_dataframe(tbl)
+        if df is not None and not df.empty:
+            assert_no_cell_lost(df)
+
+def test_decimals_stay_exact():
+    df = pd.DataFrame({"Weight": ["40.09", "12.7", "1,234.56", ""]})
+    typed = core.coerce_table_types(df, 2025)["Weight"]
+    assert typed.dtype == "float64"
+    assert typed.dropna().tolist() == [40.09, 12.7, 1234.56]
+
+def test_year_comes_from_the_document():
+    dates = pd.DataFrame({"Date": ["9/12", "9/13"]})
+    assert core.infer_year([pd.DataFrame({"Date": ["12/30/24", "12/31"]})]) == 2024
+    assert core.infer_year([dates], ["Week of 12/29/2025 - Pc1", "Lbs 2000"]) == 2025
+    assert core.infer_year([dates], [], "Production Logs/September 2025/doc18142020251006091250_ocr.pdf.json") == 2025
+    assert core.infer_year([dates], [], "scans/doc18142020251006091250_ocr.pdf.json") is None
+
+def test_dates_without_a_year_are_not_guessed():
+    df = pd.DataFrame({"Date": ["9/12/2025", "9/13/2025", "9/14/2025", "9/15/2025", "9/16"]})
+    typed = core.coerce_table_types(df, None)
+    assert str(typed["Date"].dtype).startswith("datetime64")
+    assert typed["Date"].isna().tolist() == [False] * 4 + [True]
+    assert typed[f"Date{core.RAW_SUFFIX}"].dropna().tolist() == ["9/16"]
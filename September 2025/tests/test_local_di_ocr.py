@@ -0,0 +1,100 @@
+import sys
+from concurrent.futures import Future
+from pathlib import Path
+
+from PIL import Image, ImageDraw
+
+HERE = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(HERE))
+
+import local_di_ocr as ocr
+
+def ruled_page():
+    """
+    800 x 600 px page with one ruled table and a stray rule:
+      rows y = 100 / 200 / 300 / 400, columns x = 100 / 300 / 500 / 700;
+      row 0: columns 0-1 merged (no rule at x = 300 above y = 200);
+      column 2: rows 1-2 merged (no rule at y = 300 right of x = 500);
+      a lone horizontal rule at y = 500 that crosses no vertical one.
+    """
+    img = Image.new("L", (800, 600), 255)
+    draw = ImageDraw.Draw(img)
+    for y in (100, 200, 400):
+        draw.line([(100, y), (700, y)], fill=0, width=2)
+    draw.line([(100, 300), (500, 300)], fill=0, width=2)
+    for x in (100, 500, 700):
+        draw.line([(x, 100), (x, 400)], fill=0, width=2)
+    draw.line([(300, 200), (300, 400)], fill=0, width=2)
+    draw.line([(100, 500), (700, 500)], fill=0, width=2)
+    return img
+
+def slack(min_len):
+    # a window only has to be RULE_FILL dark, so rule ends may overshoot by the rest of it
+    # (plus the 2 px of a crossing rule)
+    return int(min_len * (1 - ocr.RULE_FILL)) + 4
+
+def test_rules_find_each_drawn_line_once():
+    dark = ocr.np.asarray(ruled_page()) < ocr.DARK_LEVEL
+    h_rules = ocr._rules(dark, 48)
+    assert [y for y, _, _ in h_rules] == [100, 200, 300, 400, 500]
+    assert all(abs(x0 - 100) <= slack(48) for _, x0, _ in h_rules)
+    assert abs(dict((y, x1) for y, _, x1 in h_rules)[300] - 500) <= slack(48)
+    assert [x for x, _, _ in ocr._rules(dark.T, 48)] == [100, 300, 500, 700]
+
+def test_rules_merge_double_drawn_borders():
+    dark = ocr.np.zeros((40, 200), dtype=bool)
+    dark[10, 20:180] = dark[13, 20:180] = True
+    (y, x0, x1), = ocr._rules(dark, 50)
+    assert y == 11 and abs(x0 - 20) <= slack(50) and abs(x1 - 180) <= slack(50)
+
+def test_components_keep_only_crossing_rules():
+    h_rules = [(100, 100, 700), (400, 100, 700), (500, 100, 700), (900, 50, 60)]
+    v_rules = [(100, 100, 400), (700, 100, 400), (55, 880, 990)]
+    (hs, vs), = ocr._components(h_rules, v_rules, tol=8)
+    assert hs == [(100, 100, 700), (400, 100, 700)] and vs == [(100, 100, 400), (700, 100, 400)]
+
+def test_grid_cells_infer_spans_from_missing_rules():
+    (h_rules, v_rules), = ocr.detect_grids(ruled_page())
+    cells = {(r, c): (rs, cs) for r, c, rs, cs, _ in ocr.grid_cells(h_rules, v_rules, tol=ocr.MIN_CELL_PX)}
+    assert cells == {(0, 0): (1, 2), (0, 2): (1, 1),
+                     (1, 0): (1, 1), (1, 1): (1, 1), (1, 2): (2, 1),
+                     (2, 0): (1, 1), (2, 1): (1, 1)}
+
+def fake_words(words):
+    """pytesseract.image_to_data stand-in: [(text, x, y)] as 40 x 20 px words, each on its own line."""
+    def image_to_data(img, lang=None, config=None, output_type=None):
+        return {"text": [t for t, _, _ in words], "conf": [95] * len(words),
+                "left": [x for _, x, _ in words], "top": [y for _, _, y in words],
+                "width": [40] * len(words), "height": [20] * len(words),
+                "block_num": [1] * len(words), "par_num": [1] * len(words),
+                "line_num": list(range(1, len(words) + 1))}
+    return image_to_data
+
+def test_analyze_page_turns_the_page_upright_and_fills_cells(monkeypatch):
+    sideways = ruled_page().rotate(90, expand=True)   # scanned turned a quarter counter-clockwise
+    monkeypatch.setattr(ocr, "convert_from_path", lambda *a, **kw: [sideways])
+    monkeypatch.setattr(ocr.pytesseract, "image_to_data",
+                        fake_words([("Machine", 180, 140), ("Qty", 580, 140), ("Notes", 580, 290)]))
+    page, (table,) = ocr.analyze_page("log.pdf", 1, dpi=100, rotation=90)
+
+    assert (page["width"], page["height"]) == (8.0, 6.0)
+    assert table["rowCount"] == 3 and table["columnCount"] == 3
+    cells = {(c["rowIndex"], c["columnIndex"]): c for c in table["cells"]}
+    assert cells[(0, 0)]["content"] == "Machine" and cells[(0, 0)]["columnSpan"] == 2
+    assert cells[(0, 2)]["content"] == "Qty" and cells[(0, 2)]["kind"] == "columnHeader"
+    assert cells[(1, 2)]["content"] == "Notes" and cells[(1, 2)]["rowSpan"] == 2
+
+class InlinePool:
+    def submit(self, fn, *args):
+        fut = Future()
+        fut.set_result(fn(*args))
+        return fut
+
+def test_analyze_pdf_orients_pages_by_osd(monkeypatch):
+    monkeypatch.setattr(ocr, "plan_pages", lambda pdf: [(1, 100, 6.0, 8.0)])
+    monkeypatch.setattr(ocr, "detect_rotations", lambda pdf, pool: [90])
+    monkeypatch.setattr(ocr, "convert_from_path", lambda *a, **kw: [ruled_page().rotate(90, expand=True)])
+    monkeypatch.setattr(ocr.pytesseract, "image_to_data", fake_words([("Machine", 180, 140)]))
+    res = ocr.analyze_pdf(Path("log.pdf"), InlinePool())["analyzeResult"]
+    assert (res["pages"][0]["width"], res["pages"][0]["height"]) == (8.0, 6.0)
+    assert res["content"] == "Machine" and len(res["tables"]) == 1
@@ -0,0 +1,53 @@
+import sys
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(HERE))
+
+from page_classifier import FeatureStore
+
+def write_text_pdf(path: Path, text: str):
+    """One-page PDF whose text layer is `text` (what an OCR'd training page looks like to PdfReader)."""
+    content = f"BT /F1 12 Tf 20 100 Td ({text}) Tj ET".encode()
+    objs = [b"<< /Type /Catalog /Pages 2 0 R >>",
+            b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 400 200] /Contents 4 0 R"
+            b" /Resources << /Font << /F1 5 0 R >> >> >>",
+            b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream",
+            b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    out, offsets = bytearray(b"%PDF-1.4\n"), []
+    for n, obj in enumerate(objs, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % n + obj + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objs) + 1)
+    out += b"".join(b"%010d 00000 n \n" % o for o in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objs) + 1, xref)
+    path.write_bytes(bytes(out))
+
+def items(root: Path):
+    return [(p.name, p, "Pc1" if p.name.startswith("pc1") else "Sheeter1") for p in sorted(root.glob("*.pdf"))]
+
+def test_update_drops_rows_of_changed_and_deleted_pdfs(tmp_path):
+    data = tmp_path / "data"
+    data.mkdir()
+    write_text_pdf(data / "pc1_a.pdf", "pc1 daily production log first page")
+    write_text_pdf(data / "pc1_b.pdf", "pc1 daily production log second page")
+    write_text_pdf(data / "sheeter1_a.pdf", "sheeter 1 daily production log page")
+    store = FeatureStore(tmp_path / "features")
+    store.update(items(data))
+    store.save()
+    assert store.X.shape[0] == len(store.keys) == len(store.labels) == 3
+
+    # change one PDF, delete another: their old rows must go, the untouched one must stay
+    write_text_pdf(data / "pc1_a.pdf", "pc1 daily production log first page, re-scanned")
+    (data / "sheeter1_a.pdf").unlink()
+    untouched = store.sources["pc1_b.pdf"]["keys"]
+    store = FeatureStore(tmp_path / "features")
+    stats = store.update(items(data))
+
+    assert stats["files_removed"] == 1 and stats["pages_dropped"] == 2
+    assert set(store.sources) == {"pc1_a.pdf", "pc1_b.pdf"}
+    assert store.keys == untouched + store.sources["pc1_a.pdf"]["keys"]
+    assert store.labels == ["Pc1", "Pc1"]
+    assert store.X.shape[0] == 2
@@ -0,0 +1,22 @@
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+HERE = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(HERE))
+
+import prod_logs_core as core
+
+def test_rerun_drops_partitions_of_machines_no_longer_detected(tmp_path):
+    pc1 = pd.DataFrame({"Lbs": [10, 12]})
+    cutter = pd.DataFrame({"Lbs cut": [5]})
+    core.write_parquet_dataset({"Pc1": [pc1], "Cutter2": [cutter]}, tmp_path, "912 Production Logs")
+    core.write_parquet_dataset({"Cutter2": [cutter]}, tmp_path, "other doc")
+
+    # re-run of the first doc: Cutter2 is no longer detected in it
+    core.write_parquet_dataset({"Pc1": [pc1]}, tmp_path, "912 Production Logs")
+
+    cutter_docs = pd.read_parquet(tmp_path / "machine=Cutter2")["source_doc"].astype(str)
+    assert cutter_docs.tolist() == ["other doc"]
+    assert pd.read_parquet(tmp_path / "machine=Pc1")["Lbs"].tolist() == [10, 12]
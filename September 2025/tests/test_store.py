@@ -0,0 +1,126 @@
+import os
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "streamlit"))
+
+import store
+
+@pytest.mark.parametrize("cell, expected", [
+    ("=42*82+53*57", 42 * 82 + 53 * 57),
+    ("= (10 - 4) / 4", 1.5),
+    ("=-3+ +5", 2.0),
+    (1234, 1234.0),
+    ("1,234", None),
+    (None, None),
+])
+def test_value_numbers(cell, expected):
+    assert store._value(cell)[0] == expected
+
+@pytest.mark.parametrize("cell", ["=()", "=(1)(2)", "=1/0", "=2**3", "=1.2.3", "=((((1", "=" + "(" * 500 + "1" + ")" * 500])
+def test_value_bad_arithmetic_keeps_formula(cell):
+    assert store._value(cell) == (None, cell)
+
+def test_value_other_formulas_are_not_evaluated():
+    assert store._value("=SUM(A1:A3)") == (None, "=SUM(A1:A3)")
+
+def test_rollup_follows_incremental_upserts():
+    conn = store.connect(":memory:")
+    store.upsert_rows(conn, [("PC1", "2025-09-04", "Shift 1", 100.0, None, None, None),
+                             ("PC1", "2025-09-04", "Shift 2", 50.0, None, None, None),
+                             ("PC2", "2025-09-04", "Shift 1", None, "=SUM(A1)", None, None),
+                             ("PC2", "2025-09-05", "Shift 1", 70.0, None, None, None)])
+    # nightly sync: one shift corrected, one new day
+    store.upsert_rows(conn, [("PC1", "2025-09-04", "Shift 2", 80.0, None, None, None),
+                             ("PC1", "2025-09-06", "Shift 1", 10.0, None, None, None)])
+    rollup = conn.execute("SELECT date, machine, shifts, lb_sum, lb_min, lb_max FROM daily_rollup ORDER BY 1, 2").fetchall()
+    assert rollup == [("2025-09-04", "PC1", 2, 180.0, 80.0, 100.0),
+                      ("2025-09-05", "PC2", 1, 70.0, 70.0, 70.0),
+                      ("2025-09-06", "PC1", 1, 10.0, 10.0, 10.0)]
+    store.rebuild_rollup(conn)
+    assert conn.execute("SELECT date, machine, shifts, lb_sum, lb_min, lb_max FROM daily_rollup ORDER BY 1, 2").fetchall() == rollup
+    summary = store.machine_summary(conn, "2025-09-04", "2025-09-05").set_index("Machine Name")
+    assert summary.loc["PC1", "# Days"] == 1 and summary.loc["PC1", "Avg Daily LB Produced"] == 180.0
+    assert store.date_bounds(conn)[1].isoformat() == "2025-09-06"
+
+def write_sheet_with_cached_sum(path: Path):
+    """Workbook whose 'Total Produced (LB)' cells hold =SUM(...) / arithmetic / a number, with Excel's cached results."""
+    import zipfile
+    from datetime import datetime
+    from openpyxl import Workbook
+
+    wb = Workbook()
+    ws = wb.active
+    ws.title = store.SHEET_NAME
+    ws.append(store.SHEET_COLUMNS + ["Roll A", "Roll B"])
+    ws.append(["Pc1", datetime(2025, 9, 4), "1st", "Thursday", "=SUM(H2:I2)", None, None, 100, 250])
+    ws.append(["Pc1", datetime(2025, 9, 4), "2nd", "Thursday", "=2*50", None, None])
+    ws.append(["Pc2", datetime(2025, 9, 4), "1st", "Thursday", "=SUM(H4:I4)", None, None])
+    ws.append(["Pc2", datetime(2025, 9, 4), "2nd", "Thursday", 75, None, None])
+    wb.save(path)
+    # openpyxl never writes cached results; add the one Excel would have stored for E2 (E4 stays uncalculated)
+    with zipfile.ZipFile(path) as z:
+        parts = {name: z.read(name) for name in z.namelist()}
+    sheet = "xl/worksheets/sheet1.xml"
+    parts[sheet] = parts[sheet].replace(b"<f>SUM(H2:I2)</f><v />", b"<f>SUM(H2:I2)</f><v>350</v>")
+    assert b"<v>350</v>" in parts[sheet]
+    with zipfile.ZipFile(path, "w") as z:
+        for name, data in parts.items():
+            z.writestr(name, data)
+
+def test_import_uses_cached_values_of_other_formulas(tmp_path, capsys):
+    xlsx = tmp_path / "averages.xlsx"
+    write_sheet_with_cached_sum(xlsx)
+    conn = store.connect(":memory:")
+    assert store.import_workbook(conn, xlsx) == 4
+    rows = {(m, s): (lb, f) for m, s, lb, f in conn.execute(
+        "SELECT machine, shift, lb_produced, lb_formula FROM shift_output")}
+    assert rows == {("PC1", "1st"): (350.0, "=SUM(H2:I2)"), ("PC1", "2nd"): (100.0, "=2*50"),
+                    ("PC2", "1st"): (None, "=SUM(H4:I4)"), ("PC2", "2nd"): (75.0, None)}
+    assert "1 'Total Produced (LB)' formula(s)" in capsys.readouterr().out
+
+def test_open_for_reading_needs_a_store(tmp_path):
+    with pytest.raises(FileNotFoundError, match="store.py build"):
+        store.open_for_reading(tmp_path / "missing.sqlite")
+    assert list(tmp_path.iterdir()) == []
+
+def test_readers_never_migrate(tmp_path):
+    db = tmp_path / "old.sqlite"
+    sqlite3.connect(db).close()   # a store from before daily_rollup: no tables at all
+    conn = store.open_for_reading(db)
+    assert conn.execute("SELECT name FROM sqlite_master").fetchall() == []
+    with pytest.raises(sqlite3.OperationalError):
+        conn.execute("CREATE TABLE t (x)")
+    conn.close()
+
+def test_seed_workbooks_from_env(monkeypatch, tmp_path):
+    monkeypatch.delenv("PROD_SEED_WORKBOOKS", raising=False)
+    assert store.seed_workbooks() == [store.WORKBOOK_PATH]
+    history, export = tmp_path / "daily_logs.xlsx", tmp_path / "averages.xlsx"
+    monkeypatch.setenv("PROD_SEED_WORKBOOKS", os.pathsep.join([str(history), str(export), ""]))
+    assert store.seed_workbooks() == [history, export]
+
+    write_sheet_with_cached_sum(history)
+    assert store.build_store(tmp_path / "store.sqlite") == 4
+
+@pytest.mark.parametrize("name, expected", [
+    ("CUTTER 1", "Cutter 1"), ("PC 1", "PC1"), ("AW 1", "AW1"), ("JENNY", "Jenny"),
+    ("DIE CUTTER", "Die Cutter"), ("Sheeter 2", "Sheeter 2"), ("Rewinder", "Rewinder"), (" ", None),
+])
+def test_machine_names_normalized(name, expected):
+    assert store._machine(name) == expected
+
+def test_build_store_from_seed_workbooks(tmp_path):
+    history, export = tmp_path / "daily_logs.xlsx", tmp_path / "averages.xlsx"
+    write_sheet_with_cached_sum(history)
+    db = tmp_path / "store.sqlite"
+    assert store.build_store(db, [history, export]) == 4   # a missing seed is skipped
+    conn = store.open_for_reading(db)
+    assert conn.execute("SELECT COUNT(*) FROM shift_output").fetchone()[0] == 4
+    conn.close()
+    assert [p.name for p in tmp_path.iterdir() if p.suffix == ".tmp"] == []
+    with pytest.raises(FileNotFoundError):
+        store.build_store(tmp_path / "other.sqlite", [export])
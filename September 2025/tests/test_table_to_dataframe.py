@@ -0,0 +1,50 @@
+import sys
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(HERE))
+
+import build_prod_logs
+import prod_logs_core as core
+
+SAMPLE_JSON = HERE / "912 Production Logs Manual_ocr.pdf.json"
+
+def cell(row, col, content, row_span=1, col_span=1):
+    return {"rowIndex": row, "columnIndex": col, "rowSpan": row_span, "columnSpan": col_span, "content": content}
+
+def test_title_row_heads_first_column():
+    tbl = {"cells": [
+        cell(0, 0, "PC1 PRODUCTION LOG SHEET - OPERATOR NAME: Ana", col_span=3),
+        cell(1, 0, "Date"), cell(1, 1, "Shift"), cell(1, 2, "Lbs"),
+        cell(2, 0, "9/12"), cell(2, 1, "1"), cell(2, 2, "1380"),
+    ]}
+    df = core.table_to_dataframe(tbl)
+    assert list(df.columns) == ["PC1 PRODUCTION LOG SHEET - OPERATOR NAME: Ana", "col", "col_2"]
+    assert df.values.tolist() == [["Date", "Shift", "Lbs"], ["9/12", "1", "1380"]]
+
+def test_spans_repeat_their_content():
+    tbl = {"cells": [
+        cell(0, 0, "Date"), cell(0, 1, "Output", col_span=2),
+        cell(1, 0, "9/12", row_span=2), cell(1, 1, "a"), cell(1, 2, "b"),
+        cell(2, 1, "c"), cell(2, 2, "d"),
+    ]}
+    df = core.table_to_dataframe(tbl)
+    assert list(df.columns) == ["Date", "Output", "Output_2"]
+    assert df["Date"].tolist() == ["9/12", "9/12"]
+
+def test_sample_keeps_operator_title():
+    headers = {c for tbl in core.iter_di_tables(SAMPLE_JSON) for c in core.table_to_dataframe(tbl).columns}
+    assert "PC1 PRODUCTION LOG SHEET - OPERATOR NAME: Fabian L" in headers
+
+def test_empty_table_does_not_break_continuation():
+    def table(page, cells):
+        return {"cells": cells, "boundingRegions": [{"pageNumber": page}]}
+    tables = [
+        table(1, [cell(0, 0, "Date"), cell(0, 1, "Lbs"), cell(1, 0, "9/12"), cell(1, 1, "10")]),
+        table(2, [cell(0, 0, "Notes"), cell(1, 0, "")]),   # header only -> empty frame
+        table(2, [cell(0, 0, "Date"), cell(0, 1, "Lbs"), cell(1, 0, "9/13"), cell(1, 1, "12")]),
+    ]
+    page_tables = build_prod_logs.collect_tables_by_page(tables, {1: "Pc1", 2: "Pc1"})
+    assert list(page_tables) == [1]
+    [df] = page_tables[1]
+    assert df["Lbs"].tolist() == [10, 12]
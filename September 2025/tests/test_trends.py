@@ -0,0 +1,21 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "streamlit"))
+
+import trends
+
+@pytest.mark.parametrize("unit", ["ns", "us", "s"])
+def test_downsample_keeps_dates_whatever_the_index_unit(unit):
+    days = pd.date_range("2025-01-01", periods=1000, freq="D")
+    idx = pd.DatetimeIndex(days.values.astype(f"datetime64[{unit}]"))
+    values = np.sin(np.arange(1000) / 20.0)
+    values[10] = np.nan
+    dates, ys = trends.downsample(pd.Series(values, index=idx), n_out=50)
+    assert len(dates) == len(ys) == 50
+    assert dates[0] == days[0] and dates[-1] == days[-1]
+    assert set(dates) <= set(days)
@@ -0,0 +1,44 @@
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+HERE = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(HERE))
+
+import build_prod_logs_append as app
+import prod_logs_core as core
+
+def test_tables_with_different_sidecars_share_one_header(tmp_path):
+    first = core.coerce_table_types(pd.DataFrame({
+        "Date": ["9/12", "9/13", "9/14", "9/15"],
+        "Lbs": ["1,234", "1380 lbs", "20#", "see notes"],
+        "Operator": ["Ana", "Ana", "Luis", "Luis"],
+    }), 2025)
+    second = core.coerce_table_types(pd.DataFrame({
+        "Date": ["9/16", "9/17", "9/18", "Comments:"],
+        "Lbs": ["900", "950", "1,010", ""],
+        "Operator": ["Ana", "Luis", "Ana", ""],
+    }), 2025)
+    assert list(first.columns)[-1] == "Lbs (raw)" and list(second.columns)[-1] == "Date (raw)"
+
+    out = tmp_path / "by_machine.xlsx"
+    app.write_sheet_tables({"Pc1": [first, second]}, out)
+    sheet = pd.read_excel(out, sheet_name="Pc1", dtype=object)
+
+    assert list(sheet.columns) == ["Date", "Lbs", "Operator", "Lbs (raw)", "Date (raw)"]
+    # rows 0-3: first table, row 4: blank separator, rows 5-8: second table
+    assert sheet["Lbs"].iloc[5:8].tolist() == [900, 950, 1010]
+    assert sheet["Operator"].iloc[5:8].tolist() == ["Ana", "Luis", "Ana"]
+    assert sheet["Date (raw)"].iloc[8] == "Comments:"
+    assert sheet["Lbs (raw)"].iloc[3] == "see notes"
+    assert sheet.iloc[4].isna().all()
+    assert sheet["Date (raw)"].iloc[:4].isna().all() and sheet["Lbs (raw)"].iloc[5:].isna().all()
+
+def test_checkbox_columns_written_as_marks(tmp_path):
+    df = core.coerce_table_types(pd.DataFrame({"FT": [":selected:", ":unselected:"], "Lbs": ["10", "12"]}), 2025)
+    out = tmp_path / "by_machine.xlsx"
+    app.write_sheet_tables({"Pc1": [df]}, out)
+    sheet = pd.read_excel(out, sheet_name="Pc1", dtype=object)
+    assert sheet["FT"].iloc[0] == "✓" and pd.isna(sheet["FT"].iloc[1])
+    assert str(df["FT"].dtype) == "boolean"   # the frame (and the Parquet dataset) keep the booleans